@@ -3,6 +3,7 @@ import logging
 import os
 import sys
 import threading
+import time
 from datetime import datetime
 
 # Ensure the project root is importable
@@ -16,7 +17,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from database.database import init_db
+from database.database import IS_SQLITE, engine, init_db
+from services.agent_queue_service import (
+    PostgresTaskListener,
+    flush_queue_events_with_session,
+    reap_agent_tasks_with_session,
+)
+from services.enrichment_service import get_enrichment_pipeline
+from services.ranking_planner_service import run_rescan_cycle_with_session
 from services.sequence_execution_service import execute_due_sequence_assignments_with_session
 from api.routes import (
     leads,
@@ -92,11 +100,28 @@ app.include_router(tasks.router, prefix="/api")
 def startup():
     init_db()
     _start_sequence_worker()
+    _start_task_listener()
+    _start_task_reaper()
+    _start_ranking_planner()
+    _start_enrichment_pipeline()
 
 
 @app.on_event("shutdown")
 def shutdown():
     _stop_sequence_worker()
+    _stop_task_listener()
+    _stop_task_reaper()
+    _stop_ranking_planner()
+    _stop_enrichment_pipeline()
+    # Buffered claim/completion counts would be lost with the process
+    flush_queue_events_with_session()
+
+
+@app.on_event("shutdown")
+async def _close_screenshot_browser():
+    from services.security_scan_service import close_browser_pool
+
+    await close_browser_pool()
 
 
 def _env_bool(name: str, default: bool) -> bool:
@@ -172,6 +197,156 @@ def _stop_sequence_worker() -> None:
     app.state.sequence_worker_running = False
 
 
+def _start_task_listener() -> None:
+    """Forward Postgres NOTIFYs to long-polling /agents/tasks/pull calls in this process."""
+    if IS_SQLITE or not _env_bool("AGENT_TASK_LISTENER_ENABLED", True):
+        return
+    listener = PostgresTaskListener(engine)
+    listener.start()
+    app.state.agent_task_listener = listener
+
+
+def _stop_task_listener() -> None:
+    listener = getattr(app.state, "agent_task_listener", None)
+    if listener is not None:
+        listener.stop()
+
+
+def _start_task_reaper() -> None:
+    enabled = _env_bool("AGENT_TASK_REAPER_ENABLED", True)
+    app.state.task_reaper_enabled = enabled
+    app.state.task_reaper_running = False
+    app.state.task_reaper_last_cycle_at = None
+    app.state.task_reaper_last_result = None
+    app.state.task_reaper_last_error = None
+
+    if not enabled:
+        logger.info("Agent task reaper disabled via AGENT_TASK_REAPER_ENABLED")
+        return
+
+    interval_seconds = max(5, int(os.getenv("AGENT_TASK_REAPER_INTERVAL_SECONDS", "15")))
+    batch_limit = max(1, int(os.getenv("AGENT_TASK_REAPER_BATCH_LIMIT", "500")))
+
+    stop_event = threading.Event()
+
+    def _loop() -> None:
+        app.state.task_reaper_running = True
+        logger.info("Agent task reaper started (interval=%ss, batch_limit=%s)", interval_seconds, batch_limit)
+        while not stop_event.is_set():
+            try:
+                result = reap_agent_tasks_with_session(batch_limit=batch_limit)
+                app.state.task_reaper_last_cycle_at = datetime.utcnow().isoformat()
+                app.state.task_reaper_last_result = result
+                app.state.task_reaper_last_error = None
+                if any(result.values()):
+                    logger.info("Agent task reaper cycle result: %s", result)
+                # A full batch means more work is waiting; go again without sleeping.
+                if max(result.values()) >= batch_limit:
+                    continue
+            except Exception as exc:
+                app.state.task_reaper_last_cycle_at = datetime.utcnow().isoformat()
+                app.state.task_reaper_last_error = str(exc)
+                logger.exception("Agent task reaper cycle failed: %s", exc)
+
+            stop_event.wait(interval_seconds)
+
+        app.state.task_reaper_running = False
+        logger.info("Agent task reaper stopped")
+
+    reaper_thread = threading.Thread(target=_loop, name="agent-task-reaper", daemon=True)
+    reaper_thread.start()
+
+    app.state.task_reaper_stop_event = stop_event
+    app.state.task_reaper_thread = reaper_thread
+
+
+def _stop_task_reaper() -> None:
+    stop_event = getattr(app.state, "task_reaper_stop_event", None)
+    reaper_thread = getattr(app.state, "task_reaper_thread", None)
+
+    if stop_event is None or reaper_thread is None:
+        return
+
+    stop_event.set()
+    reaper_thread.join(timeout=5)
+    app.state.task_reaper_running = False
+
+
+def _start_ranking_planner() -> None:
+    enabled = _env_bool("RANKING_PLANNER_ENABLED", False)
+    app.state.ranking_planner_enabled = enabled
+    app.state.ranking_planner_running = False
+    app.state.ranking_planner_last_cycle_at = None
+    app.state.ranking_planner_last_result = None
+    app.state.ranking_planner_last_error = None
+
+    if not enabled:
+        logger.info("Ranking rescan planner disabled via RANKING_PLANNER_ENABLED")
+        return
+
+    requests_per_minute = max(1, int(os.getenv("RANKING_PLANNER_RPM", "30")))
+    idle_seconds = max(60, int(os.getenv("RANKING_PLANNER_IDLE_SECONDS", "300")))
+
+    stop_event = threading.Event()
+
+    def _loop() -> None:
+        app.state.ranking_planner_running = True
+        logger.info("Ranking rescan planner started (rpm=%s)", requests_per_minute)
+        while not stop_event.is_set():
+            started = time.monotonic()
+            wait_seconds = idle_seconds
+            try:
+                result = run_rescan_cycle_with_session(requests_per_minute, should_stop=stop_event.is_set)
+                app.state.ranking_planner_last_cycle_at = datetime.utcnow().isoformat()
+                app.state.ranking_planner_last_result = result
+                app.state.ranking_planner_last_error = None
+                if result.get("planned"):
+                    logger.info("Ranking rescan planner cycle result: %s", result)
+                    # Keep to the per-minute budget: one cycle per minute while work remains.
+                    wait_seconds = max(0.0, 60 - (time.monotonic() - started))
+            except Exception as exc:
+                app.state.ranking_planner_last_cycle_at = datetime.utcnow().isoformat()
+                app.state.ranking_planner_last_error = str(exc)
+                logger.exception("Ranking rescan planner cycle failed: %s", exc)
+
+            stop_event.wait(wait_seconds)
+
+        app.state.ranking_planner_running = False
+        logger.info("Ranking rescan planner stopped")
+
+    planner_thread = threading.Thread(target=_loop, name="ranking-planner", daemon=True)
+    planner_thread.start()
+
+    app.state.ranking_planner_stop_event = stop_event
+    app.state.ranking_planner_thread = planner_thread
+
+
+def _stop_ranking_planner() -> None:
+    stop_event = getattr(app.state, "ranking_planner_stop_event", None)
+    planner_thread = getattr(app.state, "ranking_planner_thread", None)
+
+    if stop_event is None or planner_thread is None:
+        return
+
+    stop_event.set()
+    planner_thread.join(timeout=5)
+    app.state.ranking_planner_running = False
+
+
+def _start_enrichment_pipeline() -> None:
+    """Run lead enrichment (fetch -> parse -> rank -> persist) on background stages."""
+    app.state.enrichment_pipeline_enabled = _env_bool("ENRICHMENT_PIPELINE_ENABLED", True)
+    if not app.state.enrichment_pipeline_enabled:
+        logger.info("Enrichment pipeline disabled via ENRICHMENT_PIPELINE_ENABLED; routes enrich leads directly")
+        return
+    get_enrichment_pipeline().start()
+
+
+def _stop_enrichment_pipeline() -> None:
+    if getattr(app.state, "enrichment_pipeline_enabled", False):
+        get_enrichment_pipeline().stop()
+
+
 @app.get("/api/health")
 def health():
     return {
@@ -182,6 +357,23 @@ def health():
             "last_cycle_at": getattr(app.state, "sequence_worker_last_cycle_at", None),
             "last_error": getattr(app.state, "sequence_worker_last_error", None),
         },
+        "task_reaper": {
+            "enabled": getattr(app.state, "task_reaper_enabled", False),
+            "running": getattr(app.state, "task_reaper_running", False),
+            "last_cycle_at": getattr(app.state, "task_reaper_last_cycle_at", None),
+            "last_error": getattr(app.state, "task_reaper_last_error", None),
+        },
+        "ranking_planner": {
+            "enabled": getattr(app.state, "ranking_planner_enabled", False),
+            "running": getattr(app.state, "ranking_planner_running", False),
+            "last_cycle_at": getattr(app.state, "ranking_planner_last_cycle_at", None),
+            "last_result": getattr(app.state, "ranking_planner_last_result", None),
+            "last_error": getattr(app.state, "ranking_planner_last_error", None),
+        },
+        "enrichment_pipeline": {
+            "enabled": getattr(app.state, "enrichment_pipeline_enabled", False),
+            **get_enrichment_pipeline().snapshot(),
+        },
     }
 
 
@@ -1,24 +1,40 @@
 """Endpoints for external OpenClaw agents to pull tasks and report completions."""
 import os
-import uuid
+import time
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from sqlalchemy import func, or_
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from api.dependencies import get_db, verify_api_key
 from api.schemas.agent_task import (
     AgentTaskAcknowledgeResponse,
+    AgentTaskBatchAcknowledgeResponse,
+    AgentTaskBatchCompletePayload,
+    AgentTaskBatchHeartbeatPayload,
+    AgentTaskBatchItemResult,
+    AgentTaskBatchPullResponse,
     AgentTaskCompletePayload,
     AgentTaskHeartbeatPayload,
     AgentTaskPullResponse,
 )
 from database.models import AgentTask, EmailHistory, EmailStatus
+from services.agent_queue_metrics_service import compute_queue_metrics, event_key, pending_queue_events
+from services.agent_queue_service import (
+    after_commit,
+    claim_tasks,
+    reap_agent_tasks,
+    renew_leases,
+    task_notifier,
+)
 
 router = APIRouter(tags=["agents", "openclaw"], dependencies=[Depends(verify_api_key)])
 
+_LONG_POLL_RECHECK_SECONDS = 5
+
 
 def _parse_agent_api_keys() -> dict[str, str]:
     raw = os.getenv("AGENT_API_KEYS", "").strip()
@@ -73,119 +89,81 @@ def _calculate_retry_delay_seconds(attempts: int) -> int:
     return base * (2 ** (capped_attempt - 1))
 
 @router.get("/agents/tasks/pull")
-def pull_agent_task(
+async def pull_agent_task(
     request: Request,
     agent_id: str,
     lease_seconds: int = Query(300, ge=30, le=3600),
+    wait_seconds: int = Query(0, ge=0, le=60),
     db: Session = Depends(get_db),
 ) -> AgentTaskPullResponse:
     """
     Called by Agent 2 (SDR) to pull the next pending task from the queue.
-    Locks the task by transitioning it to 'processing' and assigns it to the physical agent ID.
+    Atomically leases the task to the physical agent ID (see services.agent_queue_service).
+    With wait_seconds > 0 the call long-polls until a task is enqueued or the timeout expires.
     """
     _authorize_agent(request, agent_id)
 
-    now = datetime.utcnow()
-    is_sqlite = (getattr(getattr(db, "bind", None), "dialect", None) is not None and db.bind.dialect.name == "sqlite")
-
-    if is_sqlite:
-        stale_filter = func.datetime(AgentTask.lease_until) < func.datetime(now)
-        retry_ready_filter = func.datetime(AgentTask.next_retry_at) <= func.datetime(now)
-    else:
-        stale_filter = AgentTask.lease_until < now
-        retry_ready_filter = AgentTask.next_retry_at <= now
-
-    # Reclaim stale processing tasks (lease expired)
-    stale_tasks = (
-        db.query(AgentTask)
-        .filter(
-            AgentTask.status == "processing",
-            AgentTask.lease_until.isnot(None),
-            stale_filter,
-        )
-        .all()
-    )
-
-    for stale in stale_tasks:
-        if (stale.attempts or 0) >= (stale.max_attempts or 5):
-            stale.status = "dead_letter"
-            stale.error_message = stale.error_message or "max_attempts_exceeded_after_lease_timeout"
-            stale.completed_at = now
-        else:
-            stale.status = "pending"
-            stale.assigned_to = None
-            stale.lease_token = None
-            stale.lease_until = None
-            stale.last_heartbeat_at = None
-            stale.next_retry_at = now
-
-    db.flush()
-
-    # Find oldest pending and retry-ready tasks
-    candidates = (
-        db.query(AgentTask)
-        .filter(
-            AgentTask.status == "pending",
-            or_(
-                AgentTask.next_retry_at.is_(None),
-                retry_ready_filter,
-            ),
-        )
-        .order_by(AgentTask.created_at.asc())
-        .limit(200)
-        .all()
-    )
-
-    task = None
-    for candidate in candidates:
-        payload = candidate.payload if isinstance(candidate.payload, dict) else {}
-        if payload.get("agent_hint") == agent_id:
-            task = candidate
-            break
-
-    if task is None and candidates:
-        task = candidates[0]
-    
-    if not task:
-        db.commit()
-        return AgentTaskPullResponse(success=True, message="Queue is empty", task=None)
-        
-    # Attempt to lock it (handling SQLite race conditions without skip_locked)
-    lease_token = uuid.uuid4().hex
-    lease_until = now + timedelta(seconds=lease_seconds)
-
-    updated_rows = db.query(AgentTask).filter(
-        AgentTask.id == task.id,
-        AgentTask.status == "pending",
-    ).update({
-        "status": "processing",
-        "assigned_to": agent_id,
-        "lease_token": lease_token,
-        "lease_until": lease_until,
-        "last_heartbeat_at": now,
-        "attempts": (task.attempts or 0) + 1,
-        "error_message": None,
-    })
-    
-    if updated_rows == 0:
-        # Race condition: Another agent locked it before we could
-        db.rollback()
+    claimed = await _claim_with_wait(db, agent_id, lease_seconds, wait_seconds, limit=1)
+    if not claimed:
         return AgentTaskPullResponse(success=True, message="Queue is empty", task=None)
-        
+
+    return AgentTaskPullResponse(success=True, task=claimed[0])
+
+
+@router.post("/agents/tasks/pull-batch", response_model=AgentTaskBatchPullResponse)
+async def pull_agent_task_batch(
+    request: Request,
+    agent_id: str,
+    max_tasks: int = Query(10, ge=1, le=50, alias="max"),
+    lease_seconds: int = Query(300, ge=30, le=3600),
+    wait_seconds: int = Query(0, ge=0, le=60),
+    db: Session = Depends(get_db),
+):
+    """Claim up to `max` tasks in one round trip; all share a single lease token."""
+    _authorize_agent(request, agent_id)
+
+    claimed = await _claim_with_wait(db, agent_id, lease_seconds, wait_seconds, limit=max_tasks)
+    if not claimed:
+        return AgentTaskBatchPullResponse(success=True, message="Queue is empty", tasks=[])
+
+    return AgentTaskBatchPullResponse(success=True, tasks=claimed)
+
+
+@router.post("/agents/tasks/heartbeat-batch", response_model=AgentTaskBatchAcknowledgeResponse)
+def heartbeat_agent_task_batch(
+    payload: AgentTaskBatchHeartbeatPayload,
+    request: Request,
+    agent_id: str,
+    lease_seconds: int = Query(300, ge=30, le=3600),
+    db: Session = Depends(get_db),
+):
+    """Renew many leases with one UPDATE per lease token."""
+    _authorize_agent(request, agent_id)
+
+    renewed = renew_leases(db, agent_id, [(item.task_id, item.lease_token) for item in payload.items], lease_seconds)
     db.commit()
-    db.refresh(task)
-    
-    return AgentTaskPullResponse(
-        success=True,
-        task={
-            "id": task.id,
-            "type": task.task_type,
-            "lead_id": task.lead_id,
-            "payload": task.payload,
-            "lease_token": task.lease_token,
-            "lease_until": task.lease_until,
-        },
-    )
+
+    results = [
+        AgentTaskBatchItemResult(task_id=item.task_id, success=True, message="Heartbeat accepted")
+        if item.task_id in renewed
+        else AgentTaskBatchItemResult(
+            task_id=item.task_id, success=False, message="Lease not held by agent", status_code=409
+        )
+        for item in payload.items
+    ]
+    return AgentTaskBatchAcknowledgeResponse(success=all(r.success for r in results), results=results)
+
+
+@router.get("/agents/tasks/metrics")
+def agent_task_queue_metrics(db: Session = Depends(get_db)):
+    """Queue depth/age gauges plus sliding-window throughput, retry and latency histograms."""
+    return compute_queue_metrics(db)
+
+
+@router.post("/agents/tasks/reap")
+def reap_agent_task_queue(batch_limit: int = Query(500, ge=1, le=5000), db: Session = Depends(get_db)):
+    """Run one lease-reaper pass (manual trigger for deployments without the background worker)."""
+    return reap_agent_tasks(db, batch_limit=batch_limit)
 
 
 @router.post("/agents/tasks/{task_id}/heartbeat", response_model=AgentTaskAcknowledgeResponse)
@@ -235,11 +213,84 @@ def complete_agent_task(
     _authorize_agent(request, agent_id)
 
     task = db.query(AgentTask).filter(AgentTask.id == task_id).first()
+    events: Counter = Counter()
+    message = _apply_completion(db, task, agent_id, payload, events)
+    _buffer_events_after_commit(db, events)
+    db.commit()
+
+    return AgentTaskAcknowledgeResponse(success=True, message=message)
+
+
+@router.post("/agents/tasks/complete-batch", response_model=AgentTaskBatchAcknowledgeResponse)
+def complete_agent_task_batch(
+    payload: AgentTaskBatchCompletePayload,
+    request: Request,
+    agent_id: str,
+    db: Session = Depends(get_db),
+):
+    """Report several task outcomes in one transaction; items are validated independently."""
+    _authorize_agent(request, agent_id)
+
+    task_ids = [item.task_id for item in payload.items]
+    tasks = {t.id: t for t in db.query(AgentTask).filter(AgentTask.id.in_(task_ids)).all()} if task_ids else {}
+
+    results: list[AgentTaskBatchItemResult] = []
+    events: Counter = Counter()
+    for item in payload.items:
+        try:
+            message = _apply_completion(db, tasks.get(item.task_id), agent_id, item, events)
+            results.append(AgentTaskBatchItemResult(task_id=item.task_id, success=True, message=message))
+        except HTTPException as exc:
+            results.append(AgentTaskBatchItemResult(
+                task_id=item.task_id, success=False, message=str(exc.detail), status_code=exc.status_code
+            ))
+    _buffer_events_after_commit(db, events)
+    db.commit()
+
+    return AgentTaskBatchAcknowledgeResponse(success=all(r.success for r in results), results=results)
+
+
+def _buffer_events_after_commit(db: Session, events: Counter) -> None:
+    """Count completion events in the metrics buffer once they are committed (see flush_queue_events)."""
+    if events:
+        after_commit(db, lambda: pending_queue_events.add(events))
+
+
+def _claim_and_commit(db: Session, agent_id: str, lease_seconds: int, limit: int) -> list[dict[str, Any]]:
+    claimed = claim_tasks(db, agent_id, lease_seconds, limit=limit)
+    db.commit()
+    return claimed
+
+
+async def _claim_with_wait(
+    db: Session, agent_id: str, lease_seconds: int, wait_seconds: int, limit: int
+) -> list[dict[str, Any]]:
+    """Claim in the threadpool; wait on the event loop so idle long-polls hold no worker thread."""
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        seen_generation = task_notifier.generation
+        claimed = await run_in_threadpool(_claim_and_commit, db, agent_id, lease_seconds, limit)
+
+        remaining = deadline - time.monotonic()
+        if claimed or remaining <= 0:
+            return claimed
+        # Re-check periodically for retry-ready tasks and writers in other processes.
+        await task_notifier.wait(seen_generation, timeout=min(remaining, _LONG_POLL_RECHECK_SECONDS))
+
+
+def _apply_completion(
+    db: Session,
+    task: AgentTask | None,
+    agent_id: str,
+    payload: AgentTaskCompletePayload,
+    events: Counter,
+) -> str:
+    """Validate ownership and record a task outcome into the task and ``events``; the caller commits."""
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
     if task.status == "completed":
-        return AgentTaskAcknowledgeResponse(success=True, message="Task already completed")
+        return "Task already completed"
 
     if task.status in {"failed", "dead_letter"}:
         raise HTTPException(status_code=409, detail=f"Task already finalized as {task.status}")
@@ -263,18 +314,19 @@ def complete_agent_task(
             task.status = "dead_letter"
             task.completed_at = now
             task.error_message = payload.error or "max_attempts_exceeded"
+            events[event_key("dead_lettered", task.task_type)] += 1
         else:
             retry_delay_seconds = _calculate_retry_delay_seconds(attempts)
             task.status = "pending"
             task.next_retry_at = now + timedelta(seconds=retry_delay_seconds)
             task.error_message = payload.error or "task_execution_failed"
+            events[event_key("retried", task.task_type)] += 1
 
         task.assigned_to = None
         task.lease_token = None
         task.lease_until = None
         task.last_heartbeat_at = None
-        db.commit()
-        return AgentTaskAcknowledgeResponse(success=True, message="Task failure processed")
+        return "Task failure processed"
 
     # Handle successful SDR Draft tasks
     if task.task_type == "GENERATE_DRAFT":
@@ -300,6 +352,6 @@ def complete_agent_task(
     task.lease_until = None
     task.lease_token = None
     task.last_heartbeat_at = now
-    db.commit()
-    
-    return AgentTaskAcknowledgeResponse(success=True, message="Task completed successfully")
+    latency = (now - task.created_at).total_seconds() if task.created_at else None
+    events[event_key("completed", task.task_type, latency)] += 1
+    return "Task completed successfully"
@@ -11,7 +11,7 @@ from api.schemas.common import AgentSearchRequest, AgentResearchRequest
 from api.schemas.email import GenerateEmailRequest
 from database.models import Lead, EmailHistory, EmailStatus
 from services.llm_service import get_llm_service
-from services.ranking_service import get_ranking_service
+from services.ranking_cache_service import check_url_cached
 from services.outreach import parse_llm_json, detect_email_type
 
 router = APIRouter(tags=["agents"], dependencies=[Depends(verify_api_key)])
@@ -98,14 +98,13 @@ def generate_outreach(payload: GenerateEmailRequest, db: Session = Depends(get_d
 
 
 @router.post("/agents/research/{lead_id}")
-def research_lead(lead_id: int, db: Session = Depends(get_db)):
+def research_lead(lead_id: int, force: bool = False, db: Session = Depends(get_db)):
     lead = db.query(Lead).filter(Lead.id == lead_id).first()
     if not lead:
         raise HTTPException(404, "Lead not found")
 
-    ranking_svc = get_ranking_service()
     if lead.website:
-        ranking_result = ranking_svc.check_url(lead.website)
+        ranking_result = check_url_cached(db, lead.website, force=force)
         lead.ranking_score = ranking_result.get("score")
         lead.ranking_grade = ranking_result.get("grade")
         lead.ranking_details = ranking_result.get("headers")
@@ -5,13 +5,11 @@ from sqlalchemy import func
 from datetime import datetime, timedelta
 
 from api.dependencies import get_db, verify_api_key
+from services.campaign_stats_service import get_campaign_performance_cached
 from database.models import (
     Lead,
     EmailHistory,
     EmailStatus,
-    CampaignLead,
-    CampaignStatus,
-    Campaign,
     StatusHistory,
     LeadStatus
 )
@@ -79,46 +77,4 @@ def get_conversion_health(days: int = 30, db: Session = Depends(get_db)):
 @router.get("/analytics/campaign-performance")
 def get_campaign_performance(db: Session = Depends(get_db)):
     """Returns granular performance per campaign."""
-    campaigns = db.query(Campaign).all()
-    results = []
-    
-    for camp in campaigns:
-        # Leads mapped to campaign
-        total_leads = len(camp.campaign_leads)
-        active_leads = sum(1 for cl in camp.campaign_leads if cl.cl_status == "aktiv")
-        completed_leads = sum(1 for cl in camp.campaign_leads if cl.cl_status == "abgeschlossen")
-        
-        # Emails sent by this campaign
-        sent_emails = sum(1 for e in camp.email_history if e.status == EmailStatus.SENT)
-        failed_emails = sum(1 for e in camp.email_history if e.status == EmailStatus.FAILED)
-        
-        # Find conversions within those leads
-        lead_ids = [cl.lead_id for cl in camp.campaign_leads]
-        if lead_ids:
-            replies = db.query(StatusHistory).filter(
-                StatusHistory.lead_id.in_(lead_ids),
-                StatusHistory.zu_status == LeadStatus.PENDING
-            ).count()
-            won = db.query(StatusHistory).filter(
-                StatusHistory.lead_id.in_(lead_ids),
-                StatusHistory.zu_status == LeadStatus.GEWONNEN
-            ).count()
-        else:
-            replies = 0
-            won = 0
-            
-        results.append({
-            "id": camp.id,
-            "name": camp.name,
-            "status": camp.status.value if hasattr(camp.status, "value") else str(camp.status),
-            "total_leads": total_leads,
-            "active_leads": active_leads,
-            "completed": completed_leads,
-            "sent_emails": sent_emails,
-            "failed_emails": failed_emails,
-            "replies": replies,
-            "won": won,
-            "reply_rate_pct": round((replies / max(sent_emails, 1)) * 100, 1)
-        })
-        
-    return {"campaigns": sorted(results, key=lambda x: x['sent_emails'], reverse=True)}
+    return {"campaigns": get_campaign_performance_cached(db)}
@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload
 from api.dependencies import get_db, verify_api_key
 from api.schemas.campaign import (
@@ -14,6 +15,11 @@ from api.schemas.campaign import (
     CampaignLeadOut,
     AssignLeadsRequest,
 )
+from services.agent_queue_service import PRIORITY_BULK, SOURCE_CAMPAIGN, SOURCE_FOLLOWUP, announce_new_tasks
+from services.campaign_stats_service import (
+    campaign_lead_counts_subquery,
+    invalidate_campaign_performance,
+)
 from services.llm_service import get_llm_service
 from database.models import (
     Campaign,
@@ -35,9 +41,7 @@ DEFAULT_SEQUENZ = [
 ]
 
 
-def _campaign_to_out(c: Campaign) -> CampaignOut:
-    leads_count = len(c.campaign_leads) if c.campaign_leads else 0
-    completed = sum(1 for cl in (c.campaign_leads or []) if cl.cl_status == "abgeschlossen")
+def _campaign_to_out(c: Campaign, leads_count: int = 0, completed_count: int = 0) -> CampaignOut:
     return CampaignOut(
         id=c.id,
         name=c.name,
@@ -48,28 +52,40 @@ def _campaign_to_out(c: Campaign) -> CampaignOut:
         end_datum=c.end_datum,
         status=c.status.value if hasattr(c.status, "value") else str(c.status),
         created_at=c.created_at,
-        leads_count=leads_count,
-        completed_count=completed,
+        leads_count=int(leads_count or 0),
+        completed_count=int(completed_count or 0),
     )
 
 
+def _campaigns_with_counts(db: Session):
+    """Campaigns joined with their GROUP BY lead counts, without loading campaign_leads."""
+    counts = campaign_lead_counts_subquery(db)
+    return db.query(
+        Campaign,
+        func.coalesce(counts.c.total_leads, 0),
+        func.coalesce(counts.c.completed_leads, 0),
+    ).outerjoin(counts, counts.c.campaign_id == Campaign.id)
+
+
+def _campaign_out_by_id(db: Session, campaign_id: int) -> CampaignOut | None:
+    row = _campaigns_with_counts(db).filter(Campaign.id == campaign_id).first()
+    if not row:
+        return None
+    return _campaign_to_out(*row)
+
+
 @router.get("/campaigns", response_model=list[CampaignOut])
 def list_campaigns(db: Session = Depends(get_db)):
-    campaigns = (
-        db.query(Campaign)
-        .options(joinedload(Campaign.campaign_leads))
-        .order_by(Campaign.created_at.desc())
-        .all()
-    )
-    return [_campaign_to_out(c) for c in campaigns]
+    rows = _campaigns_with_counts(db).order_by(Campaign.created_at.desc()).all()
+    return [_campaign_to_out(*row) for row in rows]
 
 
 @router.get("/campaigns/{campaign_id}", response_model=CampaignOut)
 def get_campaign(campaign_id: int, db: Session = Depends(get_db)):
-    camp = db.query(Campaign).options(joinedload(Campaign.campaign_leads)).filter(Campaign.id == campaign_id).first()
-    if not camp:
+    out = _campaign_out_by_id(db, campaign_id)
+    if not out:
         raise HTTPException(404, "Campaign not found")
-    return _campaign_to_out(camp)
+    return out
 
 
 @router.post("/campaigns", response_model=CampaignOut, status_code=201)
@@ -84,12 +100,13 @@ def create_campaign(payload: CampaignCreate, db: Session = Depends(get_db)):
     db.add(camp)
     db.commit()
     db.refresh(camp)
+    invalidate_campaign_performance()
     return _campaign_to_out(camp)
 
 
 @router.patch("/campaigns/{campaign_id}", response_model=CampaignOut)
 def update_campaign(campaign_id: int, payload: CampaignUpdate, db: Session = Depends(get_db)):
-    camp = db.query(Campaign).options(joinedload(Campaign.campaign_leads)).filter(Campaign.id == campaign_id).first()
+    camp = db.query(Campaign).filter(Campaign.id == campaign_id).first()
     if not camp:
         raise HTTPException(404, "Campaign not found")
 
@@ -105,8 +122,8 @@ def update_campaign(campaign_id: int, payload: CampaignUpdate, db: Session = Dep
         camp.status = new_status
 
     db.commit()
-    db.refresh(camp)
-    return _campaign_to_out(camp)
+    invalidate_campaign_performance()
+    return _campaign_out_by_id(db, campaign_id)
 
 
 @router.delete("/campaigns/{campaign_id}", status_code=204)
@@ -116,6 +133,7 @@ def delete_campaign(campaign_id: int, db: Session = Depends(get_db)):
         raise HTTPException(404, "Campaign not found")
     db.delete(camp)
     db.commit()
+    invalidate_campaign_performance()
 
 
 @router.get("/campaigns/{campaign_id}/leads", response_model=list[CampaignLeadOut])
@@ -156,6 +174,7 @@ def assign_leads(campaign_id: int, payload: AssignLeadsRequest, db: Session = De
             db.add(CampaignLead(campaign_id=campaign_id, lead_id=lid, current_step=0, cl_status="aktiv"))
             added += 1
     db.commit()
+    invalidate_campaign_performance()
     return {"added": added}
 
 
@@ -166,6 +185,7 @@ def update_campaign_lead(campaign_id: int, cl_id: int, status: str, db: Session
         raise HTTPException(404, "Campaign lead not found")
     cl.cl_status = status
     db.commit()
+    invalidate_campaign_performance()
     return {"updated": True}
 
 
@@ -176,6 +196,7 @@ def remove_campaign_lead(campaign_id: int, cl_id: int, db: Session = Depends(get
         raise HTTPException(404, "Campaign lead not found")
     db.delete(cl)
     db.commit()
+    invalidate_campaign_performance()
 
 
 def _init_next_send(db: Session, campaign: Campaign):
@@ -213,10 +234,14 @@ def trigger_auto_followup(db: Session = Depends(get_db)):
                 lead_id=lead.id,
                 status="pending",
                 payload={"reason": "Auto-Follow-up 7 Days", "auto": True, "email_type": "followup"},
+                source=SOURCE_FOLLOWUP,
+                priority=PRIORITY_BULK,
             )
             db.add(task)
             queued += 1
-            
+
+    if queued:
+        announce_new_tasks(db)
     db.commit()
     return {"success": True, "queued_followups": queued}
 
@@ -269,6 +294,8 @@ def process_due_campaigns(db: Session = Depends(get_db)):
                 "campaign_id": cl.campaign_id,
                 "email_type": email_type
             },
+            source=SOURCE_CAMPAIGN,
+            priority=PRIORITY_BULK,
             status="pending"
         )
         db.add(agent_task)
@@ -282,5 +309,8 @@ def process_due_campaigns(db: Session = Depends(get_db)):
         else:
             cl.cl_status = "abgeschlossen"
 
+    if tasks_queued:
+        announce_new_tasks(db)
     db.commit()
+    invalidate_campaign_performance()
     return {"processed": len(due_leads), "tasks_queued": tasks_queued}
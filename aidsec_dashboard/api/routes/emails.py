@@ -56,6 +56,7 @@ from database.models import (
     LeadSequenceAssignment,
     ABTest,
 )
+from services.campaign_stats_service import sequence_status_counts
 from services.email_service import get_email_service, DEFAULT_TEMPLATES
 from services.llm_service import get_llm_service
 from services.outlook_service import get_outlook_service
@@ -1412,18 +1413,16 @@ def assign_leads_to_sequence(seq_id: int, payload: SequenceAssignLeads, db: Sess
 def get_sequence_stats_internal(seq_id: int, db: Session) -> SequenceStats:
     """Internal helper to get sequence stats."""
     sequence = db.query(EmailSequence).filter(EmailSequence.id == seq_id).first()
-    assignments = db.query(LeadSequenceAssignment).filter(
-        LeadSequenceAssignment.sequence_id == seq_id
-    ).all()
+    counts = sequence_status_counts(db, seq_id)
 
     return SequenceStats(
         sequence_id=seq_id,
         name=sequence.name if sequence else "Unknown",
-        total_assigned=len(assignments),
-        active=sum(1 for a in assignments if a.status == "aktiv"),
-        completed=sum(1 for a in assignments if a.status == "abgeschlossen"),
-        paused=sum(1 for a in assignments if a.status == "pausiert"),
-        unsubscribed=sum(1 for a in assignments if a.status == "abgemeldet"),
+        total_assigned=sum(counts.values()),
+        active=counts.get("aktiv", 0),
+        completed=counts.get("abgeschlossen", 0),
+        paused=counts.get("pausiert", 0),
+        unsubscribed=counts.get("abgemeldet", 0),
     )
 
 
@@ -1,12 +1,18 @@
 """Import/Export endpoints: Excel/CSV upload, data export."""
 from __future__ import annotations
 
+import csv
 import io
+import os
+import shutil
 import tempfile
+import threading
+import uuid
+from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
 from api.dependencies import get_db, verify_api_key
@@ -14,22 +20,38 @@ from database.models import Lead, LeadStatus, LeadKategorie
 
 router = APIRouter(tags=["import_export"], dependencies=[Depends(verify_api_key)])
 
+_import_jobs: dict[str, dict] = {}
+_import_reject_reports: dict[str, str] = {}
+# Guards _import_jobs and job updates; running jobs publish fresh dicts instead of mutating shared ones.
+_import_jobs_lock = threading.Lock()
+
+# Finished import jobs (and their reject reports) kept for polling/download.
+MAX_FINISHED_IMPORT_JOBS = 20
+
+
+# Bytes copied per read when spooling an upload to disk.
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+def _save_upload(file: UploadFile, suffix: str) -> str:
+    """Stream an upload to a temp file in fixed-size chunks and return its path."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        shutil.copyfileobj(file.file, tmp, UPLOAD_CHUNK_BYTES)
+        return tmp.name
+
 
 @router.post("/import/excel")
 def import_excel(file: UploadFile = File(...), db: Session = Depends(get_db)):
     if not file.filename.endswith((".xlsx", ".xls")):
         raise HTTPException(400, "File must be .xlsx or .xls")
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-        tmp.write(file.file.read())
-        tmp_path = tmp.name
-
-    from utils.importer import import_from_excel, import_direct
-    leads_data, stats = import_from_excel(tmp_path)
-    imported, duplicates = import_direct(db, leads_data)
-
-    import os
-    os.unlink(tmp_path)
+    tmp_path = _save_upload(file, ".xlsx")
+    try:
+        from utils.importer import iter_excel_leads, import_lead_chunks
+        stats = {"total": 0, "anwalt": 0, "praxis": 0, "wordpress": 0, "duplicates": 0, "rejected": 0, "errors": 0}
+        imported, duplicates = import_lead_chunks(db, iter_excel_leads(tmp_path, stats))
+    finally:
+        os.unlink(tmp_path)
 
     return {
         "imported": imported,
@@ -48,24 +70,172 @@ def import_csv(
     if not file.filename.endswith(".csv"):
         raise HTTPException(400, "File must be .csv")
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
-        tmp.write(file.file.read())
-        tmp_path = tmp.name
-
-    from utils.importer import import_csv as _import_csv, import_direct
-    leads_data, stats = _import_csv(tmp_path, LeadKategorie(kategorie))
-    imported, duplicates = import_direct(db, leads_data)
-
-    import os
-    os.unlink(tmp_path)
+    tmp_path = _save_upload(file, ".csv")
+    try:
+        from utils.importer import iter_csv_leads, import_lead_chunks
+        stats = {"total": 0, "duplicates": 0, "rejected": 0, "errors": 0}
+        imported, duplicates = import_lead_chunks(db, iter_csv_leads(tmp_path, LeadKategorie(kategorie), stats))
+    finally:
+        os.unlink(tmp_path)
 
     return {
         "imported": imported,
         "duplicates": duplicates,
         "total_in_file": stats.get("total", 0),
+        "rejected": stats.get("rejected", 0),
     }
 
 
+def _run_import_job(job_id: str, tmp_path: str, kategorie: Optional[LeadKategorie]):
+    from database.database import get_session
+    from utils.importer import REJECT_FIELDS, WARNING_REASONS, import_lead_chunks, iter_csv_leads, iter_excel_leads
+    session = get_session()
+    with _import_jobs_lock:
+        job = _import_jobs[job_id]
+        report_path = _import_reject_reports[job_id]
+        stats = dict(job["stats"])
+    rejected: dict[str, int] = {}
+    warnings: dict[str, int] = {}
+    try:
+        with open(report_path, "w", newline="", encoding="utf-8") as report:
+            writer = csv.DictWriter(report, fieldnames=REJECT_FIELDS)
+            writer.writeheader()
+
+            def on_reject(record: dict):
+                writer.writerow(record)
+                counts = warnings if record["reason"] in WARNING_REASONS else rejected
+                counts[record["reason"]] = counts.get(record["reason"], 0) + 1
+
+            def on_progress(done: int, total: Optional[int]):
+                # every processed lead is either imported or a duplicate
+                duplicates = rejected.get("duplicate", 0) + rejected.get("fuzzy_duplicate", 0)
+                with _import_jobs_lock:
+                    job.update(
+                        rows_processed=stats.get("rows", 0),
+                        duplicates=duplicates,
+                        imported=done - duplicates,
+                        rejected=dict(rejected),
+                        warnings=dict(warnings),
+                        stats=dict(stats),
+                    )
+
+            if kategorie is None:
+                chunks = iter_excel_leads(tmp_path, stats, on_reject=on_reject)
+            else:
+                chunks = iter_csv_leads(tmp_path, kategorie, stats, on_reject=on_reject)
+            imported, duplicates = import_lead_chunks(
+                session, chunks, progress_callback=on_progress, on_reject=on_reject
+            )
+
+        stats["duplicates"] = duplicates
+        with _import_jobs_lock:
+            job.update(
+                status="done",
+                rows_processed=stats.get("rows", 0),
+                imported=imported,
+                duplicates=duplicates,
+                total_in_file=stats.get("total", 0),
+                rejected=dict(rejected),
+                warnings=dict(warnings),
+                stats=dict(stats),
+            )
+    except Exception as e:
+        session.rollback()
+        with _import_jobs_lock:
+            job.update(
+                status="error", error=str(e), rejected=dict(rejected), warnings=dict(warnings), stats=dict(stats)
+            )
+    finally:
+        session.close()
+        os.unlink(tmp_path)
+        with _import_jobs_lock:
+            job["finished_at"] = datetime.utcnow().isoformat()
+
+
+def _prune_import_jobs():
+    """Drop the oldest finished jobs beyond MAX_FINISHED_IMPORT_JOBS; the caller holds _import_jobs_lock."""
+    finished = [job_id for job_id, job in _import_jobs.items() if job["status"] != "running"]
+    for job_id in finished[:max(0, len(finished) - MAX_FINISHED_IMPORT_JOBS)]:
+        del _import_jobs[job_id]
+        report_path = _import_reject_reports.pop(job_id, None)
+        if report_path and os.path.exists(report_path):
+            os.unlink(report_path)
+
+
+@router.post("/import/jobs")
+def start_import_job(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    kategorie: str = Query("wordpress", description="Kategorie for CSV uploads; Excel sheets set their own"),
+):
+    """Import an Excel/CSV upload in the background; poll /import/jobs/{job_id} for progress."""
+    if file.filename.endswith((".xlsx", ".xls")):
+        suffix, csv_kategorie = ".xlsx", None
+    elif file.filename.endswith(".csv"):
+        try:
+            suffix, csv_kategorie = ".csv", LeadKategorie(kategorie)
+        except ValueError:
+            raise HTTPException(400, f"Unknown kategorie: {kategorie}")
+    else:
+        raise HTTPException(400, "File must be .xlsx, .xls or .csv")
+
+    from utils.importer import estimate_rows
+    tmp_path = _save_upload(file, suffix)
+
+    job_id = str(uuid.uuid4())[:8]
+    with tempfile.NamedTemporaryFile(delete=False, prefix=f"import_rejects_{job_id}_", suffix=".csv") as report:
+        report_path = report.name
+    job = {
+        "status": "running",
+        "filename": file.filename,
+        "total_rows": estimate_rows(tmp_path),
+        "rows_processed": 0,
+        "imported": 0,
+        "duplicates": 0,
+        "rejected": {},
+        "warnings": {},
+        "total_in_file": 0,
+        "stats": {"rows": 0, "total": 0, "rejected": 0, "errors": 0},
+        "started_at": datetime.utcnow().isoformat(),
+        "finished_at": None,
+    }
+    with _import_jobs_lock:
+        _prune_import_jobs()
+        _import_reject_reports[job_id] = report_path
+        _import_jobs[job_id] = job
+    background_tasks.add_task(_run_import_job, job_id, tmp_path, csv_kategorie)
+    return {"job_id": job_id}
+
+
+@router.get("/import/jobs/{job_id}")
+def import_job_status(job_id: str):
+    with _import_jobs_lock:
+        job = _import_jobs.get(job_id)
+        # Shallow copy is enough: the runner replaces nested dicts rather than mutating them.
+        snapshot = dict(job) if job else None
+    if not snapshot:
+        raise HTTPException(404, "Job not found")
+    return snapshot
+
+
+@router.get("/import/jobs/{job_id}/rejects")
+def import_job_rejects(job_id: str):
+    """Per-row reject report (duplicate, fuzzy_duplicate, missing_firma; invalid_email rows were imported) as CSV."""
+    with _import_jobs_lock:
+        job = _import_jobs.get(job_id)
+        status = job["status"] if job else None
+        report_path = _import_reject_reports.get(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    if status == "running":
+        raise HTTPException(409, "Import still running")
+    return FileResponse(
+        report_path,
+        media_type="text/csv",
+        filename=f"import_rejects_{job_id}.csv",
+    )
+
+
 @router.get("/export/csv")
 def export_csv(
     status: Optional[str] = None,
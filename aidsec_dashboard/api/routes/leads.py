@@ -1,17 +1,18 @@
 """Lead CRUD endpoints with filtering, pagination, and bulk operations."""
 from __future__ import annotations
 
+import uuid
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, BackgroundTasks
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from sqlalchemy import or_
 from sqlalchemy.orm import Session, joinedload
 
 from api.dependencies import get_db, verify_api_key
-from services.enrichment_service import enrich_lead
+from services.enrichment_service import enrich_lead, get_enrichment_pipeline
 from services.ranking_service import get_ranking_service
 from api.schemas.lead import (
     LeadCreate,
@@ -35,6 +36,11 @@ from database.models import (
 limiter = Limiter(key_func=get_remote_address)
 router = APIRouter(tags=["leads"], dependencies=[Depends(verify_api_key)])
 
+_duplicate_scan_jobs: dict[str, dict] = {}
+
+# Finished duplicate scans (each holding up to DEDUPE_MAX_PAIRS pairs) kept for polling.
+MAX_FINISHED_DUPLICATE_SCANS = 5
+
 SORT_MAP = {
     "newest": Lead.id.desc(),
     "oldest": Lead.id.asc(),
@@ -192,20 +198,23 @@ def create_lead(payload: LeadCreate, background_tasks: BackgroundTasks, db: Sess
         notes=payload.notes,
         quelle=payload.quelle,
         wordpress_detected=payload.wordpress_detected,
+        # Auto-trigger enrichment: the enrichment pipeline picks up pending leads
+        research_status="pending" if payload.website else None,
     )
     db.add(lead)
     db.commit()
     db.refresh(lead)
-    
-    # Auto-trigger enrichment
+
     if lead.website:
-        background_tasks.add_task(enrich_lead, lead.id)
-        
+        _queue_enrichment(background_tasks, lead.id)
+
     return LeadOut.model_validate(lead)
 
 @router.post("/leads/{lead_id}/enrich")
-def trigger_enrichment(lead_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """Manually trigger background enrichment for a specific lead."""
+def trigger_enrichment(
+    lead_id: int, background_tasks: BackgroundTasks, force: bool = False, db: Session = Depends(get_db)
+):
+    """Manually trigger background enrichment for a specific lead (queued in the enrichment pipeline)."""
     lead = db.query(Lead).filter(Lead.id == lead_id).first()
     if not lead:
         raise HTTPException(404, "Lead not found")
@@ -214,12 +223,18 @@ def trigger_enrichment(lead_id: int, background_tasks: BackgroundTasks, db: Sess
         
     lead.research_status = "pending"
     db.commit()
-    background_tasks.add_task(enrich_lead, lead.id)
+    _queue_enrichment(background_tasks, lead.id, force)
     return {"status": "Enrichment queued"}
 
 
+def _queue_enrichment(background_tasks: BackgroundTasks, lead_id: int, force: bool = False) -> None:
+    """Hand a pending lead to the enrichment pipeline, or enrich it after the response if it isn't running."""
+    if not get_enrichment_pipeline().submit(lead_id, force):
+        background_tasks.add_task(enrich_lead, lead_id, force)
+
+
 @router.post("/leads/{lead_id}/security-scan")
-async def trigger_security_scan(lead_id: int, db: Session = Depends(get_db)):
+async def trigger_security_scan(lead_id: int, force: bool = False, db: Session = Depends(get_db)):
     """Run a security scan via Playwright for a specific lead."""
     from services.security_scan_service import security_scan
 
@@ -229,7 +244,7 @@ async def trigger_security_scan(lead_id: int, db: Session = Depends(get_db)):
     if not lead.website:
         raise HTTPException(400, "Lead has no website to scan")
         
-    result = await security_scan(lead.website, capture_screenshot=False)
+    result = await security_scan(lead.website, capture_screenshot=False, force=force)
     if not result.get("success"):
         raise HTTPException(502, f"Scan failed: {result.get('error')}")
         
@@ -247,7 +262,7 @@ async def trigger_security_scan(lead_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/leads/bulk-security-scan")
-async def bulk_security_scan(payload: BulkSecurityScanRequest, db: Session = Depends(get_db)):
+async def bulk_security_scan(payload: BulkSecurityScanRequest, force: bool = False, db: Session = Depends(get_db)):
     """Run security scans for multiple leads, optionally filtering by grade."""
     from services.security_scan_service import security_scan
 
@@ -261,7 +276,7 @@ async def bulk_security_scan(payload: BulkSecurityScanRequest, db: Session = Dep
             
         # Optional: if grade_filter is requested, maybe only scan if it currently matches, 
         # but usually a bulk scan implies we want to *find* their grade.
-        res = await security_scan(lead.website, capture_screenshot=False)
+        res = await security_scan(lead.website, capture_screenshot=False, force=force)
         
         if res.get("success"):
             grade = res.get("grade")
@@ -285,6 +300,56 @@ async def bulk_security_scan(payload: BulkSecurityScanRequest, db: Session = Dep
     return {"processed": len(leads), "results": results}
 
 
+def _run_duplicate_scan(job_id: str, threshold: Optional[float]):
+    from database.database import get_session
+    from services.dedupe_service import find_lead_duplicates
+    session = get_session()
+    job = _duplicate_scan_jobs[job_id]
+    try:
+        kwargs = {"threshold": threshold} if threshold is not None else {}
+        job["pairs"] = find_lead_duplicates(session, stats=job["stats"], **kwargs)
+        job["status"] = "done"
+    except Exception as e:
+        job["status"] = "error"
+        job["error"] = str(e)
+    finally:
+        session.close()
+        job["finished_at"] = datetime.utcnow().isoformat()
+
+
+def _prune_duplicate_scans():
+    finished = [job_id for job_id, job in _duplicate_scan_jobs.items() if job["status"] != "running"]
+    for job_id in finished[:max(0, len(finished) - MAX_FINISHED_DUPLICATE_SCANS)]:
+        del _duplicate_scan_jobs[job_id]
+
+
+@router.post("/leads/duplicates/scan")
+def start_duplicate_scan(
+    background_tasks: BackgroundTasks,
+    threshold: Optional[float] = Query(None, ge=0.5, le=1.0, description="Name similarity threshold (default DEDUPE_THRESHOLD)"),
+):
+    """Find likely duplicate leads in the background; poll /leads/duplicates/scan/{job_id} for the pairs."""
+    _prune_duplicate_scans()
+    job_id = str(uuid.uuid4())[:8]
+    _duplicate_scan_jobs[job_id] = {
+        "status": "running",
+        "stats": {},
+        "pairs": [],
+        "started_at": datetime.utcnow().isoformat(),
+        "finished_at": None,
+    }
+    background_tasks.add_task(_run_duplicate_scan, job_id, threshold)
+    return {"job_id": job_id}
+
+
+@router.get("/leads/duplicates/scan/{job_id}")
+def duplicate_scan_status(job_id: str):
+    job = _duplicate_scan_jobs.get(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
+
+
 @router.post("/leads/{lead_id}/followup-send")
 def send_followup_reminder(lead_id: int, payload: dict, db: Session = Depends(get_db)):
     """Trigger a custom follow-up action/email for a Lead."""
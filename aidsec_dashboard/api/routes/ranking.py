@@ -5,12 +5,14 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from api.dependencies import get_db, verify_api_key
 from api.schemas.common import RankingCheckRequest, RankingBatchRequest
 from database.models import Lead
+from services.ranking_cache_service import check_url_cached, ranking_cache_stats, refresh_lead_rankings
+from services.ranking_planner_service import STATUS_WEIGHTS, plan_rescan_batch
 from services.ranking_service import get_ranking_service
 
 
@@ -23,22 +25,21 @@ _batch_jobs: dict[str, dict] = {}
 
 
 @router.post("/ranking/check")
-def check_single(payload: RankingCheckRequest):
-    svc = get_ranking_service()
-    result = svc.check_url(payload.url)
+def check_single(payload: RankingCheckRequest, db: Session = Depends(get_db)):
+    result = check_url_cached(db, payload.url, force=payload.force)
+    db.commit()
     return result
 
 
 @router.post("/ranking/check-lead/{lead_id}")
-def check_lead(lead_id: int, db: Session = Depends(get_db)):
+def check_lead(lead_id: int, force: bool = False, db: Session = Depends(get_db)):
     lead = db.query(Lead).filter(Lead.id == lead_id).first()
     if not lead:
         raise HTTPException(404, "Lead not found")
     if not lead.website:
         raise HTTPException(400, "Lead has no website")
 
-    svc = get_ranking_service()
-    result = svc.check_url(lead.website)
+    result = check_url_cached(db, lead.website, force=force)
 
     lead.ranking_score = result.get("score")
     lead.ranking_grade = _normalized_grade(result.get("grade"))
@@ -49,41 +50,56 @@ def check_lead(lead_id: int, db: Session = Depends(get_db)):
     return result
 
 
-def _run_batch(job_id: str, lead_ids: list[int]):
+def _run_batch(job_id: str, lead_ids: list[int], force: bool = False):
     from database.database import get_session
     session = get_session()
-    svc = get_ranking_service()
     job = _batch_jobs[job_id]
     try:
         leads = session.query(Lead).filter(Lead.id.in_(lead_ids)).all()
         job["total"] = len(leads)
-        for i, lead in enumerate(leads):
-            if job.get("cancelled"):
-                break
-            if not lead.website:
-                job["errors"] += 1
-                job["completed"] += 1
-                continue
-            try:
-                result = svc.check_url(lead.website)
-                lead.ranking_score = result.get("score")
-                lead.ranking_grade = _normalized_grade(result.get("grade"))
-                lead.ranking_details = result.get("headers")
-                lead.ranking_checked_at = datetime.utcnow()
-                session.flush()
-                job["completed"] += 1
-            except Exception:
-                job["errors"] += 1
-                job["completed"] += 1
-        session.commit()
+        with_site = [lead for lead in leads if lead.website]
+        job["errors"] += len(leads) - len(with_site)
+        job["completed"] += len(leads) - len(with_site)
+
+        refresh_lead_rankings(
+            session,
+            with_site,
+            force=force,
+            should_stop=lambda: bool(job.get("cancelled")),
+            stats=job,
+        )
         job["status"] = "done"
     except Exception as e:
+        session.rollback()
         job["status"] = "error"
         job["error"] = str(e)
     finally:
         session.close()
 
 
+@router.get("/ranking/cache/stats")
+def cache_stats(db: Session = Depends(get_db)):
+    """Cache size plus how many re-scans were answered as unchanged."""
+    return ranking_cache_stats(db)
+
+
+@router.get("/ranking/planner/preview")
+def planner_preview(limit: int = Query(20, ge=1, le=500), db: Session = Depends(get_db)):
+    """Leads the rescan planner would refresh next, most overdue first."""
+    leads = plan_rescan_batch(db, limit=limit)
+    return [
+        {
+            "id": lead.id,
+            "firma": lead.firma,
+            "status": lead.status.value if hasattr(lead.status, "value") else lead.status,
+            "weight": STATUS_WEIGHTS.get(lead.status),
+            "ranking_grade": lead.ranking_grade,
+            "ranking_checked_at": lead.ranking_checked_at.isoformat() if lead.ranking_checked_at else None,
+        }
+        for lead in leads
+    ]
+
+
 @router.post("/ranking/batch")
 def start_batch(
     payload: RankingBatchRequest,
@@ -96,7 +112,7 @@ def start_batch(
         "completed": 0,
         "errors": 0,
     }
-    background_tasks.add_task(_run_batch, job_id, payload.lead_ids)
+    background_tasks.add_task(_run_batch, job_id, payload.lead_ids, payload.force)
     return {"job_id": job_id}
 
 
@@ -29,6 +29,7 @@ def research_lead(lead_id: int, db: Session = Depends(get_db)):
 
     # Update status to in_progress
     lead.research_status = "in_progress"
+    lead.research_claimed_at = datetime.utcnow()
     db.commit()
 
     try:
@@ -113,6 +114,7 @@ def research_missing_leads(
         try:
             # Set status to in_progress
             lead.research_status = "in_progress"
+            lead.research_claimed_at = datetime.utcnow()
             db.commit()
 
             # Run research
@@ -183,6 +185,7 @@ def bulk_research_leads(
 
         try:
             lead.research_status = "in_progress"
+            lead.research_claimed_at = datetime.utcnow()
             db.commit()
 
             service = get_research_service()
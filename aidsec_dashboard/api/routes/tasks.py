@@ -28,6 +28,9 @@ def list_tasks(limit: int = 50, db: Session = Depends(get_db)):
             "lead_firma": firma,
             "status": task_obj.status,
             "assigned_to": task_obj.assigned_to,
+            "agent_hint": task_obj.agent_hint,
+            "source": task_obj.source,
+            "priority": task_obj.priority,
             "attempts": task_obj.attempts,
             "max_attempts": task_obj.max_attempts,
             "lease_until": task_obj.lease_until.isoformat() if task_obj.lease_until else None,
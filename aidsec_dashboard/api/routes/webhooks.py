@@ -12,6 +12,7 @@ from database.models import (
     LeadStatus,
     StatusHistory
 )
+from services.campaign_stats_service import invalidate_campaign_performance
 from services.telegram_service import process_telegram_update
 
 router = APIRouter(tags=["webhooks"])
@@ -84,6 +85,7 @@ async def handle_inbound_email(request: Request, db: Session = Depends(get_db)):
         db.add(StatusHistory(lead_id=lead.id, von_status=old_status, zu_status=LeadStatus.PENDING))
 
     db.commit()
+    invalidate_campaign_performance()
     
     return {
         "status": "success",
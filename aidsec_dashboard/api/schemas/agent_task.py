@@ -12,6 +12,8 @@ class AgentTaskPullOut(BaseModel):
     type: str
     lead_id: int | None = None
     payload: dict[str, Any] | None = None
+    source: str | None = None
+    priority: int = 0
     lease_token: str
     lease_until: datetime
 
@@ -36,3 +38,38 @@ class AgentTaskHeartbeatPayload(BaseModel):
 class AgentTaskAcknowledgeResponse(BaseModel):
     success: bool
     message: str
+
+
+class AgentTaskBatchPullResponse(BaseModel):
+    success: bool
+    message: str | None = None
+    tasks: list[AgentTaskPullOut] = []
+
+
+class AgentTaskBatchHeartbeatItem(BaseModel):
+    task_id: int
+    lease_token: str
+
+
+class AgentTaskBatchHeartbeatPayload(BaseModel):
+    items: list[AgentTaskBatchHeartbeatItem]
+
+
+class AgentTaskBatchCompleteItem(AgentTaskCompletePayload):
+    task_id: int
+
+
+class AgentTaskBatchCompletePayload(BaseModel):
+    items: list[AgentTaskBatchCompleteItem]
+
+
+class AgentTaskBatchItemResult(BaseModel):
+    task_id: int
+    success: bool
+    message: str
+    status_code: int = 200
+
+
+class AgentTaskBatchAcknowledgeResponse(BaseModel):
+    success: bool
+    results: list[AgentTaskBatchItemResult]
@@ -88,10 +88,12 @@ class MarketingOptimizeRequest(BaseModel):
 
 class RankingCheckRequest(BaseModel):
     url: str
+    force: bool = False
 
 
 class RankingBatchRequest(BaseModel):
     lead_ids: list[int]
+    force: bool = False
 
 
 class AgentSearchRequest(BaseModel):
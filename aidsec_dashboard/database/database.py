@@ -1,8 +1,10 @@
 """Database connection and session management"""
 import os
-from sqlalchemy import create_engine, event, text
+from sqlalchemy import bindparam, case, create_engine, event, func, inspect, select, text, update
 from sqlalchemy.orm import sessionmaker, Session
-from database.models import Base
+from database.models import AgentTask, Base, Lead
+from utils.dedupe import firma_key
+from utils.domains import domain_norm
 
 # Default SQLite database path (local fallback)
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "leads.db")
@@ -93,9 +95,129 @@ def _ensure_legacy_columns():
                 continue
 
 
+def _lead_key_backfill(source: str, target: str, key_fn):
+    """Backfill filling leads.<target> = key_fn(leads.<source>) in chunks, for keys
+    (host parsing, phonetic codes) that have no portable SQL equivalent."""
+    table = Lead.__table__
+
+    def backfill(conn) -> None:
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                select(table.c.id, table.c[source])
+                .where(table.c.id > last_id, table.c[source].isnot(None), table.c[target].is_(None))
+                .order_by(table.c.id)
+                .limit(5000)
+            ).all()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            values = [{"lead_id": row[0], "value": key_fn(row[1])} for row in rows]
+            values = [item for item in values if item["value"]]
+            if values:
+                conn.execute(
+                    update(table).where(table.c.id == bindparam("lead_id")).values({target: bindparam("value")}),
+                    values,
+                )
+
+    return backfill
+
+
+# Columns added after Postgres support; DDL must stay portable across SQLite and Postgres.
+# Backfills are SQLAlchemy statements so JSON access compiles per dialect, or callables
+# taking the connection when the value has to be computed in Python.
+_PORTABLE_COLUMNS: list[tuple[str, str, str, object | None]] = [
+    (
+        "agent_tasks",
+        "agent_hint",
+        "ALTER TABLE agent_tasks ADD COLUMN agent_hint VARCHAR(100)",
+        update(AgentTask)
+        .where(AgentTask.agent_hint.is_(None), AgentTask.payload.isnot(None))
+        .values(agent_hint=AgentTask.payload["agent_hint"].as_string()),
+    ),
+    (
+        "agent_tasks",
+        "source",
+        "ALTER TABLE agent_tasks ADD COLUMN source VARCHAR(20) DEFAULT 'manual'",
+        update(AgentTask)
+        .where(AgentTask.payload.isnot(None))
+        .values(
+            source=case(
+                (AgentTask.payload["campaign_id"].as_integer().isnot(None), "campaign"),
+                (AgentTask.payload["auto"].as_boolean().is_(True), "followup"),
+                else_="manual",
+            )
+        ),
+    ),
+    (
+        "agent_tasks",
+        "priority",
+        "ALTER TABLE agent_tasks ADD COLUMN priority INTEGER DEFAULT 0",
+        None,
+    ),
+    (
+        "leads",
+        "email_norm",
+        "ALTER TABLE leads ADD COLUMN email_norm VARCHAR(255)",
+        update(Lead)
+        .where(Lead.email.isnot(None), func.trim(Lead.email) != "")
+        .values(email_norm=func.lower(func.trim(Lead.email))),
+    ),
+    (
+        "leads",
+        "domain_norm",
+        "ALTER TABLE leads ADD COLUMN domain_norm VARCHAR(255)",
+        _lead_key_backfill("website", "domain_norm", domain_norm),
+    ),
+    ("leads", "firma_key", "ALTER TABLE leads ADD COLUMN firma_key VARCHAR(255)", _lead_key_backfill("firma", "firma_key", firma_key)),
+    ("leads", "research_claimed_at", "ALTER TABLE leads ADD COLUMN research_claimed_at TIMESTAMP", None),
+    ("ranking_cache", "etag", "ALTER TABLE ranking_cache ADD COLUMN etag VARCHAR(255)", None),
+    ("ranking_cache", "last_modified", "ALTER TABLE ranking_cache ADD COLUMN last_modified VARCHAR(64)", None),
+    ("ranking_cache", "headers_hash", "ALTER TABLE ranking_cache ADD COLUMN headers_hash VARCHAR(64)", None),
+    ("ranking_cache", "validated_at", "ALTER TABLE ranking_cache ADD COLUMN validated_at TIMESTAMP", None),
+    ("ranking_cache", "scan_count", "ALTER TABLE ranking_cache ADD COLUMN scan_count INTEGER NOT NULL DEFAULT 0", None),
+    (
+        "ranking_cache",
+        "unchanged_count",
+        "ALTER TABLE ranking_cache ADD COLUMN unchanged_count INTEGER NOT NULL DEFAULT 0",
+        None,
+    ),
+]
+
+
+def _ensure_columns():
+    """Best-effort additive migration for columns introduced after the initial schema."""
+    for table_name, column_name, ddl, backfill in _PORTABLE_COLUMNS:
+        try:
+            with engine.begin() as conn:
+                existing = {col["name"] for col in inspect(conn).get_columns(table_name)}
+                if column_name in existing:
+                    continue
+                conn.execute(text(ddl))
+                if callable(backfill):
+                    backfill(conn)
+                elif backfill is not None:
+                    conn.execute(backfill)
+        except Exception:
+            continue
+
+
+def _ensure_indexes():
+    """Create indexes declared on models that predate the table (create_all skips them)."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                with engine.begin() as conn:
+                    index.create(conn, checkfirst=True)
+            except Exception:
+                continue
+
+
 # Create tables if they don't exist
 Base.metadata.create_all(engine)
 _ensure_legacy_columns()
+_ensure_columns()
+_ensure_indexes()
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -111,3 +233,5 @@ def init_db():
     Base.metadata.create_all(bind=engine)
     if IS_SQLITE:
         _ensure_legacy_columns()
+    _ensure_columns()
+    _ensure_indexes()
@@ -1,9 +1,12 @@
 """SQLAlchemy Models for AidSec Lead Dashboard"""
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Boolean, ForeignKey, Enum as SQLEnum, Index
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Boolean, ForeignKey, Enum as SQLEnum, Index, text
+from sqlalchemy.orm import relationship, declarative_base, validates
 from datetime import datetime
 import enum
 
+from utils.dedupe import firma_key
+from utils.domains import domain_norm, email_norm
+
 Base = declarative_base()
 
 
@@ -40,6 +43,10 @@ class Lead(Base):
         Index("ix_leads_ranking_grade", "ranking_grade"),
         Index("ix_leads_research_status", "research_status"),
         Index("ix_leads_stadt", "stadt"),
+        Index("ix_leads_status_ranking_checked_at", "status", "ranking_checked_at"),
+        Index("ix_leads_email_norm", "email_norm"),
+        Index("ix_leads_domain_norm", "domain_norm"),
+        Index("ix_leads_firma_key", "firma_key"),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -49,6 +56,11 @@ class Lead(Base):
     telefon = Column(String(50), nullable=True)
     stadt = Column(String(100), nullable=True)
     kategorie = Column(SQLEnum(LeadKategorie), default=LeadKategorie.ANWALT)
+
+    # Duplicate-detection keys (utils.domains, utils.dedupe), kept in sync with email/website/firma
+    email_norm = Column(String(255), nullable=True)
+    domain_norm = Column(String(255), nullable=True)
+    firma_key = Column(String(255), nullable=True)
     status = Column(SQLEnum(LeadStatus), default=LeadStatus.OFFEN)
     
     # Financials & Stats
@@ -75,6 +87,7 @@ class Lead(Base):
     # Research fields (web scraping)
     research_status = Column(String(20), nullable=True)  # pending, in_progress, completed, failed
     research_last = Column(DateTime, nullable=True)
+    research_claimed_at = Column(DateTime, nullable=True)  # when research_status last became in_progress
     research_data = Column(JSON, nullable=True)
 
     # Social profiles
@@ -87,6 +100,21 @@ class Lead(Base):
     follow_ups = relationship("FollowUp", back_populates="lead", cascade="all, delete-orphan")
     enrichment = relationship("LeadEnrichment", back_populates="lead", uselist=False, cascade="all, delete-orphan")
 
+    @validates("email")
+    def _sync_email_norm(self, key, value):
+        self.email_norm = email_norm(value)
+        return value
+
+    @validates("website")
+    def _sync_domain_norm(self, key, value):
+        self.domain_norm = domain_norm(value)
+        return value
+
+    @validates("firma")
+    def _sync_firma_key(self, key, value):
+        self.firma_key = firma_key(value)
+        return value
+
     def __repr__(self):
         return f"<Lead(id={self.id}, firma='{self.firma}', status='{self.status}')>"
 
@@ -116,6 +144,10 @@ class LeadEnrichment(Base):
 
 class StatusHistory(Base):
     __tablename__ = "status_history"
+    __table_args__ = (
+        Index("ix_statushistory_lead_id", "lead_id"),
+        Index("ix_statushistory_zu_status_datum", "zu_status", "datum"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     lead_id = Column(Integer, ForeignKey("leads.id"), nullable=False)
@@ -385,12 +417,21 @@ class AgentTask(Base):
         Index("ix_agent_tasks_agent", "assigned_to"),
         Index("ix_agent_tasks_lease_until", "lease_until"),
         Index("ix_agent_tasks_next_retry_at", "next_retry_at"),
+        Index("ix_agent_tasks_task_type", "task_type"),
+        Index("ix_agent_tasks_lane", "status", "source", "agent_hint", text("priority DESC"), "created_at"),
+        Index("ix_agent_tasks_status_lease_until", "status", "lease_until"),
+        Index("ix_agent_tasks_status_next_retry_at", "status", "next_retry_at"),
+        Index("ix_agent_tasks_status_created_at", "status", "created_at"),
+        Index("ix_agent_tasks_status_type_hint_source", "status", "task_type", "agent_hint", "source"),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     task_type = Column(String(50), nullable=False)
     lead_id = Column(Integer, ForeignKey("leads.id"), nullable=True)
     payload = Column(JSON, nullable=True)
+    agent_hint = Column(String(100), nullable=True)  # preferred agent_id, mirrors payload["agent_hint"]
+    source = Column(String(20), default="manual", server_default="manual")  # manual / followup / campaign
+    priority = Column(Integer, default=0, server_default="0")  # higher is claimed first within a source
     status = Column(String(20), default="pending")
     assigned_to = Column(String(100), nullable=True)
     lease_token = Column(String(64), nullable=True)
@@ -408,3 +449,48 @@ class AgentTask(Base):
 
     def __repr__(self):
         return f"<AgentTask(type='{self.task_type}', status='{self.status}')>"
+
+
+class AgentTaskMetric(Base):
+    """Per-minute queue event counters; latency events are split into histogram buckets."""
+    __tablename__ = "agent_task_metrics"
+    __table_args__ = (
+        Index("ux_agent_task_metrics_key", "bucket_start", "event", "task_type", "latency_le", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    bucket_start = Column(DateTime, nullable=False)
+    event = Column(String(30), nullable=False)  # claimed, completed, retried, dead_lettered, lease_expired
+    task_type = Column(String(50), nullable=False, default="*")
+    latency_le = Column(Integer, nullable=False, default=0)  # histogram upper bound in seconds, -1 = +Inf, 0 = n/a
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AgentTaskMetric({self.bucket_start} {self.event} {self.task_type} le={self.latency_le}: {self.count})>"
+
+
+class RankingCache(Base):
+    """Latest ranking check per website host, shared by every worker."""
+    __tablename__ = "ranking_cache"
+    __table_args__ = (
+        Index("ux_ranking_cache_domain", "domain", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    domain = Column(String(255), nullable=False)
+    url = Column(String(500), nullable=True)
+    grade = Column(String(1), nullable=True)
+    score = Column(Integer, nullable=True)
+    result = Column(JSON, nullable=True)  # full RankingService.check_url() result
+    checked_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    # Validators for conditional re-scans
+    etag = Column(String(255), nullable=True)
+    last_modified = Column(String(64), nullable=True)
+    headers_hash = Column(String(64), nullable=True)  # sha256 of the graded security headers
+    validated_at = Column(DateTime, nullable=True)
+    scan_count = Column(Integer, nullable=False, default=0, server_default="0")  # full fetch + grade
+    unchanged_count = Column(Integer, nullable=False, default=0, server_default="0")  # re-scans that reused the grade
+
+    def __repr__(self):
+        return f"<RankingCache(domain='{self.domain}', grade='{self.grade}')>"
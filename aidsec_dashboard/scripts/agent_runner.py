@@ -2,6 +2,7 @@
 
 Usage (example):
     python scripts/agent_runner.py --agent-id agent1
+    python scripts/agent_runner.py --agent-id agent1 --concurrency 8
 """
 from __future__ import annotations
 
@@ -12,10 +13,12 @@ import signal
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any
 
 import requests
+from requests.adapters import HTTPAdapter
 
 
 @dataclass
@@ -27,6 +30,9 @@ class RunnerConfig:
     lease_seconds: int = 300
     heartbeat_interval_seconds: int = 60
     poll_interval_seconds: int = 10
+    pull_wait_seconds: int = 25
+    batch_size: int = 1
+    concurrency: int = 1
     request_timeout_seconds: int = 30
     once: bool = False
 
@@ -36,6 +42,12 @@ class AgentRunner:
         self.config = config
         self.stop_event = threading.Event()
         self.session = requests.Session()
+        # One pooled connection per worker plus pull and heartbeat calls.
+        adapter = HTTPAdapter(pool_maxsize=max(10, config.concurrency + 2))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.in_flight: dict[int, str] = {}
+        self.in_flight_changed = threading.Condition()
         self.logger = logging.getLogger(f"agent_runner.{config.agent_id}")
 
     @property
@@ -62,7 +74,9 @@ class AgentRunner:
             params={
                 "agent_id": self.config.agent_id,
                 "lease_seconds": self.config.lease_seconds,
+                "wait_seconds": self.config.pull_wait_seconds,
             },
+            timeout=self.config.request_timeout_seconds + self.config.pull_wait_seconds,
         )
         if response.status_code == 401:
             raise RuntimeError("Unauthorized: check API_KEY / AGENT_API_KEYS configuration")
@@ -73,6 +87,55 @@ class AgentRunner:
         data = response.json()
         return data.get("task")
 
+    def pull_batch(self, max_tasks: int) -> list[dict[str, Any]]:
+        response = self._request(
+            "POST",
+            "/agents/tasks/pull-batch",
+            params={
+                "agent_id": self.config.agent_id,
+                "max": max_tasks,
+                "lease_seconds": self.config.lease_seconds,
+                "wait_seconds": self.config.pull_wait_seconds,
+            },
+            timeout=self.config.request_timeout_seconds + self.config.pull_wait_seconds,
+        )
+        if response.status_code == 401:
+            raise RuntimeError("Unauthorized: check API_KEY / AGENT_API_KEYS configuration")
+        if response.status_code == 403:
+            raise RuntimeError(f"Forbidden for agent_id={self.config.agent_id}; check AGENT_API_KEYS mapping")
+
+        response.raise_for_status()
+        return response.json().get("tasks") or []
+
+    def heartbeat_batch(self, leases: list[tuple[int, str]]) -> None:
+        response = self._request(
+            "POST",
+            "/agents/tasks/heartbeat-batch",
+            params={
+                "agent_id": self.config.agent_id,
+                "lease_seconds": self.config.lease_seconds,
+            },
+            json={"items": [{"task_id": task_id, "lease_token": token} for task_id, token in leases]},
+        )
+        response.raise_for_status()
+        for item in response.json().get("results", []):
+            if not item.get("success"):
+                self.logger.warning("Heartbeat rejected for task %s: %s", item.get("task_id"), item.get("message"))
+
+    def complete_batch(self, outcomes: list[dict[str, Any]]) -> None:
+        response = self._request(
+            "POST",
+            "/agents/tasks/complete-batch",
+            params={"agent_id": self.config.agent_id},
+            json={"items": outcomes},
+        )
+        response.raise_for_status()
+        for item in response.json().get("results", []):
+            if item.get("success"):
+                self.logger.info("Completed task id=%s: %s", item.get("task_id"), item.get("message"))
+            else:
+                self.logger.warning("Completion rejected for task %s: %s", item.get("task_id"), item.get("message"))
+
     def heartbeat(self, task_id: int, lease_token: str) -> None:
         response = self._request(
             "POST",
@@ -115,6 +178,53 @@ class AgentRunner:
             except Exception as exc:  # pragma: no cover
                 self.logger.warning("Heartbeat failed for task %s: %s", task_id, exc)
 
+    def _run_batch_heartbeat_loop(self, leases: list[tuple[int, str]], heartbeat_stop_event: threading.Event) -> None:
+        while not heartbeat_stop_event.wait(self.config.heartbeat_interval_seconds):
+            try:
+                self.heartbeat_batch(leases)
+            except Exception as exc:  # pragma: no cover
+                self.logger.warning("Batch heartbeat failed: %s", exc)
+
+    def _process_batch(self, tasks: list[dict[str, Any]]) -> None:
+        """Execute a claimed batch with one shared heartbeat and a single batched completion."""
+        leases = [(int(task["id"]), task["lease_token"]) for task in tasks]
+        self.logger.info("Pulled batch of %s tasks: %s", len(tasks), [task_id for task_id, _ in leases])
+
+        heartbeat_stop_event = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=self._run_batch_heartbeat_loop,
+            args=(leases, heartbeat_stop_event),
+            daemon=True,
+            name="heartbeat-batch",
+        )
+        heartbeat_thread.start()
+
+        outcomes: list[dict[str, Any]] = []
+        try:
+            for task in tasks:
+                try:
+                    success, result, error = self.execute_task(task)
+                except Exception as exc:
+                    success, result, error = False, None, f"Task execution error: {exc}"
+                outcome: dict[str, Any] = {
+                    "task_id": int(task["id"]),
+                    "lease_token": task["lease_token"],
+                    "success": success,
+                }
+                if result is not None:
+                    outcome["result"] = result
+                if error is not None:
+                    outcome["error"] = error
+                outcomes.append(outcome)
+        finally:
+            heartbeat_stop_event.set()
+            heartbeat_thread.join(timeout=2)
+
+        try:
+            self.complete_batch(outcomes)
+        except Exception as exc:
+            self.logger.exception("Failed to complete batch %s: %s", [o["task_id"] for o in outcomes], exc)
+
     def _execute_generate_draft_task(self, task: dict[str, Any]) -> tuple[bool, dict[str, Any] | None, str | None]:
         lead_id = task.get("lead_id")
         payload = task.get("payload") or {}
@@ -151,17 +261,135 @@ class AgentRunner:
             return self._execute_generate_draft_task(task)
         return False, None, f"Unsupported task type: {task_type}"
 
+    def _run_shared_heartbeat_loop(self, heartbeat_stop_event: threading.Event) -> None:
+        """Renew every in-flight lease with one heartbeat-batch call per interval."""
+        while not heartbeat_stop_event.wait(self.config.heartbeat_interval_seconds):
+            with self.in_flight_changed:
+                leases = list(self.in_flight.items())
+            if not leases:
+                continue
+            try:
+                self.heartbeat_batch(leases)
+            except Exception as exc:  # pragma: no cover
+                self.logger.warning("Shared heartbeat failed for %s tasks: %s", len(leases), exc)
+
+    def _run_pooled_task(self, task: dict[str, Any]) -> None:
+        task_id = int(task["id"])
+        lease_token = task["lease_token"]
+        try:
+            try:
+                success, result, error = self.execute_task(task)
+            except Exception as exc:
+                success, result, error = False, None, f"Task execution error: {exc}"
+
+            try:
+                self.complete(task_id, lease_token, success=success, result=result, error=error)
+                if success:
+                    self.logger.info("Completed task id=%s successfully", task_id)
+                else:
+                    self.logger.warning("Completed task id=%s as failed: %s", task_id, error)
+            except Exception as exc:
+                self.logger.exception("Failed to complete task id=%s: %s", task_id, exc)
+        finally:
+            with self.in_flight_changed:
+                self.in_flight.pop(task_id, None)
+                self.in_flight_changed.notify_all()
+
+    def run_concurrent(self) -> None:
+        """Keep up to `concurrency` tasks in flight; drain them before returning on stop()."""
+        concurrency = self.config.concurrency
+        self.logger.info(
+            "Agent runner started (agent_id=%s, api=%s, concurrency=%s)",
+            self.config.agent_id,
+            self.config.api_base_url,
+            concurrency,
+        )
+
+        heartbeat_stop_event = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=self._run_shared_heartbeat_loop,
+            args=(heartbeat_stop_event,),
+            daemon=True,
+            name="heartbeat-shared",
+        )
+        heartbeat_thread.start()
+
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="agent-task")
+        try:
+            while not self.stop_event.is_set():
+                with self.in_flight_changed:
+                    while len(self.in_flight) >= concurrency and not self.stop_event.is_set():
+                        self.in_flight_changed.wait(timeout=1)
+                    free_slots = concurrency - len(self.in_flight)
+                if self.stop_event.is_set():
+                    break
+
+                try:
+                    pull_started = time.monotonic()
+                    tasks = self.pull_batch(free_slots)
+                except Exception as exc:
+                    self.logger.error("Pull failed: %s", exc)
+                    if self.config.once:
+                        raise
+                    self.stop_event.wait(max(5, self.config.poll_interval_seconds))
+                    continue
+
+                if not tasks:
+                    if self.config.once:
+                        self.logger.info("No task available in once mode. Exiting.")
+                        break
+                    if self.config.pull_wait_seconds <= 0 or time.monotonic() - pull_started < 1:
+                        self.stop_event.wait(self.config.poll_interval_seconds)
+                    continue
+
+                for task in tasks:
+                    task_id = int(task["id"])
+                    self.logger.info("Pulled task id=%s type=%s lead_id=%s", task_id, task.get("type"), task.get("lead_id"))
+                    with self.in_flight_changed:
+                        self.in_flight[task_id] = task["lease_token"]
+                    executor.submit(self._run_pooled_task, task)
+
+                if self.config.once:
+                    break
+        finally:
+            with self.in_flight_changed:
+                draining = len(self.in_flight)
+            if draining:
+                self.logger.info("Draining %s in-flight tasks before exit", draining)
+            # Heartbeats keep running until every in-flight task has completed.
+            executor.shutdown(wait=True)
+            heartbeat_stop_event.set()
+            heartbeat_thread.join(timeout=2)
+            self.logger.info("Agent runner stopped")
+
     def run_forever(self) -> None:
+        if self.config.concurrency > 1:
+            self.run_concurrent()
+            return
+
         self.logger.info("Agent runner started (agent_id=%s, api=%s)", self.config.agent_id, self.config.api_base_url)
 
         while not self.stop_event.is_set():
             try:
-                task = self.pull_task()
+                pull_started = time.monotonic()
+                if self.config.batch_size > 1:
+                    tasks = self.pull_batch(self.config.batch_size)
+                    if tasks:
+                        self._process_batch(tasks)
+                        if self.config.once:
+                            return
+                        continue
+                    task = None
+                else:
+                    task = self.pull_task()
                 if not task:
                     if self.config.once:
                         self.logger.info("No task available in once mode. Exiting.")
                         return
-                    time.sleep(self.config.poll_interval_seconds)
+                    # A long-poll that returned empty already waited; only sleep if the
+                    # server answered immediately (long-poll disabled or unsupported).
+                    if self.config.pull_wait_seconds <= 0 or time.monotonic() - pull_started < 1:
+                        self.stop_event.wait(self.config.poll_interval_seconds)
                     continue
 
                 task_id = int(task["id"])
@@ -226,6 +454,9 @@ def _build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--lease-seconds", type=int, default=int(os.getenv("AIDSEC_LEASE_SECONDS", "300")))
     parser.add_argument("--heartbeat-interval-seconds", type=int, default=int(os.getenv("AIDSEC_HEARTBEAT_INTERVAL_SECONDS", "60")))
     parser.add_argument("--poll-interval-seconds", type=int, default=int(os.getenv("AIDSEC_POLL_INTERVAL_SECONDS", "10")))
+    parser.add_argument("--pull-wait-seconds", type=int, default=int(os.getenv("AIDSEC_PULL_WAIT_SECONDS", "25")))
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("AIDSEC_BATCH_SIZE", "1")))
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("AIDSEC_CONCURRENCY", "1")))
     parser.add_argument("--request-timeout-seconds", type=int, default=int(os.getenv("AIDSEC_REQUEST_TIMEOUT_SECONDS", "30")))
     parser.add_argument("--once", action="store_true", default=False)
     parser.add_argument("--log-level", default=os.getenv("AIDSEC_AGENT_LOG_LEVEL", "INFO"))
@@ -242,6 +473,12 @@ def _validate_config(config: RunnerConfig) -> None:
 
     if config.heartbeat_interval_seconds >= config.lease_seconds:
         raise ValueError("heartbeat_interval_seconds must be lower than lease_seconds")
+    if not 0 <= config.pull_wait_seconds <= 60:
+        raise ValueError("pull_wait_seconds must be between 0 and 60")
+    if not 1 <= config.batch_size <= 50:
+        raise ValueError("batch_size must be between 1 and 50")
+    if not 1 <= config.concurrency <= 50:
+        raise ValueError("concurrency must be between 1 and 50")
 
 
 def main() -> int:
@@ -261,6 +498,9 @@ def main() -> int:
         lease_seconds=args.lease_seconds,
         heartbeat_interval_seconds=args.heartbeat_interval_seconds,
         poll_interval_seconds=args.poll_interval_seconds,
+        pull_wait_seconds=args.pull_wait_seconds,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
         request_timeout_seconds=args.request_timeout_seconds,
         once=bool(args.once),
     )
@@ -0,0 +1,124 @@
+"""Re-run the research, scraper or ranking parsers over pages in the response cache.
+
+Nothing is fetched: the services' sessions are switched to offline mode, so
+pages that were never stored simply come back empty. Results are written as
+JSON lines to stdout and a field-coverage summary to stderr, which makes it
+easy to compare extraction heuristics before and after a change.
+
+Usage (example):
+    python scripts/reextract_from_cache.py --service research
+    python scripts/reextract_from_cache.py --service scraper --limit 200 > scraper.jsonl
+    python scripts/reextract_from_cache.py --service ranking --url example.ch
+    python scripts/reextract_from_cache.py --stats
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+from collections import Counter
+from typing import Any, Callable, Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.response_cache_service import get_response_store, mount_response_cache  # noqa: E402
+
+SUMMARY_FIELDS = {
+    "research": ("email", "phone", "address", "linkedin", "xing"),
+    "scraper": ("about_us", "mission_statement", "services_offered"),
+    "ranking": ("grade", "cms_detected"),
+}
+
+
+def _targets(args: argparse.Namespace) -> Iterator[tuple[int | None, str]]:
+    if args.url:
+        for url in args.url:
+            yield None, url
+        return
+
+    from database.database import get_session
+    from database.models import Lead
+
+    db = get_session()
+    try:
+        query = db.query(Lead.id, Lead.website).filter(Lead.website.isnot(None), Lead.website != "")
+        if args.lead_id:
+            query = query.filter(Lead.id.in_(args.lead_id))
+        query = query.order_by(Lead.id.asc())
+        if args.limit:
+            query = query.limit(args.limit)
+        yield from query.all()
+    finally:
+        db.close()
+
+
+def _extractor(service: str) -> Callable[[str], dict[str, Any]]:
+    if service == "research":
+        from services.research_service import ResearchService
+
+        research = ResearchService()
+        mount_response_cache(research.session, "research", offline=True)
+        return research.research_lead
+
+    if service == "scraper":
+        from services.scraper_service import ScraperService
+
+        scraper = ScraperService()
+        mount_response_cache(scraper.session, "scraper", offline=True)
+        return scraper.scrape_company_info
+
+    from services.ranking_service import RankingService
+
+    ranking = RankingService()
+    store = get_response_store()
+    return lambda url: ranking.check_url_from_store(url, store)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Re-extract lead data from the HTTP response cache (offline)")
+    parser.add_argument("--service", choices=sorted(SUMMARY_FIELDS), default="research")
+    parser.add_argument("--url", action="append", help="Website to re-extract (repeatable); default: all leads")
+    parser.add_argument("--lead-id", action="append", type=int, help="Restrict to these lead ids (repeatable)")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--stats", action="store_true", help="Print response cache statistics and exit")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser
+
+
+def main() -> int:
+    args = _build_parser().parse_args()
+    logging.basicConfig(
+        level=getattr(logging, str(args.log_level).upper(), logging.WARNING),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    store = get_response_store()
+    if store is None:
+        logging.getLogger("reextract").error("HTTP response cache is disabled or unavailable (HTTP_CACHE_ENABLED)")
+        return 2
+    if args.stats:
+        print(json.dumps(store.stats(), indent=2))
+        return 0
+
+    extract = _extractor(args.service)
+    fields = SUMMARY_FIELDS[args.service]
+    found: Counter[str] = Counter()
+    total = 0
+    for lead_id, website in _targets(args):
+        try:
+            result = extract(website)
+        except Exception as exc:
+            result = {"error": str(exc)}
+        total += 1
+        found.update(name for name in fields if result.get(name))
+        print(json.dumps({"lead_id": lead_id, "website": website, "result": result}, default=str), flush=True)
+
+    summary = ", ".join(f"{name}={found[name]}" for name in fields)
+    print(f"{total} sites re-extracted offline ({args.service}): {summary}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Incrementally maintained metrics for the agent task queue.
+
+Queue events are counted into per-minute rows of ``agent_task_metrics``, so
+a scrape only sums the last hour of buckets plus a few indexed gauges over
+``agent_tasks`` -- no full scans. The reaper records its events in its own
+transaction. Claims and completions are hot paths, and every concurrent caller
+would upsert the same counter row, so they add to ``pending_queue_events`` in
+memory instead. That buffer is written in one short transaction by the reaper
+pass and before each metrics scrape (``flush_queue_events``).
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Iterable
+
+from sqlalchemy import delete, func
+from sqlalchemy.orm import Session
+
+from database.models import AgentTask, AgentTaskMetric
+
+# Upper bounds (seconds) of the latency histogram buckets; -1 stands for +Inf.
+LATENCY_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 21600, 86400, -1)
+WINDOWS_MINUTES = (5, 15, 60)
+RETENTION_HOURS = 24
+
+EventKey = tuple[str, str, int]
+
+logger = logging.getLogger(__name__)
+
+
+def _bucket_start(moment: datetime) -> datetime:
+    return moment.replace(second=0, microsecond=0)
+
+
+def latency_bucket(seconds: float) -> int:
+    for bound in LATENCY_BUCKETS:
+        if bound == -1 or seconds <= bound:
+            return bound
+    return -1
+
+
+def event_key(event: str, task_type: str | None = None, latency_seconds: float | None = None) -> EventKey:
+    le = latency_bucket(max(0.0, latency_seconds)) if latency_seconds is not None else 0
+    return (event, task_type or "*", le)
+
+
+def record_queue_events(db: Session, events: Counter | Iterable[EventKey], now: datetime | None = None) -> None:
+    """Add event counts to the current minute bucket; the caller commits."""
+    counts = events if isinstance(events, Counter) else Counter(events)
+    if not counts:
+        return
+
+    bucket = _bucket_start(now or datetime.utcnow())
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    rows = [
+        {"bucket_start": bucket, "event": event, "task_type": task_type, "latency_le": le, "count": n}
+        for (event, task_type, le), n in counts.items()
+    ]
+    stmt = insert(AgentTaskMetric).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["bucket_start", "event", "task_type", "latency_le"],
+        set_={"count": AgentTaskMetric.count + stmt.excluded.count},
+    )
+    db.execute(stmt)
+
+
+class QueueEventBuffer:
+    """Event counts per minute bucket, held in process until ``flush_queue_events``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: dict[datetime, Counter] = defaultdict(Counter)
+
+    def add(self, events: Counter | Iterable[EventKey], now: datetime | None = None) -> None:
+        counts = events if isinstance(events, Counter) else Counter(events)
+        if not counts:
+            return
+        bucket = _bucket_start(now or datetime.utcnow())
+        with self._lock:
+            self._pending[bucket].update(counts)
+
+    def take(self) -> dict[datetime, Counter]:
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(Counter)
+        return pending
+
+    def restore(self, pending: dict[datetime, Counter]) -> None:
+        with self._lock:
+            for bucket, counts in pending.items():
+                self._pending[bucket].update(counts)
+
+
+pending_queue_events = QueueEventBuffer()
+
+
+def flush_queue_events(db: Session) -> int:
+    """Write buffered events in one short transaction of their own; returns the events written.
+
+    Commits ``db`` (call it on a session without other pending work). On
+    failure the counts go back into the buffer for the next flush.
+    """
+    pending = pending_queue_events.take()
+    if not pending:
+        return 0
+    try:
+        for bucket, counts in sorted(pending.items()):
+            record_queue_events(db, counts, now=bucket)
+        db.commit()
+    except Exception:
+        db.rollback()
+        pending_queue_events.restore(pending)
+        logger.warning("Could not flush agent queue metrics; retrying on the next flush", exc_info=True)
+        return 0
+    return sum(sum(counts.values()) for counts in pending.values())
+
+
+def prune_queue_metrics(db: Session, now: datetime | None = None) -> int:
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=RETENTION_HOURS)
+    result = db.execute(
+        delete(AgentTaskMetric)
+        .where(AgentTaskMetric.bucket_start < cutoff)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
+
+
+def _quantile(histogram: dict[int, int], q: float) -> float | None:
+    """Linear interpolation inside the histogram bucket holding the q-quantile."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    target = q * total
+    cumulative = 0
+    lower = 0
+    for bound in LATENCY_BUCKETS:
+        in_bucket = histogram.get(bound, 0)
+        if in_bucket and cumulative + in_bucket >= target:
+            if bound == -1:
+                return float(lower)
+            return round(lower + (bound - lower) * (target - cumulative) / in_bucket, 1)
+        cumulative += in_bucket
+        if bound != -1:
+            lower = bound
+    return float(lower)
+
+
+def _latency_summary(histogram: dict[int, int]) -> dict[str, Any]:
+    return {
+        "p50": _quantile(histogram, 0.5),
+        "p90": _quantile(histogram, 0.9),
+        "p99": _quantile(histogram, 0.99),
+        "buckets": {("+Inf" if le == -1 else str(le)): histogram.get(le, 0) for le in LATENCY_BUCKETS},
+    }
+
+
+def compute_queue_metrics(db: Session) -> dict[str, Any]:
+    flush_queue_events(db)
+    now = datetime.utcnow()
+
+    # --- Gauges (served by the (status, task_type, agent_hint, source) and (status, created_at) indexes) ---
+    depth_rows = (
+        db.query(AgentTask.task_type, AgentTask.agent_hint, AgentTask.source, func.count())
+        .filter(AgentTask.status == "pending")
+        .group_by(AgentTask.task_type, AgentTask.agent_hint, AgentTask.source)
+        .all()
+    )
+    by_task_type: Counter = Counter()
+    by_agent_hint: Counter = Counter()
+    by_source: Counter = Counter()
+    by_type_and_hint: Counter = Counter()
+    for task_type, agent_hint, source, count in depth_rows:
+        by_task_type[task_type] += count
+        by_agent_hint[agent_hint or "unhinted"] += count
+        by_source[source or "manual"] += count
+        by_type_and_hint[(task_type, agent_hint)] += count
+
+    oldest_pending = db.query(func.min(AgentTask.created_at)).filter(AgentTask.status == "pending").scalar()
+    processing = db.query(func.count(AgentTask.id)).filter(AgentTask.status == "processing").scalar() or 0
+
+    # --- Sliding windows over the per-minute counters ---
+    current_bucket = _bucket_start(now)
+    oldest_bucket = current_bucket - timedelta(minutes=max(WINDOWS_MINUTES) - 1)
+    counter_rows = (
+        db.query(AgentTaskMetric.bucket_start, AgentTaskMetric.event, AgentTaskMetric.latency_le, func.sum(AgentTaskMetric.count))
+        .filter(AgentTaskMetric.bucket_start >= oldest_bucket)
+        .group_by(AgentTaskMetric.bucket_start, AgentTaskMetric.event, AgentTaskMetric.latency_le)
+        .all()
+    )
+
+    windows: dict[str, Any] = {}
+    for minutes in WINDOWS_MINUTES:
+        window_start = current_bucket - timedelta(minutes=minutes - 1)
+        events: Counter = Counter()
+        claim_wait: Counter = Counter()
+        completion: Counter = Counter()
+        for bucket_start, event, le, count in counter_rows:
+            if bucket_start < window_start:
+                continue
+            events[event] += int(count)
+            if event == "claimed" and le:
+                claim_wait[le] += int(count)
+            elif event == "completed" and le:
+                completion[le] += int(count)
+
+        elapsed_seconds = max(1.0, (now - window_start).total_seconds())
+        outcomes = events["completed"] + events["retried"] + events["dead_lettered"]
+        windows[f"{minutes}m"] = {
+            "claims": events["claimed"],
+            "claims_per_sec": round(events["claimed"] / elapsed_seconds, 3),
+            "completed": events["completed"],
+            "completed_per_sec": round(events["completed"] / elapsed_seconds, 3),
+            "retries": events["retried"],
+            "dead_letters": events["dead_lettered"],
+            "lease_expirations": events["lease_expired"],
+            "retry_rate": round(events["retried"] / outcomes, 3) if outcomes else 0.0,
+            "dead_letter_rate": round(events["dead_lettered"] / outcomes, 3) if outcomes else 0.0,
+            "claim_wait_seconds": _latency_summary(claim_wait),
+            "completion_latency_seconds": _latency_summary(completion),
+        }
+
+    return {
+        "generated_at": now.isoformat(),
+        "pending": {
+            "total": sum(by_task_type.values()),
+            "by_task_type": dict(by_task_type),
+            "by_agent_hint": dict(by_agent_hint),
+            "by_source": dict(by_source),
+            "by_task_type_and_hint": [
+                {"task_type": task_type, "agent_hint": agent_hint, "count": count}
+                for (task_type, agent_hint), count in by_type_and_hint.items()
+            ],
+        },
+        "processing": processing,
+        "oldest_pending_age_seconds": round((now - oldest_pending).total_seconds(), 1) if oldest_pending else None,
+        "windows": windows,
+    }
@@ -0,0 +1,505 @@
+"""Claim engine for the OpenClaw agent task queue.
+
+A claim is a single ``UPDATE ... WHERE id = (SELECT ... LIMIT 1) RETURNING``
+statement. On Postgres the inner select uses ``FOR UPDATE SKIP LOCKED`` so
+concurrent agents step over rows another transaction is claiming instead of
+losing a race; on SQLite the statement runs under the database write lock,
+which makes select-and-update atomic as well.
+
+Candidates are split into lanes by ``source`` (manual, followup, campaign).
+A weighted fair scheduler (stride scheduling) picks which lane each claim tries first, so a
+bulk follow-up burst cannot starve interactive tasks; within a lane tasks go
+by ``priority`` (highest first), then age.
+
+Lease expiry, dead-lettering and retry release run in a periodic reaper
+(``reap_agent_tasks``) so the pull path only claims.
+
+Long-polling pulls wait on an in-process notifier that is signalled after a
+commit enqueues work; on Postgres a LISTEN thread forwards ``NOTIFY`` from
+other API processes to the same notifier.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import event, func, or_, select, text, update
+from sqlalchemy.orm import Session
+
+from database.database import get_session
+from database.models import AgentTask
+from services.agent_queue_metrics_service import (
+    event_key,
+    flush_queue_events,
+    pending_queue_events,
+    prune_queue_metrics,
+    record_queue_events,
+)
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "agent_tasks"
+
+SOURCE_MANUAL = "manual"
+SOURCE_FOLLOWUP = "followup"
+SOURCE_CAMPAIGN = "campaign"
+
+PRIORITY_BULK = 0
+PRIORITY_INTERACTIVE = 100
+
+# Claim share per lane when every lane has work; override with
+# AGENT_TASK_SOURCE_WEIGHTS="manual=6,followup=1,campaign=2".
+DEFAULT_SOURCE_WEIGHTS = {SOURCE_MANUAL: 6, SOURCE_CAMPAIGN: 2, SOURCE_FOLLOWUP: 1}
+
+_CLAIM_COLUMNS = (
+    AgentTask.id,
+    AgentTask.task_type,
+    AgentTask.lead_id,
+    AgentTask.payload,
+    AgentTask.lease_token,
+    AgentTask.lease_until,
+    AgentTask.created_at,
+    AgentTask.source,
+    AgentTask.priority,
+)
+
+
+_AFTER_COMMIT_KEY = "agent_queue_after_commit"
+
+
+def after_commit(db: Session, callback) -> None:
+    """Run ``callback()`` once the session's current transaction commits; dropped if it rolls back."""
+    callbacks = db.info.get(_AFTER_COMMIT_KEY)
+    if callbacks is None:
+        callbacks = db.info[_AFTER_COMMIT_KEY] = []
+        event.listen(db, "after_commit", _run_after_commit)
+        event.listen(db, "after_transaction_end", _drop_after_commit)
+    if not db.in_transaction():
+        db.begin()  # bind the callback to a transaction that commit/rollback will end
+    callbacks.append(callback)
+
+
+def _run_after_commit(session: Session) -> None:
+    callbacks = session.info.get(_AFTER_COMMIT_KEY) or []
+    pending, callbacks[:] = list(callbacks), []
+    for callback in pending:
+        callback()
+
+
+def _drop_after_commit(session: Session, transaction) -> None:
+    # Fires after after_commit on success; whatever is left belonged to a rolled-back transaction.
+    if transaction.parent is None:
+        session.info.get(_AFTER_COMMIT_KEY, []).clear()
+
+
+def _is_sqlite(db: Session) -> bool:
+    bind = db.get_bind()
+    return bind.dialect.name == "sqlite"
+
+
+def _batch_ids(*conditions, order_by, limit: int):
+    """Subquery selecting at most ``limit`` ids so housekeeping updates stay bounded."""
+    return select(AgentTask.id).where(*conditions).order_by(order_by).limit(limit).scalar_subquery()
+
+
+def _execute_counted(db: Session, stmt, event: str, events: Counter) -> int:
+    """Run a bulk UPDATE and count affected rows per task type into ``events``."""
+    if db.get_bind().dialect.update_returning:
+        task_types = db.execute(stmt.returning(AgentTask.task_type)).scalars().all()
+        for task_type in task_types:
+            events[event_key(event, task_type)] += 1
+        return len(task_types)
+    affected = db.execute(stmt).rowcount or 0
+    if affected:
+        events[event_key(event)] += affected
+    return affected
+
+
+def reclaim_expired_leases(db: Session, now: datetime | None = None, limit: int = 500) -> dict[str, int]:
+    """Return up to ``limit`` processing tasks with an expired lease to the queue (or dead-letter them)."""
+    now = now or datetime.utcnow()
+    events: Counter = Counter()
+    # Served by ix_agent_tasks_status_lease_until (status, lease_until).
+    expired = (AgentTask.status == "processing", AgentTask.lease_until < now)
+    exhausted = func.coalesce(AgentTask.attempts, 0) >= func.coalesce(AgentTask.max_attempts, 5)
+
+    dead_lettered = _execute_counted(
+        db,
+        update(AgentTask)
+        .where(AgentTask.id.in_(_batch_ids(*expired, exhausted, order_by=AgentTask.lease_until, limit=limit)))
+        .where(*expired, exhausted)
+        .values(
+            status="dead_letter",
+            error_message=func.coalesce(AgentTask.error_message, "max_attempts_exceeded_after_lease_timeout"),
+            completed_at=now,
+        )
+        .execution_options(synchronize_session=False),
+        "dead_lettered",
+        events,
+    )
+    requeued = _execute_counted(
+        db,
+        update(AgentTask)
+        .where(AgentTask.id.in_(_batch_ids(*expired, ~exhausted, order_by=AgentTask.lease_until, limit=limit)))
+        .where(*expired, ~exhausted)
+        .values(
+            status="pending",
+            assigned_to=None,
+            lease_token=None,
+            lease_until=None,
+            last_heartbeat_at=None,
+            next_retry_at=None,
+        )
+        .execution_options(synchronize_session=False),
+        "lease_expired",
+        events,
+    )
+    record_queue_events(db, events, now=now)
+    return {"requeued": requeued, "dead_lettered": dead_lettered}
+
+
+def release_due_retries(db: Session, now: datetime | None = None, limit: int = 500) -> int:
+    """Clear ``next_retry_at`` on up to ``limit`` pending tasks whose backoff has elapsed."""
+    now = now or datetime.utcnow()
+    # Served by ix_agent_tasks_status_next_retry_at (status, next_retry_at).
+    due = (AgentTask.status == "pending", AgentTask.next_retry_at <= now)
+    released = db.execute(
+        update(AgentTask)
+        .where(AgentTask.id.in_(_batch_ids(*due, order_by=AgentTask.next_retry_at, limit=limit)))
+        .where(*due)
+        .values(next_retry_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return released or 0
+
+
+def reap_agent_tasks(db: Session, batch_limit: int = 500) -> dict[str, int]:
+    """One housekeeping pass: expire leases, dead-letter exhausted tasks, release due retries."""
+    now = datetime.utcnow()
+    summary = reclaim_expired_leases(db, now=now, limit=batch_limit)
+    summary["retries_released"] = release_due_retries(db, now=now, limit=batch_limit)
+    prune_queue_metrics(db, now=now)
+    if summary["requeued"] or summary["retries_released"]:
+        announce_new_tasks(db)
+    db.commit()
+    flush_queue_events(db)
+    return summary
+
+
+def flush_queue_events_with_session() -> int:
+    """Write the buffered claim/completion metrics with a fresh database session."""
+    db = get_session()
+    try:
+        return flush_queue_events(db)
+    finally:
+        db.close()
+
+
+def reap_agent_tasks_with_session(batch_limit: int = 500) -> dict[str, int]:
+    """Run a reaper pass with a fresh database session."""
+    db = get_session()
+    try:
+        return reap_agent_tasks(db, batch_limit=batch_limit)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _ready_filter(now: datetime):
+    return (
+        AgentTask.status == "pending",
+        or_(AgentTask.next_retry_at.is_(None), AgentTask.next_retry_at <= now),
+    )
+
+
+def parse_source_weights(raw: str | None) -> dict[str, int]:
+    """Parse ``source=weight`` pairs; unknown or invalid entries keep the defaults."""
+    weights = dict(DEFAULT_SOURCE_WEIGHTS)
+    for pair in (raw or "").split(","):
+        if "=" not in pair:
+            continue
+        source, value = (part.strip() for part in pair.split("=", 1))
+        if source not in weights:
+            continue
+        try:
+            weights[source] = max(1, int(value))
+        except ValueError:
+            continue
+    return weights
+
+
+class SourceScheduler:
+    """Stride scheduling over task sources.
+
+    Each source has a virtual ``pass``; a claim tries sources in ascending
+    pass order (empty lanes are skipped by the probe chain), and only the
+    source that supplied the task is advanced by ``1 / weight``. Sources whose
+    pass fell behind the served one are lifted to it, so an idle lane cannot
+    bank credit and then monopolise the queue.
+    """
+
+    def __init__(self, weights: dict[str, int]) -> None:
+        self.weights = dict(weights)
+        self._pass = {source: 0.0 for source in self.weights}
+        self._lock = threading.Lock()
+
+    def next_order(self) -> list[str]:
+        with self._lock:
+            return sorted(self.weights, key=lambda source: (self._pass[source], -self.weights[source]))
+
+    def charge(self, source: str | None) -> None:
+        if source not in self.weights:
+            return
+        with self._lock:
+            served = self._pass[source]
+            for other in self._pass:
+                self._pass[other] = max(self._pass[other], served)
+            self._pass[source] = served + 1.0 / self.weights[source]
+
+
+source_scheduler = SourceScheduler(parse_source_weights(os.getenv("AGENT_TASK_SOURCE_WEIGHTS")))
+
+
+def _claim_candidate_id(agent_id: str, now: datetime, is_sqlite: bool, source_order: list[str]):
+    """Id of the next task for ``agent_id``.
+
+    Hint tiers come first (hinted for it, then unhinted, then hinted
+    elsewhere); within a tier lanes are tried in ``source_order``. Each
+    (tier, lane) pair is its own ``LIMIT 1`` probe on ``ix_agent_tasks_lane``
+    (status, source, agent_hint, priority DESC, created_at), so routing does
+    not depend on how deep the backlog of another lane is.
+    """
+    tiers = (
+        AgentTask.agent_hint == agent_id,
+        AgentTask.agent_hint.is_(None),
+        AgentTask.agent_hint != agent_id,
+    )
+    probes = []
+    for hint_filter in tiers:
+        for source in source_order:
+            probe = (
+                select(AgentTask.id)
+                .where(*_ready_filter(now), AgentTask.source == source, hint_filter)
+                .order_by(AgentTask.priority.desc(), AgentTask.created_at.asc(), AgentTask.id.asc())
+                .limit(1)
+            )
+            if not is_sqlite:
+                probe = probe.with_for_update(skip_locked=True)
+            probes.append(probe.scalar_subquery())
+    return func.coalesce(*probes)
+
+
+def _claim_one(
+    db: Session,
+    agent_id: str,
+    lease_token: str,
+    lease_until: datetime,
+    now: datetime,
+    is_sqlite: bool,
+    claimed_ids: list[int],
+):
+    stmt = (
+        update(AgentTask)
+        .where(
+            AgentTask.id == _claim_candidate_id(agent_id, now, is_sqlite, source_scheduler.next_order()),
+            AgentTask.status == "pending",
+        )
+        .values(
+            status="processing",
+            assigned_to=agent_id,
+            lease_token=lease_token,
+            lease_until=lease_until,
+            last_heartbeat_at=now,
+            attempts=func.coalesce(AgentTask.attempts, 0) + 1,
+            error_message=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    if db.get_bind().dialect.update_returning:
+        return db.execute(stmt.returning(*_CLAIM_COLUMNS)).first()
+
+    db.execute(stmt)
+    query = select(*_CLAIM_COLUMNS).where(AgentTask.lease_token == lease_token)
+    if claimed_ids:
+        query = query.where(AgentTask.id.notin_(claimed_ids))
+    return db.execute(query.limit(1)).first()
+
+
+def claim_tasks(db: Session, agent_id: str, lease_seconds: int, limit: int = 1) -> list[dict[str, Any]]:
+    """Atomically lease up to ``limit`` ready tasks to ``agent_id`` under one lease token.
+
+    Each task is claimed by its own single-statement UPDATE, all inside the
+    caller's transaction; the caller must commit. Claim events go to the
+    in-memory metrics buffer after that commit, so claimers never wait on
+    each other's counter-row locks.
+    """
+    now = datetime.utcnow()
+    is_sqlite = _is_sqlite(db)
+    lease_token = uuid.uuid4().hex
+    lease_until = now + timedelta(seconds=lease_seconds)
+
+    claimed: list[dict[str, Any]] = []
+    events: Counter = Counter()
+    for _ in range(max(1, limit)):
+        row = _claim_one(db, agent_id, lease_token, lease_until, now, is_sqlite, [t["id"] for t in claimed])
+        if row is None:
+            break
+        source_scheduler.charge(row.source)
+        wait_seconds = (now - row.created_at).total_seconds() if row.created_at else None
+        events[event_key("claimed", row.task_type, wait_seconds)] += 1
+        claimed.append({
+            "id": row.id,
+            "type": row.task_type,
+            "lead_id": row.lead_id,
+            "payload": row.payload,
+            "source": row.source,
+            "priority": row.priority,
+            "lease_token": row.lease_token,
+            "lease_until": row.lease_until,
+        })
+    if events:
+        after_commit(db, lambda: pending_queue_events.add(events, now=now))
+    return claimed
+
+
+def renew_leases(db: Session, agent_id: str, leases: list[tuple[int, str]], lease_seconds: int) -> set[int]:
+    """Extend the leases of ``(task_id, lease_token)`` pairs owned by ``agent_id``.
+
+    Returns the ids whose lease was renewed; the caller must commit.
+    """
+    if not leases:
+        return set()
+    now = datetime.utcnow()
+    lease_until = now + timedelta(seconds=lease_seconds)
+    renewed: set[int] = set()
+    by_token: dict[str, list[int]] = {}
+    for task_id, token in leases:
+        by_token.setdefault(token, []).append(task_id)
+
+    for token, task_ids in by_token.items():
+        owned = (
+            AgentTask.id.in_(task_ids),
+            AgentTask.status == "processing",
+            AgentTask.assigned_to == agent_id,
+            AgentTask.lease_token == token,
+        )
+        stmt = (
+            update(AgentTask)
+            .where(*owned)
+            .values(last_heartbeat_at=now, lease_until=lease_until)
+            .execution_options(synchronize_session=False)
+        )
+        if db.get_bind().dialect.update_returning:
+            renewed.update(db.execute(stmt.returning(AgentTask.id)).scalars().all())
+        else:
+            ids = db.execute(select(AgentTask.id).where(*owned)).scalars().all()
+            db.execute(stmt)
+            renewed.update(ids)
+    return renewed
+
+
+class TaskNotifier:
+    """Generation counter + asyncio events so waiters never miss a wake-up between claim and wait.
+
+    ``notify`` may be called from any thread (commit hooks, the LISTEN loop);
+    waiters park on an event in their own loop, so a long-poll holds no worker thread.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    @property
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def notify(self) -> None:
+        with self._lock:
+            self._generation += 1
+            waiters = list(self._waiters)
+        for loop, wake in waiters:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:  # loop already closed
+                pass
+
+    async def wait(self, since_generation: int, timeout: float) -> bool:
+        """Wait until notified after ``since_generation`` or ``timeout`` expires."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self._generation != since_generation:
+                return True
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+task_notifier = TaskNotifier()
+
+
+def announce_new_tasks(db: Session) -> None:
+    """Wake long-polling agents once the current transaction commits.
+
+    Call before ``db.commit()`` on any write that makes tasks claimable.
+    """
+    if not _is_sqlite(db):
+        db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": NOTIFY_CHANNEL})
+    after_commit(db, task_notifier.notify)
+
+
+class PostgresTaskListener:
+    """Background LISTEN loop that forwards cross-process NOTIFYs to ``task_notifier``."""
+
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        self.stop_event = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self._loop, name="agent-task-listener", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        while not self.stop_event.is_set():
+            raw = None
+            try:
+                raw = self.engine.raw_connection()
+                raw.detach()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                logger.info("Listening for agent task notifications on '%s'", NOTIFY_CHANNEL)
+                while not self.stop_event.is_set():
+                    for _notify in conn.notifies(timeout=5.0):
+                        task_notifier.notify()
+            except Exception as exc:
+                logger.warning("Agent task listener error: %s", exc)
+                self.stop_event.wait(5)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
@@ -0,0 +1,139 @@
+"""SQL-side aggregates for campaign and sequence statistics."""
+from __future__ import annotations
+
+import time as _time
+from typing import Any
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from database.models import (
+    Campaign,
+    CampaignLead,
+    EmailHistory,
+    EmailStatus,
+    LeadSequenceAssignment,
+    LeadStatus,
+    StatusHistory,
+)
+
+_performance_cache: dict = {"data": None, "ts": 0.0}
+_PERFORMANCE_CACHE_TTL = 60
+
+
+def _count_where(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def campaign_lead_counts_subquery(db: Session):
+    """Per-campaign lead counts (total, active, completed) as a GROUP BY subquery."""
+    return (
+        db.query(
+            CampaignLead.campaign_id.label("campaign_id"),
+            func.count(CampaignLead.id).label("total_leads"),
+            _count_where(CampaignLead.cl_status == "aktiv").label("active_leads"),
+            _count_where(CampaignLead.cl_status == "abgeschlossen").label("completed_leads"),
+        )
+        .group_by(CampaignLead.campaign_id)
+        .subquery()
+    )
+
+
+def campaign_email_counts_subquery(db: Session):
+    """Per-campaign sent/failed email counts as a GROUP BY subquery."""
+    return (
+        db.query(
+            EmailHistory.campaign_id.label("campaign_id"),
+            _count_where(EmailHistory.status == EmailStatus.SENT).label("sent_emails"),
+            _count_where(EmailHistory.status == EmailStatus.FAILED).label("failed_emails"),
+        )
+        .filter(EmailHistory.campaign_id.isnot(None))
+        .group_by(EmailHistory.campaign_id)
+        .subquery()
+    )
+
+
+def campaign_conversion_counts_subquery(db: Session):
+    """Per-campaign reply (-> pending) and won transitions of the campaign's leads."""
+    return (
+        db.query(
+            CampaignLead.campaign_id.label("campaign_id"),
+            _count_where(StatusHistory.zu_status == LeadStatus.PENDING).label("replies"),
+            _count_where(StatusHistory.zu_status == LeadStatus.GEWONNEN).label("won"),
+        )
+        .join(StatusHistory, StatusHistory.lead_id == CampaignLead.lead_id)
+        .filter(StatusHistory.zu_status.in_([LeadStatus.PENDING, LeadStatus.GEWONNEN]))
+        .group_by(CampaignLead.campaign_id)
+        .subquery()
+    )
+
+
+def compute_campaign_performance(db: Session) -> list[dict[str, Any]]:
+    """Per-campaign lead, email and conversion figures in a single grouped query."""
+    lead_counts = campaign_lead_counts_subquery(db)
+    email_counts = campaign_email_counts_subquery(db)
+    conversions = campaign_conversion_counts_subquery(db)
+    rows = (
+        db.query(
+            Campaign.id,
+            Campaign.name,
+            Campaign.status,
+            func.coalesce(lead_counts.c.total_leads, 0),
+            func.coalesce(lead_counts.c.active_leads, 0),
+            func.coalesce(lead_counts.c.completed_leads, 0),
+            func.coalesce(email_counts.c.sent_emails, 0),
+            func.coalesce(email_counts.c.failed_emails, 0),
+            func.coalesce(conversions.c.replies, 0),
+            func.coalesce(conversions.c.won, 0),
+        )
+        .outerjoin(lead_counts, lead_counts.c.campaign_id == Campaign.id)
+        .outerjoin(email_counts, email_counts.c.campaign_id == Campaign.id)
+        .outerjoin(conversions, conversions.c.campaign_id == Campaign.id)
+        .all()
+    )
+
+    results = []
+    for camp_id, name, status, total, active, completed, sent, failed, replies, won in rows:
+        sent = int(sent)
+        replies = int(replies)
+        results.append({
+            "id": camp_id,
+            "name": name,
+            "status": status.value if hasattr(status, "value") else str(status),
+            "total_leads": int(total),
+            "active_leads": int(active),
+            "completed": int(completed),
+            "sent_emails": sent,
+            "failed_emails": int(failed),
+            "replies": replies,
+            "won": int(won),
+            "reply_rate_pct": round((replies / max(sent, 1)) * 100, 1),
+        })
+    return sorted(results, key=lambda x: x["sent_emails"], reverse=True)
+
+
+def get_campaign_performance_cached(db: Session) -> list[dict[str, Any]]:
+    now = _time.time()
+    if _performance_cache["data"] is not None and (now - _performance_cache["ts"]) < _PERFORMANCE_CACHE_TTL:
+        return _performance_cache["data"]
+    result = compute_campaign_performance(db)
+    _performance_cache["data"] = result
+    _performance_cache["ts"] = now
+    return result
+
+
+def invalidate_campaign_performance() -> None:
+    """Call after campaign or campaign-lead writes."""
+    _performance_cache["data"] = None
+    _performance_cache["ts"] = 0.0
+
+
+def sequence_status_counts(db: Session, seq_id: int) -> dict[str, int]:
+    """Count a sequence's assignments per status in one GROUP BY query."""
+    rows = (
+        db.query(LeadSequenceAssignment.status, func.count(LeadSequenceAssignment.id))
+        .filter(LeadSequenceAssignment.sequence_id == seq_id)
+        .group_by(LeadSequenceAssignment.status)
+        .all()
+    )
+    return {status: count for status, count in rows}
@@ -0,0 +1,48 @@
+"""Batch scan for likely duplicate leads already in the database (see utils.dedupe)."""
+from __future__ import annotations
+
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from database.models import Lead
+from utils.dedupe import DEDUPE_THRESHOLD, find_duplicate_pairs
+
+# Pairs returned by a scan at most (best scores first); the total is reported separately.
+DEDUPE_MAX_PAIRS = max(1, int(os.getenv("DEDUPE_MAX_PAIRS", "1000")))
+
+
+def _lead_summary(lead) -> Dict:
+    return {"id": lead.id, "firma": lead.firma, "stadt": lead.stadt, "website": lead.website, "email": lead.email}
+
+
+def find_lead_duplicates(
+    session: Session,
+    threshold: float = DEDUPE_THRESHOLD,
+    limit: int = DEDUPE_MAX_PAIRS,
+    stats: Optional[Dict] = None,
+) -> List[Dict]:
+    """
+    Likely duplicate pairs among all leads, best first: same website host, or
+    similar names within a phonetic firma block (and the same Stadt where both
+    have one). Leads are streamed in id order; ``stats`` gets leads scanned,
+    names compared, blocks skipped and the total number of pairs found.
+    """
+    stats = stats if stats is not None else {}
+    rows = session.query(Lead.id, Lead.firma, Lead.stadt, Lead.domain_norm).order_by(Lead.id).yield_per(10000)
+    pairs = find_duplicate_pairs(rows, threshold=threshold, stats=stats)
+    stats["pairs"] = len(pairs)
+    pairs = pairs[:limit]
+
+    ids = {lead_id for a, b, _, _ in pairs for lead_id in (a, b)}
+    leads = {}
+    id_list = sorted(ids)
+    for start in range(0, len(id_list), 5000):
+        for lead in session.query(Lead).filter(Lead.id.in_(id_list[start:start + 5000])).all():
+            leads[lead.id] = _lead_summary(lead)
+
+    return [
+        {"lead_a": leads.get(a, {"id": a}), "lead_b": leads.get(b, {"id": b}), "score": score, "reason": reason}
+        for a, b, score, reason in pairs
+    ]
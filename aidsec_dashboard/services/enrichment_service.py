@@ -1,19 +1,80 @@
+"""Lead enrichment: website scrape plus security ranking, saved to LeadEnrichment.
+
+Enrichment normally runs through ``EnrichmentPipeline``, a set of background
+stages outside the request workers:
+
+    feeder -> fetch -> parse -> rank -> persist
+
+Every hop is a bounded queue, so a burst of new leads waits in the database
+(``research_status = "pending"``) instead of piling up in memory; the feeder
+only tops the fetch queue up as the later stages drain it, claiming each lead
+by flipping it to ``"in_progress"`` (stamped in ``research_claimed_at``) so
+other research paths skip it. Fetch and rank are
+network-bound and get many workers, parse is CPU-bound and gets few, and a
+single persist worker commits results in batches. Leads still in the pipeline
+on shutdown are set back to pending, so the next start picks them up again;
+claims older than ``ENRICHMENT_CLAIM_TIMEOUT_SECONDS`` (a killed process, a
+stop that timed out) are re-pended on start and periodically by the feeder.
+
+``enrich_lead`` is the synchronous single-lead path, also used by the routes
+when the pipeline is not running.
+"""
 import logging
-from datetime import datetime
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import or_
+
 from database.database import get_session
 from database.models import Lead, LeadEnrichment
 from services.scraper_service import get_scraper_service
-from services.ranking_service import get_ranking_service
+from services.ranking_cache_service import apply_ranking_to_lead, check_url_cached, check_url_cached_with_session
 
 logger = logging.getLogger(__name__)
 
-def enrich_lead(lead_id: int):
+FETCH_WORKERS = max(1, int(os.getenv("ENRICHMENT_FETCH_WORKERS", "8")))
+PARSE_WORKERS = max(1, int(os.getenv("ENRICHMENT_PARSE_WORKERS", "2")))
+RANK_WORKERS = max(1, int(os.getenv("ENRICHMENT_RANK_WORKERS", "8")))
+QUEUE_SIZE = max(1, int(os.getenv("ENRICHMENT_QUEUE_SIZE", "50")))
+PERSIST_BATCH_SIZE = max(1, int(os.getenv("ENRICHMENT_PERSIST_BATCH_SIZE", "25")))
+PERSIST_FLUSH_SECONDS = max(0.1, float(os.getenv("ENRICHMENT_PERSIST_FLUSH_SECONDS", "2")))
+FEED_INTERVAL_SECONDS = max(1, int(os.getenv("ENRICHMENT_FEED_INTERVAL_SECONDS", "30")))
+CLAIM_TIMEOUT_SECONDS = max(60, int(os.getenv("ENRICHMENT_CLAIM_TIMEOUT_SECONDS", "900")))
+THROUGHPUT_WINDOW_SECONDS = 60
+
+_STOP = object()
+
+
+def _apply_enrichment(lead: Lead, enrichment: LeadEnrichment, scraped_data: Dict, ranking_data: Dict) -> None:
+    enrichment.about_us = scraped_data.get("about_us")
+    enrichment.mission_statement = scraped_data.get("mission_statement")
+
+    # Update core lead ranking stats mapping
+    apply_ranking_to_lead(lead, ranking_data)
+
+    # Update advanced tracking
+    enrichment.ssl_valid = ranking_data.get("ssl_valid")
+    enrichment.cms_detected = ranking_data.get("cms_detected")
+
+    # Finalize Status
+    lead.research_status = "completed"
+    lead.research_last = datetime.utcnow()
+
+
+def enrich_lead(lead_id: int, force: bool = False):
     """
-    Background task to automatically scrape website data, run security checks, 
-    and save the results to the LeadEnrichment table.
+    Scrape website data, run security checks, and save the results to the
+    LeadEnrichment table for one lead, in the calling thread.
+    The security check is served from the domain ranking cache unless ``force`` is set.
     """
     logger.info(f"Starting enrichment for lead_id: {lead_id}")
-    
+
     with get_session() as db:
         lead = db.query(Lead).filter(Lead.id == lead_id).first()
         if not lead:
@@ -31,38 +92,406 @@ def enrich_lead(lead_id: int):
             db.add(enrichment)
 
         lead.research_status = "in_progress"
+        lead.research_claimed_at = datetime.utcnow()
         db.commit()
 
         try:
             # 1. Scrape Website for Text
             scraper = get_scraper_service()
             scraped_data = scraper.scrape_company_info(lead.website)
-            
-            enrichment.about_us = scraped_data.get("about_us")
-            enrichment.mission_statement = scraped_data.get("mission_statement")
-            
+
             # 2. Run Advanced Ranking / Security Checks
-            ranker = get_ranking_service()
-            ranking_data = ranker.check_url(lead.website)
-            
-            # Update core lead ranking stats mapping
-            lead.ranking_score = ranking_data.get("score")
-            lead.ranking_grade = ranking_data.get("grade")
-            lead.ranking_details = ranking_data.get("headers")
-            lead.ranking_checked_at = datetime.utcnow()
-            
-            # Update advanced tracking
-            enrichment.ssl_valid = ranking_data.get("ssl_valid")
-            enrichment.cms_detected = ranking_data.get("cms_detected")
-            
-            # Finalize Status
-            lead.research_status = "completed"
-            lead.research_last = datetime.utcnow()
-            
+            ranking_data = check_url_cached(db, lead.website, force=force)
+
+            _apply_enrichment(lead, enrichment, scraped_data, ranking_data)
             db.commit()
             logger.info(f"Successfully enriched lead_id: {lead_id}")
-            
+
         except Exception as e:
             logger.error(f"Failed to enrich lead_id: {lead_id} - Error: {e}")
             lead.research_status = "failed"
             db.commit()
+
+
+@dataclass
+class EnrichmentItem:
+    lead_id: int
+    website: str
+    force: bool = False
+    pages: Optional[Dict[str, Any]] = None
+    scraped: Optional[Dict[str, Any]] = None
+    ranking: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class StageStats:
+    """Counters and a sliding throughput window for one pipeline stage."""
+
+    def __init__(self, name: str, workers: int) -> None:
+        self.name = name
+        self.workers = workers
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._recent: deque = deque()
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool, count: int = 1) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.processed += count
+            if not ok:
+                self.failed += count
+            self.busy_seconds += seconds
+            self._recent.append((now, count))
+            while self._recent and now - self._recent[0][0] > THROUGHPUT_WINDOW_SECONDS:
+                self._recent.popleft()
+
+    def snapshot(self, queued: int) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            recent = sum(count for ts, count in self._recent if now - ts <= THROUGHPUT_WINDOW_SECONDS)
+            return {
+                "workers": self.workers,
+                "queued": queued,
+                "processed": self.processed,
+                "failed": self.failed,
+                "per_minute": round(recent * 60 / THROUGHPUT_WINDOW_SECONDS, 1),
+                "avg_ms": round(self.busy_seconds * 1000 / self.processed, 1) if self.processed else None,
+            }
+
+
+class EnrichmentPipeline:
+    """Staged, backpressured enrichment of pending leads (see module docstring)."""
+
+    STAGES = ("fetch", "parse", "rank", "persist")
+
+    def __init__(
+        self,
+        fetch_workers: int = FETCH_WORKERS,
+        parse_workers: int = PARSE_WORKERS,
+        rank_workers: int = RANK_WORKERS,
+        queue_size: int = QUEUE_SIZE,
+        persist_batch_size: int = PERSIST_BATCH_SIZE,
+    ) -> None:
+        self.workers = {"fetch": fetch_workers, "parse": parse_workers, "rank": rank_workers, "persist": 1}
+        self.queue_size = queue_size
+        self.persist_batch_size = persist_batch_size
+        self.queues: Dict[str, queue.Queue] = {name: queue.Queue(maxsize=queue_size) for name in self.STAGES}
+        self.stats = {name: StageStats(name, count) for name, count in self.workers.items()}
+        self.stop_event = threading.Event()
+        self.running = False
+        self.last_feed_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._threads: Dict[str, list] = {}
+        self._in_flight: set = set()
+        self._forced: set = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.stop_event.clear()
+        try:
+            self._requeue_stale_claims()
+        except Exception as exc:
+            self.last_error = str(exc)
+            logger.exception("Enrichment stale-claim recovery failed: %s", exc)
+        handlers: Dict[str, Callable[[EnrichmentItem], None]] = {
+            "fetch": self._fetch,
+            "parse": self._parse,
+            "rank": self._rank,
+        }
+        for index, name in enumerate(self.STAGES[:-1]):
+            self._threads[name] = [
+                self._spawn(f"enrichment-{name}-{n}", self._stage_loop, name, handlers[name], self.STAGES[index + 1])
+                for n in range(self.workers[name])
+            ]
+        self._threads["persist"] = [self._spawn("enrichment-persist", self._persist_loop)]
+        self._threads["feeder"] = [self._spawn("enrichment-feeder", self._feed_loop)]
+        self.running = True
+        logger.info("Enrichment pipeline started (workers=%s, queue_size=%s)", self.workers, self.queue_size)
+
+    @staticmethod
+    def _spawn(name: str, target: Callable, *args) -> threading.Thread:
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self, timeout: float = 10) -> None:
+        """Finish the leads already being worked on; the rest go back to pending for the next start."""
+        if not self.running:
+            return
+        self.stop_event.set()
+        self._wake.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads.pop("feeder", []):
+            thread.join(timeout=max(0.1, deadline - time.monotonic()))
+
+        # Unstarted leads need no work; drop them so the fetch workers reach _STOP quickly.
+        while True:
+            try:
+                self.queues["fetch"].get_nowait()
+            except queue.Empty:
+                break
+
+        for name in self.STAGES:
+            threads = self._threads.pop(name, [])
+            for _ in threads:
+                self.queues[name].put(_STOP)
+            for thread in threads:
+                thread.join(timeout=max(0.1, deadline - time.monotonic()))
+
+        # Everything not persisted by now (dropped, stuck behind _STOP, still
+        # running past the timeout) is released; a late persist still wins.
+        with self._lock:
+            leftover = list(self._in_flight)
+            self._in_flight.clear()
+            self._forced.clear()
+        for name in self.STAGES:
+            while True:
+                try:
+                    self.queues[name].get_nowait()
+                except queue.Empty:
+                    break
+        try:
+            released = self._set_status(leftover, "pending", only_if="in_progress")
+        except Exception as exc:
+            released = []
+            logger.exception("Could not re-pend leads %s; they are recovered once their claim goes stale: %s", leftover, exc)
+        self.running = False
+        logger.info("Enrichment pipeline stopped (%s unfinished leads set back to pending)", len(released))
+
+    def submit(self, lead_id: int, force: bool = False) -> bool:
+        """
+        Wake the feeder for a lead the caller has marked ``research_status = "pending"``.
+        Returns False when the pipeline is not running, so the caller can enrich it another way.
+        """
+        if not self.running:
+            return False
+        if force:
+            with self._lock:
+                self._forced.add(lead_id)
+        self._wake.set()
+        return True
+
+    @staticmethod
+    def _set_status(lead_ids: list, status: str, only_if: str) -> list:
+        """
+        Move leads from ``only_if`` to ``status``; returns the ids that actually changed.
+        ``research_claimed_at`` is stamped when claiming and cleared otherwise.
+        """
+        if not lead_ids:
+            return []
+        claimed_at = datetime.utcnow() if status == "in_progress" else None
+        db = get_session()
+        try:
+            changed = []
+            for lead_id in lead_ids:
+                updated = (
+                    db.query(Lead)
+                    .filter(Lead.id == lead_id, Lead.research_status == only_if)
+                    .update(
+                        {Lead.research_status: status, Lead.research_claimed_at: claimed_at},
+                        synchronize_session=False,
+                    )
+                )
+                if updated:
+                    changed.append(lead_id)
+            db.commit()
+            return changed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _requeue_stale_claims(self) -> int:
+        """Re-pend ``in_progress`` leads whose claim is older than CLAIM_TIMEOUT_SECONDS (or unstamped)."""
+        cutoff = datetime.utcnow() - timedelta(seconds=CLAIM_TIMEOUT_SECONDS)
+        with self._lock:
+            own = list(self._in_flight)
+        db = get_session()
+        try:
+            query = db.query(Lead).filter(
+                Lead.research_status == "in_progress",
+                or_(Lead.research_claimed_at.is_(None), Lead.research_claimed_at < cutoff),
+            )
+            if own:
+                query = query.filter(Lead.id.notin_(own))
+            requeued = query.update(
+                {Lead.research_status: "pending", Lead.research_claimed_at: None}, synchronize_session=False
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if requeued:
+            logger.warning("Re-pended %s leads with stale enrichment claims", requeued)
+        return requeued
+
+    # -- stages ------------------------------------------------------------
+
+    def _feed_loop(self) -> None:
+        next_recovery = time.monotonic() + CLAIM_TIMEOUT_SECONDS / 2
+        while not self.stop_event.is_set():
+            try:
+                if time.monotonic() >= next_recovery:
+                    next_recovery = time.monotonic() + CLAIM_TIMEOUT_SECONDS / 2
+                    self._requeue_stale_claims()
+                self._feed_once()
+            except Exception as exc:
+                self.last_error = str(exc)
+                logger.exception("Enrichment feeder failed: %s", exc)
+            self._wake.wait(FEED_INTERVAL_SECONDS)
+            self._wake.clear()
+
+    def _feed_once(self) -> int:
+        """Top the fetch queue up with pending leads; returns how many were queued."""
+        room = self.queue_size - self.queues["fetch"].qsize()
+        if room <= 0 or self.stop_event.is_set():
+            return 0
+
+        db = get_session()
+        try:
+            rows = (
+                db.query(Lead.id, Lead.website)
+                .filter(Lead.research_status == "pending", Lead.website.isnot(None), Lead.website != "")
+                .order_by(Lead.id.asc())
+                .limit(room)
+                .all()
+            )
+        finally:
+            db.close()
+        self.last_feed_at = datetime.utcnow().isoformat()
+
+        # Claim before queueing; a lead another path started meanwhile is skipped.
+        websites = dict(rows)
+        claimed = self._set_status(list(websites), "in_progress", only_if="pending")
+        for lead_id in claimed:
+            with self._lock:
+                self._in_flight.add(lead_id)
+                force = lead_id in self._forced
+            self.queues["fetch"].put(EnrichmentItem(lead_id=lead_id, website=websites[lead_id], force=force))
+        return len(claimed)
+
+    def _stage_loop(self, name: str, handler: Callable[[EnrichmentItem], None], next_name: str) -> None:
+        inbox, outbox, stats = self.queues[name], self.queues[next_name], self.stats[name]
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                return
+            if name == self.STAGES[0] and inbox.qsize() <= self.queue_size // 2:
+                self._wake.set()  # fetch queue half empty: let the feeder refill
+            if item.error is None:
+                started = time.monotonic()
+                try:
+                    handler(item)
+                    ok = True
+                except Exception as exc:
+                    item.error = f"{name}: {exc}"
+                    ok = False
+                    logger.warning("Enrichment %s failed for lead %s: %s", name, item.lead_id, exc)
+                stats.record(time.monotonic() - started, ok)
+            outbox.put(item)  # blocks while the next stage is saturated
+
+    @staticmethod
+    def _fetch(item: EnrichmentItem) -> None:
+        item.pages = get_scraper_service().fetch_company_pages(item.website)
+
+    @staticmethod
+    def _parse(item: EnrichmentItem) -> None:
+        item.scraped = get_scraper_service().extract_company_info(item.pages or {})
+        item.pages = None  # release the parsed documents early
+
+    @staticmethod
+    def _rank(item: EnrichmentItem) -> None:
+        item.ranking = check_url_cached_with_session(item.website, force=item.force)
+
+    def _persist_loop(self) -> None:
+        inbox = self.queues["persist"]
+        batch: list = []
+        stopping = False
+        while not stopping:
+            flush_at = time.monotonic() + PERSIST_FLUSH_SECONDS
+            while len(batch) < self.persist_batch_size:
+                try:
+                    item = inbox.get(timeout=max(0.01, flush_at - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                self._persist(batch)
+                batch = []
+
+    def _persist(self, batch: list) -> None:
+        started = time.monotonic()
+        ids = [item.lead_id for item in batch]
+        ok = True
+        db = get_session()
+        try:
+            leads = {lead.id: lead for lead in db.query(Lead).filter(Lead.id.in_(ids)).all()}
+            enrichments = {
+                row.lead_id: row for row in db.query(LeadEnrichment).filter(LeadEnrichment.lead_id.in_(ids)).all()
+            }
+            for item in batch:
+                lead = leads.get(item.lead_id)
+                if lead is None:
+                    continue
+                if item.error is not None:
+                    lead.research_status = "failed"
+                    continue
+                enrichment = enrichments.get(lead.id)
+                if enrichment is None:
+                    enrichment = LeadEnrichment(lead_id=lead.id)
+                    db.add(enrichment)
+                _apply_enrichment(lead, enrichment, item.scraped or {}, item.ranking or {})
+            db.commit()
+        except Exception as exc:
+            ok = False
+            db.rollback()
+            self.last_error = str(exc)
+            logger.exception("Enrichment persist failed for leads %s: %s", ids, exc)
+            # Don't let a poison batch loop forever through the feeder.
+            try:
+                db.query(Lead).filter(Lead.id.in_(ids)).update(
+                    {Lead.research_status: "failed"}, synchronize_session=False
+                )
+                db.commit()
+            except Exception:
+                db.rollback()
+        finally:
+            db.close()
+            with self._lock:
+                self._in_flight.difference_update(ids)
+                self._forced.difference_update(ids)
+            self.stats["persist"].record(time.monotonic() - started, ok, count=len(batch))
+            self._wake.set()  # room freed up: let the feeder refill
+
+    # -- reporting ---------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {
+            "running": self.running,
+            "in_flight": in_flight,
+            "last_feed_at": self.last_feed_at,
+            "last_error": self.last_error,
+            "stages": {name: self.stats[name].snapshot(self.queues[name].qsize()) for name in self.STAGES},
+        }
+
+
+enrichment_pipeline = EnrichmentPipeline()
+
+
+def get_enrichment_pipeline() -> EnrichmentPipeline:
+    return enrichment_pipeline
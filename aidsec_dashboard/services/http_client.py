@@ -0,0 +1,163 @@
+"""Shared HTTP plumbing for the scraping and ranking services.
+
+- ``build_session``: a ``requests.Session`` whose connection pool is sized for
+  concurrent use, so keep-alive connections are reused across checks, and
+  that optionally records into the on-disk response cache.
+- ``DnsCache``: a bounded TTL cache for host lookups. ``build_session(dns_cache=...)``
+  puts it in front of that session's connection pools only, so a batch touching
+  the same hosts resolves each once without affecting other HTTP clients.
+- ``HostLimiter``: per-host semaphores to stay polite to any single server.
+"""
+from __future__ import annotations
+
+import socket
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util import connection as urllib3_connection
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/122.0.0.0 Safari/537.36"
+)
+
+
+def build_session(
+    pool_size: int = 10,
+    headers: dict[str, str] | None = None,
+    cache_source: str | None = None,
+    cache_max_age: float | None = None,
+    dns_cache: DnsCache | None = None,
+) -> requests.Session:
+    """Session with ``pool_size`` keep-alive connections per host and ``pool_size`` host pools.
+
+    With ``cache_source`` GET responses are recorded in the on-disk response
+    cache under that label, and served from it while younger than
+    ``cache_max_age`` seconds (see ``services.response_cache_service``).
+    With ``dns_cache`` new connections of this session resolve through it.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if cache_source:
+        from services.response_cache_service import mount_response_cache
+
+        mount_response_cache(session, cache_source, max_age=cache_max_age, pool_size=pool_size)
+    if dns_cache is not None:
+        for mounted in session.adapters.values():
+            dns_cache.attach(mounted)
+    session.headers.update({"User-Agent": DEFAULT_USER_AGENT})
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+class DnsCache:
+    """Successful ``getaddrinfo`` results per (host, port) for ``ttl_seconds``, at most ``max_entries`` (LRU)."""
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 4096) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[tuple[str, int], tuple[float, list]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool_classes = {
+            "http": _bind_pool(HTTPConnectionPool, HTTPConnection, self),
+            "https": _bind_pool(HTTPSConnectionPool, HTTPSConnection, self),
+        }
+
+    def resolve(self, host: str, port: int) -> list:
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+        infos = socket.getaddrinfo(host, port, urllib3_connection.allowed_gai_family(), socket.SOCK_STREAM)
+        with self._lock:
+            self._entries[key] = (now + self.ttl_seconds, infos)
+            self._entries.move_to_end(key)
+            self._prune(now)
+        return infos
+
+    def _prune(self, now: float) -> None:
+        for key in [key for key, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def attach(self, adapter: HTTPAdapter) -> None:
+        """Make the pools ``adapter`` creates from now on resolve through this cache."""
+        adapter.poolmanager.pool_classes_by_scheme = dict(self._pool_classes)
+
+
+class _DnsCachingConnection:
+    """Mixin for urllib3 connections: connect to the cached addresses of the host, in order."""
+
+    dns_cache: DnsCache
+
+    def _new_conn(self):
+        host = self._dns_host
+        try:
+            infos = self.dns_cache.resolve(host, self.port)
+        except OSError:
+            return super()._new_conn()  # let urllib3 report the lookup failure
+
+        # Only the TCP connect uses the address; SNI and certificate checks run
+        # after _new_conn returns, with the hostname restored.
+        last_error: Exception | None = None
+        for _family, _type, _proto, _canon, sockaddr in infos:
+            self._dns_host = sockaddr[0]
+            try:
+                return super()._new_conn()
+            except ConnectTimeoutError as exc:  # also NewConnectionError
+                last_error = exc
+            finally:
+                self._dns_host = host
+        if last_error is None:
+            return super()._new_conn()
+        raise last_error
+
+
+def _bind_pool(pool_cls: type, connection_cls: type, cache: DnsCache) -> type:
+    connection = type(
+        f"DnsCaching{connection_cls.__name__}", (_DnsCachingConnection, connection_cls), {"dns_cache": cache}
+    )
+    return type(f"DnsCaching{pool_cls.__name__}", (pool_cls,), {"ConnectionCls": connection})
+
+
+class HostLimiter:
+    """At most ``per_host`` concurrent requests to any one host."""
+
+    def __init__(self, per_host: int = 2) -> None:
+        self.per_host = max(1, per_host)
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._semaphores.get(host)
+            if sem is None:
+                sem = self._semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return sem
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        sem = self._semaphore((urlparse(url).hostname or "").lower())
+        with sem:
+            yield
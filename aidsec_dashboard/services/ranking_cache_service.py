@@ -0,0 +1,243 @@
+"""Host-keyed, database-backed cache in front of RankingService.
+
+Leads sharing a website, and the several endpoints that rank the same lead,
+reuse one check per website host (``utils.domains.hostname``) until it
+expires. The key is deliberately not the registrable domain: subdomains and
+tenants of shared platforms (``firma.wixsite.com``) send their own headers. Failed checks are
+cached briefly so dead sites are not re-probed on every call. Pass
+``force=True`` to bypass the cache and refresh it.
+
+Expired entries are revalidated rather than rescanned: the stored ETag,
+Last-Modified and security-header hash make the re-check conditional, and an
+"unchanged" outcome only extends the entry (counted in ``unchanged_count``).
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from database.models import Lead, RankingCache
+from services.ranking_service import get_ranking_service
+from utils.domains import hostname
+
+CACHE_TTL_HOURS = float(os.getenv("RANKING_CACHE_TTL_HOURS", "24"))
+ERROR_TTL_MINUTES = float(os.getenv("RANKING_CACHE_ERROR_TTL_MINUTES", "15"))
+
+
+def _cached_result(row: RankingCache) -> dict[str, Any]:
+    result = dict(row.result or {})
+    result["cached"] = True
+    result["cache_checked_at"] = row.checked_at.isoformat() if row.checked_at else None
+    return result
+
+
+def _ttl(result: dict[str, Any]) -> timedelta:
+    return timedelta(hours=CACHE_TTL_HOURS) if result.get("grade") else timedelta(minutes=ERROR_TTL_MINUTES)
+
+
+def cache_validators(row: RankingCache | None) -> dict[str, Any] | None:
+    """Validators for a conditional re-scan of ``row``, or None when it must be rescanned in full."""
+    if row is None or not row.grade or not (row.etag or row.last_modified or row.headers_hash):
+        return None
+    return {"etag": row.etag, "last_modified": row.last_modified, "headers_hash": row.headers_hash}
+
+
+def get_cache_rows(db: Session, urls: Iterable[str]) -> dict[str, RankingCache]:
+    """Cache rows (expired ones included) for ``urls``, keyed by host (one IN query)."""
+    domains = {hostname(url) for url in urls} - {""}
+    if not domains:
+        return {}
+    rows = db.query(RankingCache).filter(RankingCache.domain.in_(domains)).all()
+    return {row.domain: row for row in rows}
+
+
+def get_cached_rankings(db: Session, urls: Iterable[str]) -> dict[str, dict[str, Any]]:
+    """Unexpired cached results for ``urls``, keyed by host."""
+    now = datetime.utcnow()
+    return {domain: _cached_result(row) for domain, row in get_cache_rows(db, urls).items() if row.expires_at > now}
+
+
+def store_ranking(db: Session, url: str, result: dict[str, Any]) -> None:
+    """Upsert ``result`` for the host of ``url``; the caller commits."""
+    domain = hostname(url)
+    if not domain or result.get("skipped"):
+        return
+
+    now = datetime.utcnow()
+    validators = result.get("validators") or {}
+    values = {
+        "domain": domain,
+        "url": (result.get("url") or url)[:500],
+        "grade": result.get("grade"),
+        "score": result.get("score"),
+        "result": {k: v for k, v in result.items() if k not in {"cached", "cache_checked_at", "validators"}},
+        "checked_at": now,
+        "expires_at": now + _ttl(result),
+        "etag": (validators.get("etag") or "")[:255] or None,
+        "last_modified": (validators.get("last_modified") or "")[:64] or None,
+        "headers_hash": validators.get("headers_hash"),
+        "validated_at": now,
+        "scan_count": 1,
+    }
+
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(RankingCache).values(**values)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["domain"],
+        set_={
+            **{key: stmt.excluded[key] for key in values if key not in {"domain", "scan_count"}},
+            "scan_count": RankingCache.scan_count + 1,
+        },
+    ))
+
+
+def record_unchanged(db: Session, row: RankingCache, result: dict[str, Any]) -> dict[str, Any]:
+    """Extend ``row`` after a conditional re-scan found nothing changed; the caller commits."""
+    now = datetime.utcnow()
+    validators = result.get("validators") or {}
+    row.etag = (validators.get("etag") or "")[:255] or row.etag
+    row.last_modified = (validators.get("last_modified") or "")[:64] or row.last_modified
+    row.headers_hash = validators.get("headers_hash") or row.headers_hash
+    row.validated_at = now
+    row.expires_at = now + _ttl({"grade": row.grade})
+    row.unchanged_count = RankingCache.unchanged_count + 1
+
+    cached = _cached_result(row)
+    cached["unchanged"] = True
+    cached["validation"] = result.get("validation")
+    return cached
+
+
+def resolve_check(db: Session, url: str, result: dict[str, Any], row: RankingCache | None) -> dict[str, Any]:
+    """Persist a fresh or conditional check result and return what the caller should apply."""
+    if result.get("unchanged") and row is not None:
+        return record_unchanged(db, row, result)
+    store_ranking(db, url, result)
+    result["cached"] = False
+    return result
+
+
+def check_url_cached(db: Session, url: str, force: bool = False) -> dict[str, Any]:
+    """RankingService.check_url() through the cache; the caller commits."""
+    row = get_cache_rows(db, [url]).get(hostname(url))
+    if row is not None and not force and row.expires_at > datetime.utcnow():
+        return _cached_result(row)
+
+    result = get_ranking_service().check_url(url, validators=None if force else cache_validators(row))
+    return resolve_check(db, url, result, row)
+
+
+def apply_ranking_to_lead(lead: Lead, result: dict[str, Any]) -> None:
+    lead.ranking_score = result.get("score")
+    lead.ranking_grade = get_ranking_service().normalize_grade(result.get("grade"))
+    lead.ranking_details = result.get("headers")
+    lead.ranking_checked_at = datetime.utcnow()
+
+
+def refresh_lead_rankings(
+    db: Session,
+    leads: list[Lead],
+    force: bool = False,
+    should_stop: Callable[[], bool] | None = None,
+    stats: dict[str, Any] | None = None,
+    commit_every: int = 25,
+    budget_seconds: float | None = None,
+) -> dict[str, Any]:
+    """Rank ``leads`` (all with a website) through the cache with the concurrent batch engine.
+
+    Leads sharing a website host are checked once; fresh cache entries
+    are applied without a request and expired ones are revalidated
+    conditionally. ``stats`` (completed, cache_hits, unchanged) is updated in
+    place as results arrive so callers can expose progress. Commits every
+    ``commit_every`` leads and at the end.
+    """
+    stats = stats if stats is not None else {}
+    for key in ("completed", "cache_hits", "unchanged"):
+        stats.setdefault(key, 0)
+
+    by_domain: dict[str, list[Lead]] = {}
+    for lead in leads:
+        by_domain.setdefault(hostname(lead.website) or lead.website, []).append(lead)
+
+    rows = get_cache_rows(db, [lead.website for lead in leads])
+    now = datetime.utcnow()
+    pending: list[list[Lead]] = []
+    for domain, group in by_domain.items():
+        row = rows.get(domain)
+        if force or row is None or row.expires_at <= now:
+            pending.append(group)
+            continue
+        hit = _cached_result(row)
+        for lead in group:
+            apply_ranking_to_lead(lead, hit)
+        stats["cache_hits"] += len(group)
+        stats["completed"] += len(group)
+    db.commit()
+
+    def apply(index: int, result: dict[str, Any]) -> None:
+        if result.get("skipped"):
+            return
+        group = pending[index]
+        resolved = resolve_check(db, group[0].website, result, rows.get(hostname(group[0].website)))
+        if resolved.get("unchanged"):
+            stats["unchanged"] += len(group)
+        for lead in group:
+            apply_ranking_to_lead(lead, resolved)
+        stats["completed"] += len(group)
+        if stats["completed"] % commit_every < len(group):
+            db.commit()
+
+    get_ranking_service().check_batch(
+        [group[0].website for group in pending],
+        validators=[
+            None if force else cache_validators(rows.get(hostname(group[0].website)))
+            for group in pending
+        ],
+        on_result=apply,
+        should_stop=should_stop,
+        budget_seconds=budget_seconds,
+    )
+    db.commit()
+    return stats
+
+
+def check_url_cached_with_session(url: str, force: bool = False) -> dict[str, Any]:
+    """check_url_cached() with its own short-lived session, for callers without one."""
+    from database.database import get_session
+
+    db = get_session()
+    try:
+        result = check_url_cached(db, url, force=force)
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def ranking_cache_stats(db: Session) -> dict[str, Any]:
+    """How much the cache and conditional re-scans save."""
+    now = datetime.utcnow()
+    entries, fresh, scans, unchanged = db.query(
+        func.count(RankingCache.id),
+        func.coalesce(func.sum(case((RankingCache.expires_at > now, 1), else_=0)), 0),
+        func.coalesce(func.sum(RankingCache.scan_count), 0),
+        func.coalesce(func.sum(RankingCache.unchanged_count), 0),
+    ).one()
+    rescans = int(scans) + int(unchanged)
+    return {
+        "entries": int(entries),
+        "fresh": int(fresh),
+        "full_scans": int(scans),
+        "unchanged_revalidations": int(unchanged),
+        "unchanged_rate": round(int(unchanged) / rescans, 3) if rescans else 0.0,
+    }
@@ -0,0 +1,92 @@
+"""Staleness-driven planner that keeps lead grades fresh in the background.
+
+A lead is due for a rescan once ``age * weight`` of its last check reaches
+``REFRESH_HOURS``, where the weight comes from its pipeline status: leads in
+active deals refresh often, lost ones rarely. Never-checked leads go first.
+
+Each status is planned with ``LIMIT`` probes on the
+``(status, ranking_checked_at)`` index, so choosing the next batch costs a
+handful of index range scans no matter how many leads exist. Cycles are
+sized by a requests-per-minute budget and run through the ranking cache, so
+unchanged sites are only revalidated.
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from database.models import Lead, LeadStatus
+from services.ranking_cache_service import refresh_lead_rankings
+
+REFRESH_HOURS = float(os.getenv("RANKING_REFRESH_HOURS", "168"))
+
+# Relative refresh urgency per pipeline status (2 = twice as often as 1).
+STATUS_WEIGHTS: dict[LeadStatus, float] = {
+    LeadStatus.NEGOTIATION: 8,
+    LeadStatus.OFFER_SENT: 6,
+    LeadStatus.RESPONSE_RECEIVED: 4,
+    LeadStatus.PENDING: 3,
+    LeadStatus.OFFEN: 2,
+    LeadStatus.GEWONNEN: 1,
+    LeadStatus.VERLOREN: 0.25,
+}
+
+
+def plan_rescan_batch(db: Session, limit: int, now: datetime | None = None) -> list[Lead]:
+    """The ``limit`` most overdue leads with a website, most urgent first."""
+    now = now or datetime.utcnow()
+    scored: list[tuple[tuple[int, float], Lead]] = []
+    for status, weight in STATUS_WEIGHTS.items():
+        if weight <= 0:
+            continue
+        base = db.query(Lead).filter(Lead.status == status, Lead.website.isnot(None), Lead.website != "")
+
+        never_checked = base.filter(Lead.ranking_checked_at.is_(None)).order_by(Lead.id.asc()).limit(limit).all()
+        scored.extend(((1, weight), lead) for lead in never_checked)
+
+        due_before = now - timedelta(hours=REFRESH_HOURS / weight)
+        stale = (
+            base.filter(Lead.ranking_checked_at < due_before)
+            .order_by(Lead.ranking_checked_at.asc())
+            .limit(limit)
+            .all()
+        )
+        scored.extend(
+            ((0, (now - lead.ranking_checked_at).total_seconds() / 3600 * weight), lead) for lead in stale
+        )
+
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [lead for _, lead in scored[:limit]]
+
+
+def run_rescan_cycle(
+    db: Session,
+    requests_per_minute: int,
+    should_stop: Callable[[], bool] | None = None,
+) -> dict[str, Any]:
+    """Refresh up to ``requests_per_minute`` overdue leads within one minute."""
+    leads = plan_rescan_batch(db, limit=max(1, requests_per_minute))
+    stats: dict[str, Any] = {"planned": len(leads)}
+    if leads:
+        refresh_lead_rankings(db, leads, should_stop=should_stop, stats=stats, budget_seconds=60)
+    return stats
+
+
+def run_rescan_cycle_with_session(
+    requests_per_minute: int,
+    should_stop: Callable[[], bool] | None = None,
+) -> dict[str, Any]:
+    """Run a planner cycle with a fresh database session."""
+    from database.database import get_session
+
+    db = get_session()
+    try:
+        return run_rescan_cycle(db, requests_per_minute, should_stop=should_stop)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
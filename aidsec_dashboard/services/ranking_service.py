@@ -1,15 +1,72 @@
 """Ranking Service - SecurityHeaders.com Integration"""
+import hashlib
+import os
 import requests
 from bs4 import BeautifulSoup
 import json
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
 import ssl
 import socket
 from urllib.parse import urlparse
 
+from services.http_client import DnsCache, HostLimiter, build_session
+
+# Batch engine tuning: total in-flight checks, in-flight checks per host, DNS cache lifetime and size.
+BATCH_CONCURRENCY = max(1, int(os.getenv("RANKING_BATCH_CONCURRENCY", "32")))
+PER_HOST_CONCURRENCY = max(1, int(os.getenv("RANKING_PER_HOST_CONCURRENCY", "2")))
+DNS_CACHE_TTL_SECONDS = int(os.getenv("RANKING_DNS_CACHE_TTL_SECONDS", "300"))
+DNS_CACHE_MAX_ENTRIES = max(1, int(os.getenv("RANKING_DNS_CACHE_MAX_ENTRIES", "4096")))
+
+DIRECT_TIMEOUT = (5, 15)  # (connect, read) seconds
+VIA_SITE_TIMEOUT = 30
+# Stop reading a homepage after this many (decoded) bytes; CMS markers sit in the <head> or early body.
+MAX_BODY_BYTES = max(4096, int(os.getenv("RANKING_MAX_BODY_BYTES", str(512 * 1024))))
+STREAM_CHUNK_BYTES = 16 * 1024
+
+# (CMS, markers) in precedence order; markers are matched against the lowercased body.
+CMS_MARKERS = (
+    ("WordPress", (b"/wp-content/", b"/wp-includes/", b'generator" content="wordpress')),
+    ("Joomla", (b"joomla",)),
+    ("Shopify", (b"cdn.shopify.com",)),
+)
+
+
+class _CmsScanner:
+    """Incremental CMS footprinting over streamed body chunks.
+
+    Chunks are lowercased one at a time and the tail of the previous chunk is
+    carried over so markers split across a chunk boundary still match.
+    ``decided`` turns true once the highest-precedence CMS still possible has
+    been seen, at which point the rest of the body cannot change the answer.
+    """
+
+    _OVERLAP = max(len(marker) for _, markers in CMS_MARKERS for marker in markers) - 1
+
+    def __init__(self) -> None:
+        self.found: set[str] = set()
+        self._tail = b""
+
+    def feed(self, chunk: bytes) -> None:
+        window = self._tail + chunk.lower()
+        for cms, markers in CMS_MARKERS:
+            if cms not in self.found and any(marker in window for marker in markers):
+                self.found.add(cms)
+        self._tail = window[-self._OVERLAP:]
+
+    @property
+    def decided(self) -> bool:
+        return CMS_MARKERS[0][0] in self.found
+
+    def result(self) -> str:
+        for cms, _ in CMS_MARKERS:
+            if cms in self.found:
+                return cms
+        return "Unknown"
+
 
 class RankingService:
     """Service to check security headers using SecurityHeaders.com"""
@@ -27,13 +84,12 @@ class RankingService:
     ]
 
     def __init__(self):
-        self.session = requests.Session()
+        self.host_limiter = HostLimiter(PER_HOST_CONCURRENCY)
+        dns_cache = DnsCache(DNS_CACHE_TTL_SECONDS, DNS_CACHE_MAX_ENTRIES) if DNS_CACHE_TTL_SECONDS > 0 else None
+        # Responses are recorded in the on-disk response cache for offline re-extraction but never
+        # served from it: when a site is re-checked is decided by the ranking cache.
+        self.session = build_session(pool_size=BATCH_CONCURRENCY, cache_source="ranking", dns_cache=dns_cache)
         self.session.headers.update({
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/122.0.0.0 Safari/537.36"
-            ),
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
             "Accept-Language": "de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7",
             "Accept-Encoding": "gzip, deflate, br",
@@ -46,35 +102,52 @@ class RankingService:
             "Sec-Fetch-User": "?1",
         })
 
-    def check_url(self, url: str) -> Dict:
+    @staticmethod
+    def _normalize_url(url: str) -> str:
+        url = url.strip()
+        if not url.startswith(("http://", "https://")):
+            url = f"https://{url}"
+        return url
+
+    @staticmethod
+    def _error_result(url: str, error: str, **extra) -> Dict:
+        return {
+            "url": url,
+            "score": None,
+            "grade": None,
+            "error": error,
+            "headers": [],
+            "checked_at": datetime.utcnow().isoformat(),
+            **extra,
+        }
+
+    def check_url(self, url: str, deadline: Optional[float] = None, validators: Optional[Dict] = None) -> Dict:
         """
         Check security headers for a given URL.
         Returns dict with score, grade, and details.
         Primary: direct header inspection of the target site.
         Fallback: SecurityHeaders.com HTML scraping.
+        ``deadline`` (time.monotonic) skips the slow fallback when the budget cannot cover it.
+        ``validators`` from a previous direct check (see ``_check_direct``) turn this into a
+        conditional re-scan that returns ``{"unchanged": True, ...}`` without a grade when
+        nothing relevant changed.
         """
-        url = url.strip()
-        if not url.startswith(("http://", "https://")):
-            url = f"https://{url}"
+        url = self._normalize_url(url)
 
         try:
-            result = self._check_direct(url)
-            if result["grade"]:
+            result = self._check_direct(url, validators)
+            if result.get("unchanged") or result["grade"]:
                 return result
         except Exception:
             pass
 
+        if deadline is not None and deadline - time.monotonic() < VIA_SITE_TIMEOUT:
+            return self._error_result(url, "timeout budget exhausted")
+
         try:
             return self._check_via_site(url)
         except Exception as e:
-            return {
-                "url": url,
-                "score": None,
-                "grade": None,
-                "error": str(e),
-                "headers": [],
-                "checked_at": datetime.utcnow().isoformat(),
-            }
+            return self._error_result(url, str(e))
 
     @staticmethod
     def normalize_grade(value: str | None) -> str | None:
@@ -95,22 +168,72 @@ class RankingService:
 
         return None
 
-    def _check_direct(self, url: str) -> Dict:
-        """Inspect the target site's HTTP headers directly and compute a grade."""
-        resp = requests.get(
-            url,
-            timeout=15,
-            allow_redirects=True,
-            headers={
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/122.0.0.0 Safari/537.36"
-                )
-            },
-        )
-        resp_headers = {k.lower(): v for k, v in resp.headers.items()}
+    def security_headers_hash(self, resp_headers: Dict[str, str]) -> str:
+        """Stable hash of the graded headers; ``resp_headers`` keys must be lowercase."""
+        canonical = "\n".join(f"{h.lower()}:{resp_headers.get(h.lower(), '')}" for h in self.KNOWN_SECURITY_HEADERS)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
 
+    def _unchanged_result(self, url: str, validation: str, validators: Dict) -> Dict:
+        return {
+            "url": url,
+            "unchanged": True,
+            "validation": validation,
+            "validators": validators,
+            "checked_at": datetime.utcnow().isoformat(),
+        }
+
+    def _check_direct(self, url: str, validators: Optional[Dict] = None) -> Dict:
+        """Inspect the target site's HTTP headers directly and compute a grade.
+
+        With ``validators`` ({etag, last_modified, headers_hash}) the request is
+        conditional. A 304 that repeats no security headers is trusted as
+        unchanged; otherwise an identical security-header hash means the grade
+        cannot have changed, and the body is neither read nor re-scanned.
+        """
+        request_headers = {"Accept-Encoding": "gzip, deflate"}
+        if validators:
+            if validators.get("etag"):
+                request_headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                request_headers["If-Modified-Since"] = validators["last_modified"]
+
+        with self.host_limiter.slot(url):
+            with self.session.get(
+                url,
+                timeout=DIRECT_TIMEOUT,
+                allow_redirects=True,
+                stream=True,
+                headers=request_headers,
+            ) as resp:
+                resp_headers = {k.lower(): v for k, v in resp.headers.items()}
+                not_modified = resp.status_code == 304
+                # A 304 may omit the validators; they stay the ones we sent.
+                previous = (validators or {}) if not_modified else {}
+                new_validators = {
+                    "etag": resp_headers.get("etag") or previous.get("etag"),
+                    "last_modified": resp_headers.get("last-modified") or previous.get("last_modified"),
+                    "headers_hash": self.security_headers_hash(resp_headers),
+                }
+                if validators:
+                    repeats_security_headers = any(resp_headers.get(h.lower()) for h in self.KNOWN_SECURITY_HEADERS)
+                    if not_modified and not repeats_security_headers:
+                        new_validators["headers_hash"] = validators.get("headers_hash")
+                        return self._unchanged_result(url, "not_modified", new_validators)
+                    if new_validators["headers_hash"] == validators.get("headers_hash"):
+                        return self._unchanged_result(url, "headers_unchanged", new_validators)
+                if not not_modified:
+                    cms_detected = self._detect_cms(resp)
+
+        if not_modified:
+            # Security headers changed behind an unchanged representation: re-fetch in full.
+            return self._check_direct(url)
+
+        result = self._direct_result(url, resp_headers, cms_detected)
+        result["validators"] = new_validators
+        return result
+
+    def _direct_result(self, url: str, resp_headers: Dict[str, str], cms_detected: str) -> Dict:
+        """Grade a site from its (lowercased) response headers."""
         headers_info = []
         present_count = 0
 
@@ -143,26 +266,56 @@ class RankingService:
             "headers": headers_info,
             "checked_at": datetime.utcnow().isoformat(),
             "ssl_valid": True,  # requests didn't fail
-            "cms_detected": self._detect_cms(resp),
+            "cms_detected": cms_detected,
         }
 
+    def check_url_from_store(self, url: str, store) -> Dict:
+        """Re-grade ``url`` from pages stored in the response cache, without any request.
+
+        Uses the stored homepage (headers and the body prefix read for CMS
+        detection) and falls back to a stored SecurityHeaders.com report.
+        """
+        url = self._normalize_url(url)
+        page = store.get(url, follow_redirects=True)
+        if page is not None and page.status < 400:
+            scanner = _CmsScanner()
+            scanner.feed(page.body[:MAX_BODY_BYTES])
+            resp_headers = {k.lower(): v for k, v in page.headers.items()}
+            result = self._direct_result(url, resp_headers, scanner.result())
+            result["checked_at"] = datetime.utcfromtimestamp(page.fetched_at).isoformat()
+            return result
+
+        report = store.get(f"{self.BASE_URL}/?q={url}&followRedirects=on")
+        if report is not None and report.status == 200:
+            return self._parse_response(url, report.text)
+        return self._error_result(url, "not in response cache")
+
     def _detect_cms(self, response: requests.Response) -> str:
-        """Simple footprinting to detect CMS like WordPress"""
-        html = response.text.lower()
-        if "/wp-content/" in html or "/wp-includes/" in html or "generator\" content=\"wordpress" in html:
-            return "WordPress"
-        if "joomla" in html:
-            return "Joomla"
-        if "cdn.shopify.com" in html:
-            return "Shopify"
-        return "Unknown"
+        """Simple footprinting to detect CMS like WordPress.
+
+        Reads the streamed body only up to ``MAX_BODY_BYTES`` and stops early
+        once the answer is decided.
+        """
+        scanner = _CmsScanner()
+        read = 0
+        try:
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_BYTES):
+                scanner.feed(chunk)
+                read += len(chunk)
+                if scanner.decided or read >= MAX_BODY_BYTES:
+                    break
+        except requests.RequestException:
+            pass  # headers are already graded; keep whatever the partial body showed
+        return scanner.result()
 
     def _check_via_site(self, url: str) -> Dict:
         """Fallback: scrape SecurityHeaders.com with full browser headers."""
         check_url = f"{self.BASE_URL}/?q={url}&followRedirects=on"
-        self.session.headers["Referer"] = self.BASE_URL + "/"
 
-        response = self.session.get(check_url, timeout=30)
+        with self.host_limiter.slot(check_url):
+            response = self.session.get(
+                check_url, timeout=VIA_SITE_TIMEOUT, headers={"Referer": self.BASE_URL + "/"}
+            )
         response.raise_for_status()
 
         return self._parse_response(url, response.text)
@@ -228,17 +381,60 @@ class RankingService:
         result["grade"] = self.normalize_grade(result.get("grade"))
         return result
 
-    def check_batch(self, urls: List[str], progress_callback=None) -> List[Dict]:
-        """Check multiple URLs with optional progress callback"""
-        results = []
+    def check_batch(
+        self,
+        urls: List[str],
+        progress_callback=None,
+        on_result: Optional[Callable[[int, Dict], None]] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+        budget_seconds: Optional[float] = None,
+        validators: Optional[List[Optional[Dict]]] = None,
+    ) -> List[Dict]:
+        """Check many URLs concurrently; results keep the input order.
+
+        Up to ``BATCH_CONCURRENCY`` checks run at once, at most
+        ``PER_HOST_CONCURRENCY`` per host, over the shared keep-alive pool.
+        Duplicate URLs are checked once. ``on_result(index, result)`` and
+        ``progress_callback(done, total)`` run in the calling thread as results
+        arrive. Checks not started before ``should_stop()`` or the budget
+        expires come back with ``skipped=True``. ``validators`` (aligned with
+        ``urls``) make the matching checks conditional, as in ``check_url``.
+        """
         total = len(urls)
-
+        results: List[Optional[Dict]] = [None] * total
+        positions: Dict[str, List[int]] = {}
+        url_validators: Dict[str, Dict] = {}
         for i, url in enumerate(urls):
-            result = self.check_url(url)
-            results.append(result)
-
-            if progress_callback:
-                progress_callback(i + 1, total)
+            key = self._normalize_url(url)
+            positions.setdefault(key, []).append(i)
+            if validators and validators[i] and key not in url_validators:
+                url_validators[key] = validators[i]
+
+        deadline = time.monotonic() + budget_seconds if budget_seconds else None
+
+        def run(url: str) -> Dict:
+            if should_stop and should_stop():
+                return self._error_result(url, "cancelled", skipped=True)
+            if deadline is not None and time.monotonic() >= deadline:
+                return self._error_result(url, "timeout budget exhausted", skipped=True)
+            try:
+                return self.check_url(url, deadline=deadline, validators=url_validators.get(url))
+            except Exception as e:
+                return self._error_result(url, str(e))
+
+        done = 0
+        workers = max(1, min(BATCH_CONCURRENCY, len(positions)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ranking") as pool:
+            futures = {pool.submit(run, url): url for url in positions}
+            for future in as_completed(futures):
+                result = future.result()
+                for i in positions[futures[future]]:
+                    results[i] = result
+                    done += 1
+                    if on_result:
+                        on_result(i, result)
+                    if progress_callback:
+                        progress_callback(done, total)
 
         return results
 
@@ -4,10 +4,13 @@ import re
 import warnings
 from typing import Dict, Any, Optional
 from datetime import datetime
-from urllib.parse import urlparse, urljoin
 import requests
 from bs4 import BeautifulSoup
 
+from services.http_client import build_session
+from services.response_cache_service import CACHE_MAX_AGE_SECONDS
+from services.site_discovery_service import discover_pages
+
 # Suppress SSL warnings for scraping
 warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 
@@ -23,12 +26,9 @@ PHONE_PATTERN = re.compile(
     r'(?:\+?41|0)\s?[0-9]{2,3}[\s.-]?[0-9]{3}[\s.-]?[0-9]{2}[\s.-]?[0-9]{2}'
 )
 
-# Common contact page paths
-CONTACT_PATHS = [
-    '/contact', '/kontakt', '/impressum', '/about', '/uber-uns',
-    '/team', '/contact-us', '/contact-us.html', '/contact.html',
-    '/kontakt.html', '/impressum.html'
-]
+# Contact-like pages fetched per lead, chosen by services.site_discovery_service
+CONTACT_PAGE_KINDS = ('impressum', 'contact', 'about')
+MAX_CONTACT_PAGES = 3
 
 # Common email contact links
 EMAIL_LINKS = [
@@ -44,6 +44,12 @@ class ResearchService:
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
+        # One keep-alive session so the homepage, sitemap and contact pages share connections;
+        # pages are recorded in (and, while fresh, served from) the on-disk response cache
+        self.session = build_session(
+            headers=self.headers, cache_source="research", cache_max_age=CACHE_MAX_AGE_SECONDS
+        )
+        self.session.verify = False
 
     def research_lead(self, url: str, company_name: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -82,26 +88,21 @@ class ResearchService:
         }
 
         try:
-            # First try the main page
-            main_page_data = self._scrape_page(url)
-            results.update(main_page_data)
+            # First try the main page (fetched once; reused for link discovery and social links)
+            homepage_soup = self._fetch_soup(url)
+            if homepage_soup is not None:
+                results.update(self._extract_contact_data(homepage_soup, url))
             results["pages_checked"].append(url)
 
-            # If no email found, try contact pages
+            # If no email found, try the discovered contact pages
             if not results.get("email") or not results.get("phone"):
-                contact_data = self._try_contact_pages(url)
+                contact_data = self._try_contact_pages(url, homepage_soup)
                 if contact_data:
                     results["pages_checked"].extend(contact_data.get("pages_checked", []))
                     for key in ["email", "phone", "contact_name", "address"]:
                         if not results.get(key) and contact_data.get(key):
                             results[key] = contact_data[key]
 
-            # Look for social links
-            if not results.get("linkedin") or not results.get("xing"):
-                social_data = self._find_social_links(url)
-                results["linkedin"] = results["linkedin"] or social_data.get("linkedin")
-                results["xing"] = results["xing"] or social_data.get("xing")
-
             # Add metadata
             results["meta"] = {
                 "researched_at": datetime.utcnow().isoformat(),
@@ -138,8 +139,22 @@ class ResearchService:
             "pages_checked": []
         }
 
+    def _fetch_soup(self, url: str, timeout: Optional[int] = None) -> Optional[BeautifulSoup]:
+        """GET ``url`` and parse it; None on network errors or non-2xx responses."""
+        try:
+            response = self.session.get(url, timeout=timeout or self.timeout)
+            response.raise_for_status()
+            return BeautifulSoup(response.text, 'html.parser')
+        except requests.RequestException as e:
+            logger.warning(f"Failed to scrape {url}: {e}")
+            return None
+
     def _scrape_page(self, url: str) -> Dict[str, Any]:
         """Scrape a single page for contact information."""
+        return self._extract_contact_data(self._fetch_soup(url), url)
+
+    def _extract_contact_data(self, soup: Optional[BeautifulSoup], url: str) -> Dict[str, Any]:
+        """Contact fields and social links found in an already parsed page."""
         result = {
             "email": None,
             "phone": None,
@@ -150,31 +165,16 @@ class ResearchService:
             "pages_checked": []
         }
 
-        try:
-            response = requests.get(url, headers=self.headers, timeout=self.timeout, verify=False)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Find email
-            if not result.get("email"):
-                result["email"] = self._find_email(soup, url)
-
-            # Find phone
-            if not result.get("phone"):
-                result["phone"] = self._find_phone(soup)
+        if soup is None:
+            return result
 
-            # Find address
-            if not result.get("address"):
-                result["address"] = self._find_address(soup)
+        result["email"] = self._find_email(soup, url)
+        result["phone"] = self._find_phone(soup)
+        result["address"] = self._find_address(soup)
 
-            # Find social links
-            social = self._extract_social_links(soup, url)
-            result["linkedin"] = social.get("linkedin")
-            result["xing"] = social.get("xing")
-
-        except requests.RequestException as e:
-            logger.warning(f"Failed to scrape {url}: {e}")
+        social = self._extract_social_links(soup, url)
+        result["linkedin"] = social.get("linkedin")
+        result["xing"] = social.get("xing")
 
         return result
 
@@ -231,11 +231,8 @@ class ResearchService:
 
         return None
 
-    def _try_contact_pages(self, base_url: str) -> Dict[str, Any]:
-        """Try common contact page paths."""
-        parsed = urlparse(base_url)
-        base = f"{parsed.scheme}://{parsed.netloc}"
-
+    def _try_contact_pages(self, base_url: str, homepage_soup: Optional[BeautifulSoup] = None) -> Dict[str, Any]:
+        """Fetch the top-ranked impressum/contact/about pages (see site_discovery_service)."""
         result = {
             "email": None,
             "phone": None,
@@ -244,10 +241,12 @@ class ResearchService:
             "pages_checked": []
         }
 
-        for path in CONTACT_PATHS:
-            url = urljoin(base, path)
+        candidates = discover_pages(
+            base_url, CONTACT_PAGE_KINDS, self.session, homepage_soup, limit=MAX_CONTACT_PAGES
+        )
+        for url in candidates:
             try:
-                response = requests.get(url, headers=self.headers, timeout=5, verify=False)
+                response = self.session.get(url, timeout=5)
                 if response.status_code == 200:
                     result["pages_checked"].append(url)
                     soup = BeautifulSoup(response.text, 'html.parser')
@@ -273,7 +272,7 @@ class ResearchService:
         result = {"linkedin": None, "xing": None}
 
         try:
-            response = requests.get(base_url, headers=self.headers, timeout=self.timeout, verify=False)
+            response = self.session.get(base_url, timeout=self.timeout)
             soup = BeautifulSoup(response.text, 'html.parser')
             return self._extract_social_links(soup, base_url)
         except requests.RequestException:
@@ -0,0 +1,479 @@
+"""Compressed on-disk store of the HTTP responses fetched by the scraping services.
+
+Responses are keyed by URL and fetch time (the last ``HTTP_CACHE_MAX_VERSIONS``
+fetches of each URL are kept); bodies are content-addressed blobs under
+``blobs/<sha256[:2]>/<sha256>``, compressed with zstd when ``zstandard`` is
+installed and gzip otherwise, so identical pages are stored once. A small
+SQLite index next to the blobs tracks entries and blob access times, and the
+least recently used blobs are evicted once the store exceeds
+``HTTP_CACHE_MAX_MB``.
+
+Services opt in by mounting ``CachingAdapter`` on their session (see
+``mount_response_cache``). Every successful or redirecting GET is recorded,
+streamed ones included (only the part the caller actually read, flagged
+``truncated``). With ``max_age`` fresh, complete entries are served without a
+request; with ``offline=True`` the session
+never touches the network, which is how ``scripts/reextract_from_cache.py``
+reruns the parsers over stored pages.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+try:
+    import zstandard
+except ImportError:  # optional; gzip is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").strip().lower() in {"1", "true", "yes", "on"}
+CACHE_DIR = os.getenv(
+    "HTTP_CACHE_DIR", os.path.join(os.path.dirname(__file__), "..", "data", "http_cache")
+)
+CACHE_MAX_BYTES = max(1, int(os.getenv("HTTP_CACHE_MAX_MB", "512"))) * 1024 * 1024
+CACHE_MAX_VERSIONS = max(1, int(os.getenv("HTTP_CACHE_MAX_VERSIONS", "3")))
+# Read-through freshness for services that serve pages from the store.
+CACHE_MAX_AGE_SECONDS = float(os.getenv("HTTP_CACHE_MAX_AGE_HOURS", "24")) * 3600
+# Bodies larger than this are stored cut off (and flagged truncated).
+MAX_ENTRY_BYTES = 4 * 1024 * 1024
+
+# Hop-by-hop and encoding headers that no longer describe the stored (decoded) body.
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+_REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+def _recordable(status: int) -> bool:
+    """Only pages and redirects are worth replaying; 4xx/5xx (rate limits, bot walls) are transient."""
+    return 200 <= status < 300 or status in _REDIRECT_STATUSES
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    raw_size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_blobs_last_access ON blobs (last_access);
+CREATE TABLE IF NOT EXISTS responses (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    truncated INTEGER NOT NULL DEFAULT 0,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_responses_url_fetched_at ON responses (url, fetched_at DESC);
+CREATE INDEX IF NOT EXISTS ix_responses_content_hash ON responses (content_hash);
+"""
+
+
+def cache_key(url: str) -> str:
+    """The URL as ``requests`` sends it (scheme/host lowercased, path quoted)."""
+    try:
+        return requests.Request("GET", url).prepare().url
+    except requests.RequestException:
+        return url
+
+
+@dataclass
+class CachedPage:
+    url: str
+    fetched_at: float
+    status: int
+    headers: dict[str, str]
+    body: bytes
+    truncated: bool = False
+    source: Optional[str] = None
+    history: list[str] = field(default_factory=list)
+
+    @property
+    def encoding(self) -> str:
+        return get_encoding_from_headers(CaseInsensitiveDict(self.headers)) or "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding, errors="replace")
+
+
+class ResponseStore:
+    """Content-addressed, compressed response store with size-based LRU eviction."""
+
+    def __init__(self, root: str, max_bytes: int = CACHE_MAX_BYTES, max_versions: int = CACHE_MAX_VERSIONS) -> None:
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.max_versions = max_versions
+        self.codec = "zstd" if zstandard is not None else "gzip"
+        os.makedirs(os.path.join(self.root, "blobs"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(self.root, "index.db"), timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    # -- blobs -------------------------------------------------------------
+
+    def _blob_path(self, digest: str, codec: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], f"{digest}.{'zst' if codec == 'zstd' else 'gz'}")
+
+    def _compress(self, body: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=6).compress(body)
+        return gzip.compress(body, compresslevel=6)
+
+    @staticmethod
+    def _decompress(data: bytes, codec: str) -> bytes:
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read this cache entry")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def _store_blob(self, body: bytes, now: float) -> str:
+        digest = hashlib.sha256(body).hexdigest()
+        if self._conn.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (now, digest)).rowcount:
+            return digest
+        data = self._compress(body)
+        path = self._blob_path(digest, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO blobs (hash, codec, size, raw_size, last_access) VALUES (?, ?, ?, ?, ?)",
+            (digest, self.codec, len(data), len(body), now),
+        )
+        self._total += len(data)
+        return digest
+
+    def _drop_blobs(self, digests: set[str]) -> None:
+        """Delete blobs no response references any more."""
+        for digest in digests:
+            if self._conn.execute("SELECT 1 FROM responses WHERE content_hash = ? LIMIT 1", (digest,)).fetchone():
+                continue
+            row = self._conn.execute("SELECT codec, size FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            if row is None:
+                continue
+            self._conn.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+            self._total -= row[1]
+            try:
+                os.remove(self._blob_path(digest, row[0]))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self, target_bytes: int) -> int:
+        evicted = 0
+        while self._total > target_bytes:
+            victims = self._conn.execute(
+                "SELECT hash FROM blobs ORDER BY last_access ASC LIMIT 100"
+            ).fetchall()
+            if not victims:
+                break
+            for (digest,) in victims:
+                if self._total <= target_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE content_hash = ?", (digest,))
+                self._drop_blobs({digest})
+                evicted += 1
+        return evicted
+
+    # -- public API --------------------------------------------------------
+
+    def put(
+        self,
+        url: str,
+        body: bytes,
+        status: int = 200,
+        headers: Optional[dict[str, str]] = None,
+        source: Optional[str] = None,
+        truncated: bool = False,
+        fetched_at: Optional[float] = None,
+    ) -> str:
+        """Record one fetch of ``url``; returns the body's content hash."""
+        now = time.time()
+        if len(body) > MAX_ENTRY_BYTES:
+            body, truncated = body[:MAX_ENTRY_BYTES], True
+        kept_headers = {k: v for k, v in (headers or {}).items() if k.lower() not in _DROPPED_HEADERS}
+        key = cache_key(url)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                digest = self._store_blob(body, now)
+                self._conn.execute(
+                    "INSERT INTO responses (url, fetched_at, status, headers, content_hash, truncated, source) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, fetched_at or now, status, json.dumps(kept_headers), digest, int(truncated), source),
+                )
+                old = self._conn.execute(
+                    "SELECT id, content_hash FROM responses WHERE url = ? ORDER BY fetched_at DESC LIMIT -1 OFFSET ?",
+                    (key, self.max_versions),
+                ).fetchall()
+                if old:
+                    self._conn.executemany("DELETE FROM responses WHERE id = ?", [(row_id,) for row_id, _ in old])
+                    self._drop_blobs({content_hash for _, content_hash in old})
+                if self._total > self.max_bytes:
+                    self._evict(int(self.max_bytes * 0.9))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return digest
+
+    def get(
+        self,
+        url: str,
+        max_age: Optional[float] = None,
+        follow_redirects: bool = False,
+        complete: bool = False,
+    ) -> Optional[CachedPage]:
+        """Latest stored fetch of ``url`` (no older than ``max_age`` seconds), or None.
+
+        With ``follow_redirects`` stored 3xx hops are followed to the page they led to.
+        ``complete`` skips entries whose body was only partly read (``truncated``),
+        e.g. by the ranking scanner, which stops once the CMS is known.
+        """
+        history: list[str] = []
+        page = self._get_one(url, max_age, complete)
+        while follow_redirects and page is not None and page.status in _REDIRECT_STATUSES and len(history) < 10:
+            location = CaseInsensitiveDict(page.headers).get("location")
+            if not location:
+                break
+            history.append(page.url)
+            page = self._get_one(requests.compat.urljoin(page.url, location), max_age, complete)
+        if page is not None:
+            page.history = history
+        return page
+
+    def _get_one(self, url: str, max_age: Optional[float], complete: bool = False) -> Optional[CachedPage]:
+        key = cache_key(url)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.fetched_at, r.status, r.headers, r.content_hash, r.truncated, r.source, b.codec "
+                "FROM responses r JOIN blobs b ON b.hash = r.content_hash "
+                f"WHERE r.url = ?{' AND r.truncated = 0' if complete else ''} ORDER BY r.fetched_at DESC",
+                (key,),
+            ).fetchall()
+            # Entries recorded before error statuses were excluded are skipped, not served
+            row = next((row for row in rows if _recordable(row[1])), None)
+            if row is None:
+                return None
+            fetched_at, status, headers, digest, truncated, source, codec = row
+            if max_age is not None and time.time() - fetched_at > max_age:
+                return None
+            try:
+                with open(self._blob_path(digest, codec), "rb") as fh:
+                    body = self._decompress(fh.read(), codec)
+            except (OSError, RuntimeError, EOFError) as exc:
+                logger.warning(f"Unreadable response cache blob {digest} for {key}: {exc}")
+                return None
+            self._conn.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (time.time(), digest))
+        return CachedPage(
+            url=key,
+            fetched_at=fetched_at,
+            status=status,
+            headers=json.loads(headers),
+            body=body,
+            truncated=bool(truncated),
+            source=source,
+        )
+
+    def versions(self, url: str) -> list[dict[str, Any]]:
+        """Stored fetches of ``url``, newest first (metadata only)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fetched_at, status, content_hash, truncated, source FROM responses "
+                "WHERE url = ? ORDER BY fetched_at DESC",
+                (cache_key(url),),
+            ).fetchall()
+        return [
+            {"fetched_at": r[0], "status": r[1], "content_hash": r[2], "truncated": bool(r[3]), "source": r[4]}
+            for r in rows
+        ]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            responses, urls = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT url) FROM responses").fetchone()
+            blobs, size, raw_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM blobs"
+            ).fetchone()
+        return {
+            "dir": self.root,
+            "codec": self.codec,
+            "responses": responses,
+            "urls": urls,
+            "blobs": blobs,
+            "bytes": size,
+            "raw_bytes": raw_size,
+            "max_bytes": self.max_bytes,
+            "compression_ratio": round(raw_size / size, 2) if size else None,
+        }
+
+
+class _RecordingRaw:
+    """Wraps a urllib3 response and records the (decoded) bytes the caller reads.
+
+    The entry is written once, when the body is exhausted or the response is
+    closed/released; a partially read body is stored flagged ``truncated`` and
+    an unread one is not stored.
+    """
+
+    def __init__(self, raw, on_done) -> None:
+        self._raw = raw
+        self._on_done = on_done
+        self._buffer = io.BytesIO()
+        self._complete = False
+        self._flushed = False
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        for chunk in self._raw.stream(amt, decode_content=decode_content):
+            if self._buffer.tell() <= MAX_ENTRY_BYTES:
+                self._buffer.write(chunk)
+            yield chunk
+        self._complete = True
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._flushed:
+            return
+        self._flushed = True
+        if not self._complete and not self._buffer.tell():
+            return  # body never read (e.g. a headers-only check); keep the previous entry
+        try:
+            self._on_done(self._buffer.getvalue(), not self._complete)
+        except Exception as exc:  # recording must never break the fetch
+            logger.warning(f"Could not record response: {exc}")
+
+    def close(self) -> None:
+        self._flush()
+        self._raw.close()
+
+    def release_conn(self) -> None:
+        self._flush()
+        self._raw.release_conn()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class CachingAdapter(HTTPAdapter):
+    """HTTPAdapter that records GET responses in a ``ResponseStore`` and can serve from it.
+
+    ``max_age`` (seconds) serves stored entries younger than that without a
+    request; ``offline`` serves only stored entries and fails everything else
+    with ``requests.ConnectionError``. Only 2xx and redirect responses are
+    recorded, and read-through (``max_age``) only serves complete bodies, so a
+    prefix recorded by a streaming reader never stands in for the whole page.
+    """
+
+    def __init__(
+        self,
+        store: ResponseStore,
+        source: str,
+        max_age: Optional[float] = None,
+        offline: bool = False,
+        **kwargs,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.store = store
+        self.source = source
+        self.max_age = max_age
+        self.offline = offline
+
+    def _cached_response(self, request, page: CachedPage) -> requests.Response:
+        response = requests.Response()
+        response.status_code = page.status
+        response.headers = CaseInsensitiveDict(page.headers)
+        response.headers["X-Response-Cache"] = "hit"
+        response.raw = io.BytesIO(page.body)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = "Cached"
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        is_get = request.method == "GET"
+        conditional = "If-None-Match" in request.headers or "If-Modified-Since" in request.headers
+        if is_get and (self.offline or (self.max_age is not None and not conditional)):
+            if self.offline:
+                page = self.store.get(request.url)
+            else:
+                page = self.store.get(request.url, max_age=self.max_age, complete=True)
+            if page is not None:
+                return self._cached_response(request, page)
+        if self.offline:
+            raise requests.ConnectionError(f"{request.url} is not in the response cache (offline)", request=request)
+
+        response = super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        if is_get and _recordable(response.status_code):
+            url, status, headers = request.url, response.status_code, dict(response.headers)
+            response.raw = _RecordingRaw(
+                response.raw,
+                lambda body, truncated: self.store.put(
+                    url, body, status=status, headers=headers, source=self.source, truncated=truncated
+                ),
+            )
+        return response
+
+
+_store: Optional[ResponseStore] = None
+_store_lock = threading.Lock()
+
+
+def get_response_store() -> Optional[ResponseStore]:
+    """Process-wide store, or None when ``HTTP_CACHE_ENABLED`` is off or the directory is unusable."""
+    global _store
+    if not CACHE_ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = ResponseStore(CACHE_DIR)
+            except (OSError, sqlite3.Error) as exc:
+                logger.warning(f"HTTP response cache disabled: {exc}")
+                return None
+        return _store
+
+
+def mount_response_cache(
+    session: requests.Session,
+    source: str,
+    max_age: Optional[float] = None,
+    offline: bool = False,
+    pool_size: int = 10,
+) -> bool:
+    """Route ``session``'s http(s) traffic through a ``CachingAdapter``; False when caching is off."""
+    store = get_response_store()
+    if store is None:
+        if offline:
+            raise RuntimeError("HTTP response cache is disabled (HTTP_CACHE_ENABLED)")
+        return False
+    adapter = CachingAdapter(
+        store, source, max_age=max_age, offline=offline, pool_connections=pool_size, pool_maxsize=pool_size
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return True
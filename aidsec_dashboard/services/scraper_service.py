@@ -1,21 +1,19 @@
 import logging
-import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
 import os
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
+
+from services.http_client import build_session
+from services.response_cache_service import CACHE_MAX_AGE_SECONDS
+from services.site_discovery_service import discover_pages
 
 logger = logging.getLogger(__name__)
 
 class ScraperService:
     def __init__(self):
-        self.session = requests.Session()
+        # Pages are recorded in (and, while fresh, served from) the on-disk response cache.
+        self.session = build_session(cache_source="scraper", cache_max_age=CACHE_MAX_AGE_SECONDS)
         self.session.headers.update({
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/122.0.0.0 Safari/537.36"
-            ),
             "Accept": "text/html,application/xhtml+xml,application/xml",
             "Accept-Language": "de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7",
         })
@@ -25,6 +23,13 @@ class ScraperService:
         Scrape a company's website for 'About Us', 'Mission Statement', and generic metadata.
         If AGENT1_URL is configured, routes the heavy scraping task to the external OpenClaw Agent.
         """
+        return self.extract_company_info(self.fetch_company_pages(url))
+
+    def fetch_company_pages(self, url: str) -> Dict[str, Any]:
+        """
+        Network half of scrape_company_info(): the parsed homepage and about page.
+        Returns {"url", "homepage", "about"}, or {"url", "result"} when Agent 1 did the work.
+        """
         url = url.strip()
         if not url.startswith(("http://", "https://")):
             url = f"https://{url}"
@@ -45,62 +50,70 @@ class ScraperService:
                 if resp.status_code == 200:
                     data = resp.json()
                     return {
-                        "about_us": data.get("about_us"),
-                        "mission_statement": data.get("mission_statement"),
-                        "services_offered": data.get("services_offered")
+                        "url": url,
+                        "result": {
+                            "about_us": data.get("about_us"),
+                            "mission_statement": data.get("mission_statement"),
+                            "services_offered": data.get("services_offered")
+                        },
                     }
                 else:
                     logger.warning(f"Agent 1 scraping failed with {resp.status_code}: {resp.text}. Falling back to local.")
             except Exception as e:
                 logger.error(f"Failed to connect to Agent 1 at {agent1_url}: {e}. Falling back to local.")
 
-        result = {
-            "about_us": None,
-            "mission_statement": None,
-            "services_offered": None
-        }
+        pages: Dict[str, Any] = {"url": url, "homepage": None, "about": None}
 
         try:
             # 1. Fetch homepage
             response = self.session.get(url, timeout=10, allow_redirects=True)
             response.raise_for_status()
             base_url = response.url
-            soup = BeautifulSoup(response.text, "lxml")
-            
-            # Extract basic info from homepage
-            result["mission_statement"] = self._extract_mission(soup)
-            
+            pages["homepage"] = soup = BeautifulSoup(response.text, "lxml")
+
             # 2. Look for about / team page
             about_url = self._find_about_page(soup, base_url)
             if about_url:
                 try:
                     about_resp = self.session.get(about_url, timeout=10)
-                    about_soup = BeautifulSoup(about_resp.text, "lxml")
-                    result["about_us"] = self._extract_best_paragraphs(about_soup)
+                    pages["about"] = BeautifulSoup(about_resp.text, "lxml")
                 except Exception as e:
                     logger.warning(f"Error scraping about page {about_url}: {e}")
-            
-            # If no about_us found from an about page, fallback to homepage
-            if not result["about_us"]:
-                result["about_us"] = self._extract_best_paragraphs(soup)
-                
+
         except Exception as e:
             logger.error(f"Error scraping {url}: {e}")
 
+        return pages
+
+    def extract_company_info(self, pages: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """CPU half of scrape_company_info(): extract the fields from fetch_company_pages() output."""
+        if "result" in pages:
+            return pages["result"]
+
+        result = {
+            "about_us": None,
+            "mission_statement": None,
+            "services_offered": None
+        }
+        soup = pages.get("homepage")
+        if soup is None:
+            return result
+
+        # Extract basic info from homepage
+        result["mission_statement"] = self._extract_mission(soup)
+        if pages.get("about") is not None:
+            result["about_us"] = self._extract_best_paragraphs(pages["about"])
+
+        # If no about_us found from an about page, fallback to homepage
+        if not result["about_us"]:
+            result["about_us"] = self._extract_best_paragraphs(soup)
+
         return result
 
     def _find_about_page(self, soup: BeautifulSoup, base_url: str) -> Optional[str]:
-        """Attempt to find a link pointing to an 'About' or 'Team' page."""
-        keywords = ['about', 'über uns', 'team', 'profil', 'unternehmen', 'wer wir sind']
-        for a in soup.find_all('a', href=True):
-            text = a.get_text().lower()
-            href = a['href'].lower()
-            if any(k in text for k in keywords) or any(k in href for k in keywords):
-                full_url = urljoin(base_url, a['href'])
-                # Ensure we don't accidentally navigate out of the domain
-                if urlparse(full_url).netloc == urlparse(base_url).netloc:
-                    return full_url
-        return None
+        """Best same-site 'About' or 'Team' page from the homepage navigation and sitemap."""
+        pages = discover_pages(base_url, ("about",), self.session, soup, limit=1, fallback=False)
+        return pages[0] if pages else None
 
     def _extract_mission(self, soup: BeautifulSoup) -> Optional[str]:
         """Extract mission statement usually found in header or meta tags."""
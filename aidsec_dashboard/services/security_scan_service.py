@@ -1,14 +1,139 @@
 """Service for scanning security headers using Playwright."""
 import asyncio
 import base64
+import logging
+import os
+from contextlib import asynccontextmanager
 from typing import Dict, Any, Optional
 
-from services.ranking_service import get_ranking_service
+from services.ranking_cache_service import check_url_cached_with_session
 
-async def security_scan(website_url: str, capture_screenshot: bool = False) -> Dict[str, Any]:
+logger = logging.getLogger(__name__)
+
+SCREENSHOT_MAX_CONCURRENCY = max(1, int(os.getenv("SCREENSHOT_MAX_CONCURRENCY", "2")))
+SCREENSHOT_CONTEXT_MAX_USES = max(1, int(os.getenv("SCREENSHOT_CONTEXT_MAX_USES", "50")))
+GRADE_WAIT_MS = max(1000, int(os.getenv("SCREENSHOT_GRADE_TIMEOUT_MS", "15000")))
+
+
+class BrowserPool:
+    """One warm headless Chromium with a bounded pool of reusable browser contexts.
+
+    Bound to the event loop that first uses it (Playwright objects cannot
+    cross loops); a relaunch happens if the browser disconnects. Contexts are
+    recycled after ``context_max_uses`` pages or any page error.
+    """
+
+    def __init__(self, max_contexts: int, context_max_uses: int) -> None:
+        self.max_contexts = max_contexts
+        self.context_max_uses = context_max_uses
+        self._loop = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._playwright = None
+        self._browser = None
+        self._idle: list = []
+        self._uses: Dict[Any, int] = {}
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_contexts)
+            self._playwright = None
+            self._browser = None
+            self._idle = []
+            self._uses = {}
+
+    async def _ensure_browser(self):
+        async with self._lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            from playwright.async_api import async_playwright
+
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            self._idle = []
+            self._uses = {}
+            return self._browser
+
+    @asynccontextmanager
+    async def page(self):
+        self._bind_loop()
+        async with self._slots:
+            browser = await self._ensure_browser()
+            context = self._idle.pop() if self._idle else await browser.new_context(
+                viewport={"width": 1280, "height": 800}
+            )
+            healthy = True
+            page = None
+            try:
+                page = await context.new_page()
+                yield page
+            except BaseException:
+                healthy = False
+                raise
+            finally:
+                if page is not None:
+                    try:
+                        await page.close()
+                    except Exception:
+                        healthy = False
+                uses = self._uses.pop(context, 0) + 1
+                if healthy and uses < self.context_max_uses and browser is self._browser and browser.is_connected():
+                    self._uses[context] = uses
+                    self._idle.append(context)
+                else:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+
+    async def close(self) -> None:
+        if self._loop is not asyncio.get_running_loop():
+            return
+        for context in self._idle:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self._idle = []
+        self._uses = {}
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+
+_browser_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    global _browser_pool
+    if _browser_pool is None:
+        _browser_pool = BrowserPool(SCREENSHOT_MAX_CONCURRENCY, SCREENSHOT_CONTEXT_MAX_USES)
+    return _browser_pool
+
+
+async def close_browser_pool() -> None:
+    if _browser_pool is not None:
+        await _browser_pool.close()
+
+
+async def security_scan(website_url: str, capture_screenshot: bool = False, force: bool = False) -> Dict[str, Any]:
     """Scan website security data.
 
-    - Non-screenshot mode: uses RankingService (Railway-safe, no browser dependency).
+    - Non-screenshot mode: uses RankingService through the domain cache (Railway-safe, no browser dependency);
+      ``force`` bypasses the cache.
     - Screenshot mode: tries Playwright and falls back with a clear error when unavailable.
     """
     if not website_url:
@@ -19,8 +144,7 @@ async def security_scan(website_url: str, capture_screenshot: bool = False) -> D
 
     if not capture_screenshot:
         try:
-            svc = get_ranking_service()
-            result = svc.check_url(website_url)
+            result = await asyncio.to_thread(check_url_cached_with_session, website_url, force)
             return {
                 "success": True,
                 "grade": result.get("grade"),
@@ -33,44 +157,24 @@ async def security_scan(website_url: str, capture_screenshot: bool = False) -> D
             return {"success": False, "error": str(e)}
 
     try:
-        from playwright.async_api import async_playwright
-    except Exception:
-        return {
-            "success": False,
-            "error": "Playwright/Chromium not available on this environment",
-        }
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        try:
-            page = await browser.new_page()
-            # Set viewport to ensure screenshot captures the top area nicely
-            await page.set_viewport_size({"width": 1280, "height": 800})
-            
+        async with get_browser_pool().page() as page:
             target_url = f"https://securityheaders.com/?q={website_url}"
             # securityheaders.com can be slow or use Cloudflare
-            await page.goto(target_url, timeout=60000)
-            
-            await page.wait_for_timeout(8000)
-            
+            await page.goto(target_url, timeout=60000, wait_until="domcontentloaded")
+
             try:
-                grade_element_handle = await page.query_selector('.grade')
-                if grade_element_handle:
-                    grade = await grade_element_handle.text_content()
-                    grade = grade.strip()
-                else:
-                    grade = None
+                grade_element_handle = await page.wait_for_selector(".grade", timeout=GRADE_WAIT_MS)
+                grade = (await grade_element_handle.text_content() or "").strip() or None
             except Exception:
                 grade = None
-                
+
             screenshot_b64 = None
-            if capture_screenshot:
-                try:
-                    # Capture the top of the page (where the grade is)
-                    screenshot_bytes = await page.screenshot(clip={"x": 0, "y": 0, "width": 800, "height": 600})
-                    screenshot_b64 = base64.b64encode(screenshot_bytes).decode("utf-8")
-                except Exception as e:
-                    print(f"Screenshot failed: {e}")
+            try:
+                # Capture the top of the page (where the grade is)
+                screenshot_bytes = await page.screenshot(clip={"x": 0, "y": 0, "width": 800, "height": 600})
+                screenshot_b64 = base64.b64encode(screenshot_bytes).decode("utf-8")
+            except Exception as e:
+                logger.warning("Screenshot failed: %s", e)
 
             return {
                 "success": True,
@@ -78,7 +182,10 @@ async def security_scan(website_url: str, capture_screenshot: bool = False) -> D
                 "url": target_url,
                 "screenshot_b64": screenshot_b64
             }
-        except Exception as e:
-            return {"success": False, "error": str(e)}
-        finally:
-            await browser.close()
+    except ImportError:
+        return {
+            "success": False,
+            "error": "Playwright/Chromium not available on this environment",
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
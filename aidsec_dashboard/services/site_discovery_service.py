@@ -0,0 +1,213 @@
+"""Discover a site's contact, impressum and about pages instead of guessing paths.
+
+Candidates come from three places, best first:
+
+1. links in the homepage's ``<nav>``, ``<header>`` and ``<footer>``
+   (callers pass the homepage soup they already fetched),
+2. other homepage links,
+3. the sitemap, located through ``robots.txt`` and read once per host
+   (cached in-process for ``SITEMAP_CACHE_TTL`` seconds).
+
+Each candidate is scored by keyword matches in its path and link text, with
+penalties for deep paths, query strings and non-HTML files, so callers only
+fetch the top few.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time as _time
+from typing import Iterable, Optional
+from urllib.parse import urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+
+from utils.domains import registrable_domain
+
+SITEMAP_CACHE_TTL = 24 * 3600
+SITEMAP_CACHE_MAX_HOSTS = 2048
+SITEMAP_MAX_BYTES = 2 * 1024 * 1024
+SITEMAP_MAX_URLS = 5000
+SITEMAP_MAX_CHILDREN = 3
+FETCH_TIMEOUT = 5
+
+# kind -> (keyword, weight); keywords are matched against the lowercased path and link text.
+PAGE_KEYWORDS: dict[str, tuple[tuple[str, int], ...]] = {
+    "contact": (("kontakt", 10), ("contact", 10), ("anfahrt", 4), ("standort", 3), ("location", 3)),
+    "impressum": (("impressum", 10), ("imprint", 10), ("legal-notice", 8), ("rechtliche", 4), ("mentions-legales", 8)),
+    "about": (
+        ("ueber-uns", 10), ("uber-uns", 10), ("über-uns", 10), ("über uns", 10), ("about", 9),
+        ("wer-wir-sind", 9), ("wer wir sind", 9), ("team", 7), ("profil", 6), ("unternehmen", 6),
+        ("kanzlei", 4), ("praxis", 4),
+    ),
+}
+
+# Last-resort guesses, only used when discovery finds nothing for a kind.
+FALLBACK_PATHS: dict[str, tuple[str, ...]] = {
+    "contact": ("/kontakt", "/contact"),
+    "impressum": ("/impressum",),
+    "about": ("/ueber-uns", "/about"),
+}
+
+_SOURCE_BONUS = {"nav": 6, "link": 3, "sitemap": 0, "guess": -20}
+_SKIP_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".zip", ".doc", ".docx", ".xml", ".css", ".js")
+_LOC_PATTERN = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.I)
+
+_sitemap_cache: dict[str, tuple[float, list[str]]] = {}
+_sitemap_lock = threading.Lock()
+
+
+def _read_capped(response: requests.Response, limit: int) -> str:
+    chunks, size = [], 0
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            break
+    return b"".join(chunks).decode(response.encoding or "utf-8", errors="replace")
+
+
+def _fetch_text(session: requests.Session, url: str, **kwargs) -> Optional[str]:
+    try:
+        with session.get(url, timeout=FETCH_TIMEOUT, stream=True, allow_redirects=True, **kwargs) as resp:
+            if resp.status_code != 200:
+                return None
+            return _read_capped(resp, SITEMAP_MAX_BYTES)
+    except requests.RequestException:
+        return None
+
+
+def _sitemap_urls_uncached(session: requests.Session, base: str, **kwargs) -> list[str]:
+    sitemaps: list[str] = []
+    robots = _fetch_text(session, urljoin(base, "/robots.txt"), **kwargs)
+    if robots:
+        for line in robots.splitlines():
+            if line.lower().startswith("sitemap:"):
+                sitemaps.append(line.split(":", 1)[1].strip())
+    if not sitemaps:
+        sitemaps = [urljoin(base, "/sitemap.xml")]
+
+    urls: list[str] = []
+    queue = sitemaps[:SITEMAP_MAX_CHILDREN]
+    fetched = 0
+    while queue and fetched < SITEMAP_MAX_CHILDREN + 1 and len(urls) < SITEMAP_MAX_URLS:
+        body = _fetch_text(session, queue.pop(0), **kwargs)
+        fetched += 1
+        if not body:
+            continue
+        locs = _LOC_PATTERN.findall(body)
+        if "<sitemapindex" in body.lower():
+            # Page sitemaps (e.g. WordPress page-sitemap.xml) hold the static pages we want.
+            children = sorted(locs, key=lambda loc: "page" not in loc.lower())
+            queue.extend(children[:SITEMAP_MAX_CHILDREN])
+            continue
+        urls.extend(locs[: SITEMAP_MAX_URLS - len(urls)])
+    return urls
+
+
+def sitemap_urls(session: requests.Session, base_url: str, **kwargs) -> list[str]:
+    """Page URLs from the site's sitemap(s); cached per host. ``kwargs`` go to ``session.get``."""
+    parsed = urlparse(base_url)
+    base = f"{parsed.scheme}://{parsed.netloc}"
+    now = _time.time()
+    with _sitemap_lock:
+        entry = _sitemap_cache.get(parsed.netloc)
+        if entry and now - entry[0] < SITEMAP_CACHE_TTL:
+            return entry[1]
+
+    urls = _sitemap_urls_uncached(session, base, **kwargs)
+    with _sitemap_lock:
+        if len(_sitemap_cache) >= SITEMAP_CACHE_MAX_HOSTS:
+            _sitemap_cache.pop(next(iter(_sitemap_cache)))
+        _sitemap_cache[parsed.netloc] = (now, urls)
+    return urls
+
+
+def _homepage_links(soup: BeautifulSoup, base_url: str) -> Iterable[tuple[str, str, str]]:
+    """(url, link text, source) for homepage anchors; nav/header/footer links first."""
+    seen: set[int] = set()
+    for container in soup.find_all(["nav", "header", "footer"]):
+        for a in container.find_all("a", href=True):
+            seen.add(id(a))
+            yield urljoin(base_url, a["href"]), a.get_text(" ", strip=True), "nav"
+    for a in soup.find_all("a", href=True):
+        if id(a) not in seen:
+            yield urljoin(base_url, a["href"]), a.get_text(" ", strip=True), "link"
+
+
+def _score(url: str, text: str, kind: str, source: str) -> int:
+    parsed = urlparse(url)
+    path = parsed.path.lower()
+    if path.endswith(_SKIP_EXTENSIONS):
+        return 0
+    last_segment = path.rstrip("/").rsplit("/", 1)[-1]
+    text = text.lower()
+
+    keyword_score = 0
+    for keyword, weight in PAGE_KEYWORDS[kind]:
+        if keyword in last_segment:
+            keyword_score = max(keyword_score, weight + 3)
+        elif keyword in path:
+            keyword_score = max(keyword_score, weight)
+        if keyword in text:
+            keyword_score = max(keyword_score, weight + 1)
+    if not keyword_score:
+        return 0
+
+    depth = len([segment for segment in path.split("/") if segment])
+    score = keyword_score + _SOURCE_BONUS[source] - 2 * max(0, depth - 1)
+    if parsed.query:
+        score -= 3
+    return max(score, 1)
+
+
+def discover_pages(
+    base_url: str,
+    kinds: Iterable[str],
+    session: requests.Session,
+    homepage_soup: Optional[BeautifulSoup] = None,
+    limit: int = 3,
+    use_sitemap: bool = True,
+    fallback: bool = True,
+    **request_kwargs,
+) -> list[str]:
+    """Up to ``limit`` same-site URLs most likely to be one of ``kinds``, best first.
+
+    With ``fallback`` a couple of conventional paths are guessed for kinds
+    nothing was found for. ``request_kwargs`` (e.g. ``verify=False``) are
+    passed to sitemap requests.
+    """
+    kinds = tuple(kinds)
+    site = registrable_domain(base_url)
+    home = urlparse(base_url)._replace(fragment="", query="").geturl().rstrip("/")
+
+    candidates: list[tuple[str, str, str]] = []
+    if homepage_soup is not None:
+        candidates.extend(_homepage_links(homepage_soup, base_url))
+    if use_sitemap:
+        candidates.extend((url, "", "sitemap") for url in sitemap_urls(session, base_url, **request_kwargs))
+
+    best: dict[str, int] = {}
+    found_kinds: set[str] = set()
+    for url, text, source in candidates:
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or registrable_domain(url) != site:
+            continue
+        url = parsed._replace(fragment="").geturl()
+        if url.rstrip("/") == home:
+            continue
+        for kind in kinds:
+            score = _score(url, text, kind, source)
+            if score:
+                found_kinds.add(kind)
+                best[url] = max(best.get(url, 0), score)
+
+    for kind in kinds if fallback else ():
+        if kind not in found_kinds:
+            for path in FALLBACK_PATHS.get(kind, ()):
+                url = urljoin(base_url, path)
+                best.setdefault(url, max(1, _score(url, "", kind, "guess")))
+
+    ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+    return [url for url, _ in ranked[:limit]]
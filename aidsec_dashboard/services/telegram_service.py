@@ -9,6 +9,7 @@ import requests
 from sqlalchemy.orm import Session
 
 from database.models import AgentTask, Settings
+from services.agent_queue_service import PRIORITY_INTERACTIVE, SOURCE_MANUAL, announce_new_tasks
 
 
 @dataclass
@@ -165,9 +166,13 @@ def _handle_task_create(ctx: TelegramContext, db: Session, parts: list[str]) ->
         task_type="GENERATE_DRAFT",
         lead_id=lead_id,
         payload=payload,
+        agent_hint=agent_hint,
+        source=SOURCE_MANUAL,
+        priority=PRIORITY_INTERACTIVE,
         status="pending",
     )
     db.add(task)
+    announce_new_tasks(db)
     db.commit()
     db.refresh(task)
 
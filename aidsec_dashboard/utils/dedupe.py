@@ -0,0 +1,289 @@
+"""Fuzzy duplicate detection for leads: blocking keys plus trigram similarity.
+
+Comparing every lead with every other one is O(n²), so leads are first put
+into blocks that likely duplicates share - the phonetic key of the company
+name (Kölner Phonetik, which suits German/Swiss names) and the website host -
+and names are only compared within a block. Stadt has to agree when both
+sides have one. Similarity is the cosine of the names' character-trigram sets,
+computed block-wise as a matrix product.
+"""
+from __future__ import annotations
+
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Minimum trigram similarity for two names in one block to count as duplicates.
+DEDUPE_THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0.85"))
+# Names compared per block at most; larger blocks are split by Stadt or skipped.
+DEDUPE_MAX_BLOCK_SIZE = max(2, int(os.getenv("DEDUPE_MAX_BLOCK_SIZE", "500")))
+
+_TRANSLITERATION = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_UMLAUT_SPELLING = re.compile(r"([aou])e")
+
+# Legal forms, titles and filler words: dropped before comparing names.
+_STOPWORDS = {
+    "ag", "gmbh", "sa", "sarl", "sagl", "kg", "ohg", "gbr", "ug", "ltd", "llc", "inc", "co", "cie",
+    "und", "and", "et", "the", "der", "die", "das", "des", "fuer", "von", "zum", "zur", "am", "im",
+    "dr", "med", "dent", "prof", "pd", "lic", "iur", "jur", "mlaw", "msc", "bsc", "dipl", "phd", "mba", "fmh",
+}
+
+# Words shared by whole categories of leads: compared, but not used as blocking key.
+_GENERIC_WORDS = {
+    "praxis", "arztpraxis", "gemeinschaftspraxis", "gruppenpraxis", "zahnarztpraxis", "zahnarzt", "zahnaerzte",
+    "kanzlei", "anwaltskanzlei", "anwalt", "anwaelte", "rechtsanwalt", "rechtsanwaelte", "advokatur", "notariat",
+    "partner", "partners", "zentrum", "center", "centre", "gruppe", "group", "klinik", "physiotherapie",
+}
+
+
+def _fold(value: Optional[str]) -> str:
+    """Lowercase, German umlauts transliterated, other accents stripped."""
+    text = str(value or "").lower().translate(_TRANSLITERATION)
+    if text.isascii():
+        return text
+    return "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+
+
+def firma_tokens(firma: Optional[str]) -> List[str]:
+    """Words of a company name, normalized, without legal forms and titles."""
+    return [token for token in re.findall(r"[a-z0-9]+", _fold(firma)) if token not in _STOPWORDS]
+
+
+def firma_text(firma: Optional[str]) -> str:
+    """The company name as compared for similarity ("Praxis Dr. Müller AG" -> "muller praxis").
+
+    Words are sorted and "ae"/"oe"/"ue" folded to the plain vowel, so word order
+    and umlaut spellings ("Müller"/"Mueller"/"Muller") do not lower the score.
+    """
+    return " ".join(sorted(_UMLAUT_SPELLING.sub(r"\1", token) for token in firma_tokens(firma)))
+
+
+def stadt_norm(stadt: Optional[str]) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", _fold(stadt)))
+
+
+@lru_cache(maxsize=65536)
+def cologne_phonetic(word: str) -> str:
+    """Kölner Phonetik code of a (folded, a-z) word: "mueller" and "muller" both give "657"."""
+    word = re.sub(r"[^a-z]", "", word)
+    codes = []
+    for i, ch in enumerate(word):
+        prev = word[i - 1] if i else ""
+        nxt = word[i + 1] if i + 1 < len(word) else ""
+        if ch in "aeijouy":
+            code = "0"
+        elif ch == "h":
+            continue
+        elif ch == "b":
+            code = "1"
+        elif ch == "p":
+            code = "3" if nxt == "h" else "1"
+        elif ch in "dt":
+            code = "8" if nxt in ("c", "s", "z") else "2"
+        elif ch in "fvw":
+            code = "3"
+        elif ch in "gkq":
+            code = "4"
+        elif ch == "c":
+            if i == 0:
+                code = "4" if nxt in ("a", "h", "k", "l", "o", "q", "r", "u", "x") else "8"
+            elif prev in ("s", "z"):
+                code = "8"
+            else:
+                code = "4" if nxt in ("a", "h", "k", "o", "q", "u", "x") else "8"
+        elif ch == "x":
+            code = "8" if prev in ("c", "k", "q") else "48"
+        elif ch == "l":
+            code = "5"
+        elif ch in "mn":
+            code = "6"
+        elif ch == "r":
+            code = "7"
+        elif ch in "sz":
+            code = "8"
+        else:
+            continue
+        codes.append(code)
+
+    collapsed = []
+    for code in "".join(codes):
+        if not collapsed or collapsed[-1] != code:
+            collapsed.append(code)
+    if not collapsed:
+        return ""
+    return collapsed[0] + "".join(code for code in collapsed[1:] if code != "0")
+
+
+def firma_key(firma: Optional[str]) -> Optional[str]:
+    """Phonetic blocking key of a company name; None when it has no words.
+
+    Built from the distinctive words (generic ones like "Praxis" only when
+    nothing else is left), sorted, so word order and spelling variants
+    ("Müller"/"Mueller"/"Muller") share a key. Numbers are kept verbatim.
+    """
+    tokens = firma_tokens(firma)
+    distinctive = [token for token in tokens if token not in _GENERIC_WORDS] or tokens
+    codes = {token if token.isdigit() else cologne_phonetic(token) for token in distinctive}
+    codes.discard("")
+    return " ".join(sorted(codes))[:255] or None
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(names_a: Sequence[str], names_b: Sequence[str]) -> np.ndarray:
+    """Trigram cosine similarity of every name in ``names_a`` against every name in ``names_b``."""
+    grams_a = [_trigrams(name) for name in names_a]
+    grams_b = [_trigrams(name) for name in names_b]
+    vocab: Dict[str, int] = {}
+    for grams in grams_a + grams_b:
+        for gram in grams:
+            vocab.setdefault(gram, len(vocab))
+
+    def matrix(gram_sets: List[set]) -> np.ndarray:
+        m = np.zeros((len(gram_sets), max(len(vocab), 1)), dtype=np.float32)
+        for row, grams in enumerate(gram_sets):
+            m[row, [vocab[gram] for gram in grams]] = 1.0
+        return m
+
+    a, b = matrix(grams_a), matrix(grams_b)
+    norms = np.outer(np.sqrt(a.sum(axis=1)), np.sqrt(b.sum(axis=1)))
+    return np.divide(a @ b.T, norms, out=np.zeros(norms.shape, dtype=np.float32), where=norms > 0)
+
+
+def _stadt_compatible(stadt: str, others: np.ndarray) -> np.ndarray:
+    if not stadt:
+        return np.ones(len(others), dtype=bool)
+    return (others == stadt) | (others == "")
+
+
+class NameIndex:
+    """Company names grouped by firma_key, for matching new leads against known ones."""
+
+    def __init__(self, threshold: float = DEDUPE_THRESHOLD, max_block_size: int = DEDUPE_MAX_BLOCK_SIZE):
+        self.threshold = threshold
+        self.max_block_size = max_block_size
+        # firma_key -> [(ref, firma_text, stadt_norm)]
+        self._blocks: Dict[str, List[Tuple[Any, str, str]]] = defaultdict(list)
+
+    def add(self, ref: Any, firma: Optional[str], stadt: Optional[str], key: Optional[str] = None) -> None:
+        key = key or firma_key(firma)
+        if key:
+            self._blocks[key].append((ref, firma_text(firma), stadt_norm(stadt)))
+
+    def match_batch(
+        self,
+        items: Sequence[Tuple[Any, Optional[str], Optional[str]]],
+        keys: Optional[Sequence[Optional[str]]] = None,
+    ) -> List[Optional[Tuple[Any, float]]]:
+        """
+        Best known match ``(ref, score)`` for each ``(ref, firma, stadt)`` item, or None.
+        Items without a match are added to the index as they go, so later items
+        also match earlier ones of the same batch. ``keys`` are the items'
+        firma_key() values when the caller already has them.
+        """
+        results: List[Optional[Tuple[Any, float]]] = [None] * len(items)
+        groups: Dict[str, List[int]] = defaultdict(list)
+        for position, (_, firma, _) in enumerate(items):
+            key = keys[position] if keys is not None else firma_key(firma)
+            if key:
+                groups[key].append(position)
+
+        for key, positions in groups.items():
+            block = self._blocks[key]
+            if not block and len(positions) == 1:
+                ref, firma, stadt = items[positions[0]]
+                block.append((ref, firma_text(firma), stadt_norm(stadt)))
+                continue
+
+            known = block[:self.max_block_size]
+            new = [(items[p][0], firma_text(items[p][1]), stadt_norm(items[p][2])) for p in positions]
+            candidates = known + new
+            scores = similarity([text for _, text, _ in new], [text for _, text, _ in candidates])
+            stadte = np.array([stadt for _, _, stadt in candidates], dtype=object)
+            # Known names, plus new ones added earlier in this batch
+            usable = np.zeros(len(candidates), dtype=bool)
+            usable[:len(known)] = True
+
+            for row, position in enumerate(positions):
+                ref, text, stadt = new[row]
+                eligible = usable & _stadt_compatible(stadt, stadte)
+                row_scores = np.where(eligible, scores[row], -1.0)
+                best = int(row_scores.argmax())
+                if row_scores[best] >= self.threshold:
+                    results[position] = (candidates[best][0], round(float(row_scores[best]), 3))
+                else:
+                    usable[len(known) + row] = True
+                    block.append((ref, text, stadt))
+        return results
+
+
+def find_duplicate_pairs(
+    leads: Iterable[Tuple[int, Optional[str], Optional[str], Optional[str]]],
+    threshold: float = DEDUPE_THRESHOLD,
+    max_block_size: int = DEDUPE_MAX_BLOCK_SIZE,
+    stats: Optional[Dict] = None,
+) -> List[Tuple[int, int, float, str]]:
+    """
+    Likely duplicate pairs among ``(id, firma, stadt, domain_norm)`` rows, as
+    ``(id_a, id_b, score, reason)`` sorted by score; reason is "domain" (same
+    website host, score 1.0) or "name" (similar name in the same firma_key block).
+    Blocks over ``max_block_size`` are split by Stadt; parts still too large are
+    skipped and counted in ``stats["skipped_blocks"]``.
+    """
+    stats = stats if stats is not None else {}
+    name_blocks: Dict[str, List[Tuple[int, str, str]]] = defaultdict(list)
+    domain_blocks: Dict[str, List[int]] = defaultdict(list)
+    for lead_id, firma, stadt, domain in leads:
+        stats["leads"] = stats.get("leads", 0) + 1
+        key = firma_key(firma)
+        if key:
+            name_blocks[key].append((lead_id, firma_text(firma), stadt_norm(stadt)))
+        if domain:
+            domain_blocks[domain].append(lead_id)
+
+    pairs: Dict[Tuple[int, int], Tuple[float, str]] = {}
+    for ids in domain_blocks.values():
+        # Chain to the oldest lead instead of emitting every pair of the block
+        first = min(ids)
+        for other in ids:
+            if other != first:
+                pairs[(first, other)] = (1.0, "domain")
+
+    for block in name_blocks.values():
+        if len(block) < 2:
+            continue
+        parts = [block]
+        if len(block) > max_block_size:
+            by_stadt: Dict[str, list] = defaultdict(list)
+            for member in block:
+                by_stadt[member[2]].append(member)
+            parts = list(by_stadt.values())
+        for part in parts:
+            if len(part) < 2:
+                continue
+            if len(part) > max_block_size:
+                stats["skipped_blocks"] = stats.get("skipped_blocks", 0) + 1
+                continue
+            stats["compared"] = stats.get("compared", 0) + len(part) * (len(part) - 1) // 2
+            scores = similarity([text for _, text, _ in part], [text for _, text, _ in part])
+            stadte = np.array([stadt for _, _, stadt in part], dtype=object)
+            compatible = (stadte[:, None] == stadte[None, :]) | (stadte[:, None] == "") | (stadte[None, :] == "")
+            rows, cols = np.triu_indices(len(part), k=1)
+            hits = (scores[rows, cols] >= threshold) & compatible[rows, cols]
+            for i, j in zip(rows[hits], cols[hits]):
+                a, b = sorted((part[i][0], part[j][0]))
+                if (a, b) not in pairs:
+                    pairs[(a, b)] = (round(float(scores[i, j]), 3), "name")
+
+    return sorted(
+        ((a, b, score, reason) for (a, b), (score, reason) in pairs.items()),
+        key=lambda pair: (-pair[2], pair[0], pair[1]),
+    )
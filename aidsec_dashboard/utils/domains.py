@@ -0,0 +1,68 @@
+"""Domain and e-mail normalization shared by caching and duplicate detection."""
+from __future__ import annotations
+
+import ipaddress
+from urllib.parse import urlsplit
+
+# Public suffixes with two labels that we meet in lead data; everything else
+# is treated as a single-label TLD (.ch, .de, .com, ...).
+_MULTI_LABEL_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk", "ltd.uk", "plc.uk",
+    "co.at", "or.at", "ac.at", "gv.at",
+    "com.au", "net.au", "org.au",
+    "co.nz", "co.za", "co.jp", "com.br", "com.tr", "com.cn",
+}
+
+
+def hostname(url_or_host: str | None) -> str:
+    """Lowercased host of a URL or bare host, without port, trailing dot or ``www.``."""
+    if not url_or_host:
+        return ""
+    raw = str(url_or_host).strip()
+    if not raw:
+        return ""
+    if "://" not in raw:
+        raw = f"//{raw}"
+    try:
+        host = urlsplit(raw).hostname or ""
+    except ValueError:
+        return ""
+    host = host.rstrip(".").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+def registrable_domain(url_or_host: str | None) -> str:
+    """Registrable domain ("example.ch" for "https://shop.example.ch/x"); "" when unparseable."""
+    host = hostname(url_or_host)
+    if not host:
+        return ""
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+    labels = host.split(".")
+    if len(labels) <= 2:
+        return host
+    if ".".join(labels[-2:]) in _MULTI_LABEL_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def email_norm(email: str | None) -> str | None:
+    """Duplicate-detection key for an e-mail address (trimmed, lowercased); None when blank."""
+    if email is None:
+        return None
+    key = str(email).strip().lower()
+    return key or None
+
+
+def domain_norm(website: str | None) -> str | None:
+    """Duplicate-detection key for a website: its host without ``www.``; None when unparseable.
+
+    Deliberately the full host rather than the registrable domain, so tenants
+    of shared hosting platforms (``firma.wixsite.com``) stay distinct.
+    """
+    return hostname(website) or None
@@ -1,8 +1,16 @@
 """Excel/CSV Import Utilities"""
+import enum
+import os
+import openpyxl
 import pandas as pd
-from typing import List, Dict, Tuple
-from database.models import Lead, LeadKategorie
+from datetime import datetime
+from itertools import repeat
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
+from sqlalchemy import insert, or_
+from database.models import Lead, LeadKategorie, LeadStatus
 from database.database import get_session
+from utils.dedupe import NameIndex, firma_key
+from utils.domains import domain_norm, email_norm
 
 
 def normalize_url(url: str) -> str:
@@ -21,6 +29,211 @@ def normalize_email(email: str) -> str:
     return str(email).strip().lower()
 
 
+# Rows per parsed chunk and per INSERT executemany / COPY batch; each chunk is committed on its own.
+IMPORT_CHUNK_SIZE = max(100, int(os.getenv("IMPORT_CHUNK_SIZE", "5000")))
+# Also catch leads whose name is similar to a known lead's (utils.dedupe), not only exact e-mail/website
+# matches: rejected when nothing contradicts the match, imported with a note when both have their own
+# e-mail or website (see _fuzzy_conflict()).
+IMPORT_FUZZY_DEDUPE = os.getenv("IMPORT_FUZZY_DEDUPE", "true").strip().lower() in {"1", "true", "yes", "on"}
+
+# Deliberately loose: one "@", no whitespace, a dot in the domain part.
+_EMAIL_PATTERN = r"[^@\s]+@[^@\s]+\.[^@\s]+"
+# Spreadsheet fillers for "no e-mail"; treated like an empty cell.
+_EMAIL_PLACEHOLDERS = frozenset({
+    "-", "--", "---", "/", "?", "x", "n/a", "n.a.", "na", "k.a.", "k. a.", "keine", "none", "null", "nan",
+})
+
+_URL_PREFIX_PATTERN = r"https?://|www\."
+
+
+def _column(df: pd.DataFrame, *names: str) -> pd.Series:
+    """First of ``names`` present in ``df`` (like ``row.get(a, row.get(b))``), else an all-NaN column."""
+    for name in names:
+        if name in df.columns:
+            return df[name]
+    return pd.Series(float("nan"), index=df.index, dtype="object")
+
+
+def _clean_text(series: pd.Series) -> pd.Series:
+    """Column-wise ``str(value).strip()``, with "" for missing values."""
+    return series.where(series.notna(), "").astype(str).str.strip()
+
+
+def normalize_url_column(series: pd.Series) -> pd.Series:
+    """Vectorized normalize_url()."""
+    return (
+        _clean_text(series)
+        .str.lower()
+        .str.rstrip("/")
+        .str.replace(_URL_PREFIX_PATTERN, "", regex=True)
+    )
+
+
+def normalize_email_column(series: pd.Series) -> pd.Series:
+    """Vectorized normalize_email()."""
+    return _clean_text(series).str.lower()
+
+
+# Columns of the per-row reject report, in order.
+REJECT_FIELDS = ("row", "kategorie", "firma", "email", "website", "reason", "detail")
+# Report reasons for rows that were still imported (with the offending value dropped).
+WARNING_REASONS = frozenset({"invalid_email"})
+
+
+def _reject(row: int, kategorie: LeadKategorie, firma: str, email: str, website: str, reason: str, detail: str = "") -> Dict:
+    """One reject report entry; ``row`` is the row number in the file or sheet (header = 1)."""
+    return {
+        "row": row,
+        "kategorie": kategorie.value,
+        "firma": firma,
+        "email": email,
+        "website": website,
+        "reason": reason,
+        "detail": detail,
+    }
+
+
+def _lead_records(
+    df: pd.DataFrame,
+    kategorie: LeadKategorie,
+    columns: Dict[str, Tuple[str, ...]],
+    with_wordpress: bool,
+    on_reject: Optional[Callable[[Dict], None]] = None,
+) -> List[Dict]:
+    """Normalize ``df`` column by column and return one lead dict per valid row.
+
+    ``columns`` maps each lead field to the source column names to try, in order.
+    Rows without a Firma are left out and passed to ``on_reject`` (see _reject()).
+    Placeholder e-mails ("-", "n/a", ...) count as blank; other malformed e-mails
+    are imported as None and reported as an ``invalid_email`` warning.
+    ``df`` is indexed like ``read_excel``/``read_csv`` output (first data row = 0);
+    each lead keeps its file row number as ``row``.
+    """
+    if df.empty:
+        return []
+
+    row = pd.Series(df.index + 2, index=df.index)
+    firma = _clean_text(_column(df, *columns["firma"]))
+    website = normalize_url_column(_column(df, *columns["website"]))
+    email = normalize_email_column(_column(df, *columns["email"]))
+    email = email.mask(email.isin(_EMAIL_PLACEHOLDERS), "")
+    missing_firma = firma == ""
+    invalid_email = ~missing_firma & (email != "") & ~email.str.fullmatch(_EMAIL_PATTERN)
+    if on_reject:
+        for reason, reported, detail in (
+            ("missing_firma", missing_firma, ""),
+            ("invalid_email", invalid_email, "imported without e-mail"),
+        ):
+            for values in zip(row[reported], firma[reported], email[reported], website[reported]):
+                on_reject(_reject(values[0], kategorie, *values[1:], reason, detail))
+    email = email.astype(object).mask(invalid_email, None)
+
+    keep = ~missing_firma
+    fields = {
+        "firma": firma[keep],
+        "website": website[keep],
+        "email": email[keep],
+        "telefon": _clean_text(_column(df, *columns["telefon"])[keep]),
+        "stadt": _clean_text(_column(df, *columns["stadt"])[keep]),
+    }
+    names = [*fields, "kategorie", "row"]
+    values = [column.tolist() for column in fields.values()] + [repeat(kategorie), row[keep].tolist()]
+    if with_wordpress:
+        wordpress = _column(df, "WordPress")[keep]
+        names.append("wordpress")
+        values.append(wordpress.where(wordpress.notna(), "nan").astype(str).str.lower().eq("ja").tolist())
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+_EXCEL_COLUMNS = {
+    "firma": ("Firma",),
+    "website": ("Website",),
+    "email": ("EMail",),
+    "telefon": ("Telefon",),
+    "stadt": ("Stadt",),
+}
+
+_CSV_COLUMNS = {
+    "firma": ("Firma", "firma"),
+    "website": ("Website", "website"),
+    "email": ("EMail", "email"),
+    "telefon": ("Telefon", "telefon"),
+    "stadt": ("Stadt", "stadt"),
+}
+
+
+def _count_chunk(stats: Dict, rows: int, leads: int) -> None:
+    stats["rows"] = stats.get("rows", 0) + rows
+    stats["total"] = stats.get("total", 0) + leads
+    stats["rejected"] = stats.get("rejected", 0) + rows - leads
+
+
+# (sheet, kategorie, stats key) in file order
+_EXCEL_SHEETS = (
+    ("Praxen Leads", LeadKategorie.PRAXIS, "praxis"),
+    ("Anwalts Kanzleien", LeadKategorie.ANWALT, "anwalt"),
+)
+
+
+def _sheet_frames(sheet, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """A read-only worksheet as DataFrames of up to ``chunk_size`` rows (first row is the header).
+
+    Blank rows are skipped; the index stays ``read_excel``-style (sheet row - 2).
+    """
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+    width = len(columns)
+
+    batch, index = [], []
+    for number, row in enumerate(rows, start=2):
+        if all(value is None for value in row):
+            continue
+        batch.append(tuple(row[:width]) + (None,) * (width - len(row)))
+        index.append(number - 2)
+        if len(batch) >= chunk_size:
+            # object dtype keeps cell values as read, whatever else the chunk holds
+            yield pd.DataFrame(batch, columns=columns, index=index, dtype=object)
+            batch, index = [], []
+    if batch:
+        yield pd.DataFrame(batch, columns=columns, index=index, dtype=object)
+
+
+def iter_excel_leads(
+    file_path: str,
+    stats: Optional[Dict] = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    on_reject: Optional[Callable[[Dict], None]] = None,
+) -> Iterator[List[Dict]]:
+    """
+    Lead dicts from both sheets of an Excel file, in chunks of up to ``chunk_size`` rows.
+    The workbook is streamed with openpyxl in read-only mode, so memory stays at one chunk.
+    ``stats`` (rows read, per-sheet row counts, total, rejected) is updated as chunks are produced.
+    """
+    stats = stats if stats is not None else {}
+    try:
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    except Exception as e:
+        stats["errors"] = stats.get("errors", 0) + 1
+        print(f"Error reading Excel file: {e}")
+        return
+
+    try:
+        for sheet_name, kategorie, stats_key in _EXCEL_SHEETS:
+            if sheet_name not in workbook.sheetnames:
+                print(f"Error reading {sheet_name} sheet: Worksheet named '{sheet_name}' not found")
+                continue
+            for df in _sheet_frames(workbook[sheet_name], chunk_size):
+                stats[stats_key] = stats.get(stats_key, 0) + len(df)
+                leads = _lead_records(df, kategorie, _EXCEL_COLUMNS, with_wordpress=True, on_reject=on_reject)
+                _count_chunk(stats, len(df), len(leads))
+                yield leads
+    finally:
+        workbook.close()
+
+
 def import_from_excel(file_path: str) -> Tuple[List[Dict], Dict]:
     """
     Import leads from Excel file.
@@ -32,71 +245,10 @@ def import_from_excel(file_path: str) -> Tuple[List[Dict], Dict]:
         "praxis": 0,
         "wordpress": 0,
         "duplicates": 0,
+        "rejected": 0,
         "errors": 0
     }
-
-    leads = []
-
-    # Read both sheets - note the order in the file
-    try:
-        # Sheet 1: Praxen Leads (350 rows)
-        praxis_df = pd.read_excel(file_path, sheet_name="Praxen Leads")
-        stats["praxis"] = len(praxis_df)
-    except Exception as e:
-        print(f"Error reading Praxen Leads sheet: {e}")
-        praxis_df = pd.DataFrame()
-
-    try:
-        # Sheet 2: Anwalts Kanzleien (250 rows)
-        anwalt_df = pd.read_excel(file_path, sheet_name="Anwalts Kanzleien")
-        stats["anwalt"] = len(anwalt_df)
-    except Exception as e:
-        print(f"Error reading Anwalts Kanzleien sheet: {e}")
-        anwalt_df = pd.DataFrame()
-
-    # Process Praxen Leads (Sheet 1)
-    for _, row in praxis_df.iterrows():
-        try:
-            firma = str(row.get("Firma", "")).strip() if pd.notna(row.get("Firma")) else ""
-            if not firma:
-                continue
-
-            lead = {
-                "firma": firma,
-                "website": normalize_url(row.get("Website", "")),
-                "email": normalize_email(row.get("EMail", "")),
-                "telefon": str(row.get("Telefon", "")).strip() if pd.notna(row.get("Telefon")) else "",
-                "stadt": str(row.get("Stadt", "")).strip() if pd.notna(row.get("Stadt")) else "",
-                "kategorie": LeadKategorie.PRAXIS,
-                "wordpress": str(row.get("WordPress", "")).lower() == "ja"
-            }
-            leads.append(lead)
-        except Exception as e:
-            stats["errors"] += 1
-            print(f"Error processing praxis row: {e}")
-
-    # Process Anwalts Kanzleien (Sheet 2)
-    for _, row in anwalt_df.iterrows():
-        try:
-            firma = str(row.get("Firma", "")).strip() if pd.notna(row.get("Firma")) else ""
-            if not firma:
-                continue
-
-            lead = {
-                "firma": firma,
-                "website": normalize_url(row.get("Website", "")),
-                "email": normalize_email(row.get("EMail", "")),
-                "telefon": str(row.get("Telefon", "")).strip() if pd.notna(row.get("Telefon")) else "",
-                "stadt": str(row.get("Stadt", "")).strip() if pd.notna(row.get("Stadt")) else "",
-                "kategorie": LeadKategorie.ANWALT,
-                "wordpress": str(row.get("WordPress", "")).lower() == "ja"
-            }
-            leads.append(lead)
-        except Exception as e:
-            stats["errors"] += 1
-            print(f"Error processing anwalt row: {e}")
-
-    stats["total"] = len(leads)
+    leads = [lead for chunk in iter_excel_leads(file_path, stats) for lead in chunk]
     return leads, stats
 
 
@@ -105,10 +257,19 @@ def import_single_lead(lead_data: Dict) -> Lead:
     session = get_session()
     try:
         # Check for duplicates
-        existing = session.query(Lead).filter(
-            (Lead.email == lead_data.get("email")) |
-            (Lead.website == lead_data.get("website"))
-        ).first()
+        email_key = email_norm(lead_data.get("email"))
+        domain_key = domain_norm(lead_data.get("website"))
+        existing = None
+        if email_key or domain_key:
+            existing = session.query(Lead).filter(
+                or_(
+                    *([Lead.email_norm == email_key] if email_key else []),
+                    *([Lead.domain_norm == domain_key] if domain_key else []),
+                )
+            ).first()
+
+        if not existing and IMPORT_FUZZY_DEDUPE:
+            existing = _similar_lead(session, lead_data.get("firma", ""), lead_data.get("stadt", ""), email_key, domain_key)
 
         if existing:
             return existing
@@ -130,80 +291,299 @@ def import_single_lead(lead_data: Dict) -> Lead:
         session.close()
 
 
+def iter_csv_leads(
+    file_path: str,
+    kategorie: LeadKategorie = LeadKategorie.WORDPRESS,
+    stats: Optional[Dict] = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    on_reject: Optional[Callable[[Dict], None]] = None,
+) -> Iterator[List[Dict]]:
+    """Lead dicts from a CSV file, parsed ``chunk_size`` rows at a time; ``stats`` is updated as in iter_excel_leads()."""
+    stats = stats if stats is not None else {}
+    try:
+        # dtype=str: a column's values must not depend on what else its chunk holds
+        for df in pd.read_csv(file_path, chunksize=chunk_size, dtype=str):
+            leads = _lead_records(df, kategorie, _CSV_COLUMNS, with_wordpress=False, on_reject=on_reject)
+            _count_chunk(stats, len(df), len(leads))
+            yield leads
+    except Exception as e:
+        stats["errors"] = 1
+        print(f"CSV import error: {e}")
+
+
+def estimate_rows(file_path: str) -> Optional[int]:
+    """
+    Data rows in an upload, for progress reporting: the sheet dimensions of an
+    Excel file or the line count of a CSV (blank rows and quoted line breaks
+    make either approximate). None when the size cannot be told cheaply.
+    """
+    try:
+        if file_path.endswith((".xlsx", ".xls")):
+            workbook = openpyxl.load_workbook(file_path, read_only=True)
+            try:
+                sizes = [workbook[name].max_row for name, _, _ in _EXCEL_SHEETS if name in workbook.sheetnames]
+            finally:
+                workbook.close()
+            if any(size is None for size in sizes):
+                return None
+            return sum(max(size - 1, 0) for size in sizes)
+
+        lines = 0
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                lines += block.count(b"\n")
+        return max(lines - 1, 0)
+    except Exception:
+        return None
+
+
 def import_csv(file_path: str, kategorie: LeadKategorie = LeadKategorie.WORDPRESS) -> Tuple[List[Dict], Dict]:
     """Import leads from CSV file"""
     stats = {
         "total": 0,
         "duplicates": 0,
+        "rejected": 0,
         "errors": 0
     }
+    leads = [lead for chunk in iter_csv_leads(file_path, kategorie, stats) for lead in chunk]
+    return leads, stats
 
-    leads = []
 
-    try:
-        df = pd.read_csv(file_path)
-        for _, row in df.iterrows():
-            try:
-                firma = str(row.get("Firma", row.get("firma", ""))).strip() if pd.notna(row.get("Firma", row.get("firma"))) else ""
-                if not firma:
-                    continue
-
-                lead = {
-                    "firma": firma,
-                    "website": normalize_url(row.get("Website", row.get("website", ""))),
-                    "email": normalize_email(row.get("EMail", row.get("email", ""))),
-                    "telefon": str(row.get("Telefon", row.get("telefon", ""))).strip() if pd.notna(row.get("Telefon", row.get("telefon"))) else "",
-                    "stadt": str(row.get("Stadt", row.get("stadt", ""))).strip() if pd.notna(row.get("Stadt", row.get("stadt"))) else "",
-                    "kategorie": kategorie,
-                }
-                leads.append(lead)
-            except Exception as e:
-                stats["errors"] += 1
-    except Exception as e:
-        stats["errors"] = 1
-        print(f"CSV import error: {e}")
+_COPY_COLUMNS = (
+    "firma", "website", "email", "telefon", "stadt", "kategorie", "email_norm", "domain_norm", "firma_key", "status",
+    "deal_size", "response_time_hours", "wordpress_detected", "quelle", "notes", "created_at", "updated_at",
+)
+
+
+def _existing_keys(session, column, keys: set) -> set:
+    """The subset of ``keys`` already present in the indexed ``column``."""
+    if not keys:
+        return set()
+    return {value for value, in session.query(column).filter(column.in_(keys)).distinct().all()}
+
+
+def _new_lead_rows(
+    session,
+    leads_data: List[Dict],
+    seen_emails: set,
+    seen_domains: set,
+    on_reject: Optional[Callable[[Dict], None]] = None,
+) -> Tuple[List[Dict], int]:
+    """Column values for the leads of one chunk not already in the database (or earlier in the upload).
+
+    Duplicates are matched on the normalized e-mail and website host through
+    the indexed ``email_norm``/``domain_norm`` columns, one ``IN`` query each
+    per chunk, so the cost follows the upload size, not the table size.
+    ``seen_emails``/``seen_domains`` carry the keys of earlier chunks.
+    With IMPORT_FUZZY_DEDUPE, leads whose name is similar to a known lead's
+    are counted as duplicates too (see _fuzzy_duplicates()), unless their
+    e-mail or website contradicts the match - those are imported with a
+    "possible duplicate" note. Duplicates are passed to ``on_reject``.
+    """
+    keys = [(email_norm(lead.get("email")), domain_norm(lead.get("website"))) for lead in leads_data]
+    existing_emails = _existing_keys(session, Lead.email_norm, {e for e, _ in keys if e} - seen_emails)
+    existing_domains = _existing_keys(session, Lead.domain_norm, {d for _, d in keys if d} - seen_domains)
 
-    stats["total"] = len(leads)
-    return leads, stats
+    rows = []
+    accepted = []
+    duplicates = 0
+    now = datetime.utcnow()
+    for lead_data, (email_key, domain_key) in zip(leads_data, keys):
+        if (email_key and (email_key in existing_emails or email_key in seen_emails)) or (
+            domain_key and (domain_key in existing_domains or domain_key in seen_domains)
+        ):
+            duplicates += 1
+            if on_reject:
+                on_reject(_reject(
+                    lead_data.get("row"), lead_data["kategorie"], lead_data["firma"], lead_data["email"],
+                    lead_data["website"], "duplicate", _duplicate_detail(email_key, domain_key, existing_emails, existing_domains),
+                ))
+            continue
 
+        # Remember new keys to detect duplicates within the upload
+        if email_key:
+            seen_emails.add(email_key)
+        if domain_key:
+            seen_domains.add(domain_key)
+
+        # Core inserts skip the ORM, so model defaults and the normalized keys are spelled out here.
+        rows.append({
+            "firma": lead_data["firma"],
+            "website": lead_data["website"],
+            "email": lead_data["email"],
+            "telefon": lead_data["telefon"],
+            "stadt": lead_data["stadt"],
+            "kategorie": lead_data["kategorie"],
+            "email_norm": email_key,
+            "domain_norm": domain_key,
+            "firma_key": firma_key(lead_data["firma"]),
+            "status": LeadStatus.OFFEN,
+            "deal_size": 0,
+            "response_time_hours": 0,
+            "wordpress_detected": "Ja" if lead_data.get("wordpress") else "Nein",
+            "quelle": "excel_import",
+            "notes": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+        accepted.append(lead_data)
+
+    if IMPORT_FUZZY_DEDUPE and rows:
+        kept = []
+        matches = _fuzzy_duplicates(session, rows, [lead.get("row") for lead in accepted])
+        for lead_data, row, match in zip(accepted, rows, matches):
+            if match is None:
+                kept.append(row)
+                continue
+            (label, other_email, other_domain), score = match
+            if _fuzzy_conflict(row["email_norm"], row["domain_norm"], other_email, other_domain):
+                row["notes"] = _possible_duplicate_note(label, score)
+                kept.append(row)
+                continue
+            duplicates += 1
+            if on_reject:
+                on_reject(_reject(
+                    lead_data.get("row"), lead_data["kategorie"], lead_data["firma"], lead_data["email"],
+                    lead_data["website"], "fuzzy_duplicate", f"similar to {label} (score {score})",
+                ))
+        rows = kept
+    return rows, duplicates
 
-def import_direct(session, leads_data: List[Dict]) -> Tuple[int, int]:
-    """Direct import with session - returns (imported, duplicates)"""
-    imported = 0
-    duplicates = 0
 
-    # Pre-fetch all existing emails and websites for O(1) lookup
-    existing_emails = {e for e, in session.query(Lead.email).filter(Lead.email.isnot(None)).all() if e}
-    existing_websites = {w for w, in session.query(Lead.website).filter(Lead.website.isnot(None)).all() if w}
+def _fuzzy_conflict(email_a: Optional[str], domain_a: Optional[str], email_b: Optional[str], domain_b: Optional[str]) -> bool:
+    """Whether two similarly named leads have their own e-mail or website each.
 
-    for lead_data in leads_data:
-        # Check for duplicates using pre-fetched sets
-        email = lead_data.get("email")
-        website = lead_data.get("website")
+    Exact key matches are caught before, so two present keys always differ:
+    "Kanzlei Schmid" (schmid.ch) and "Kanzlei Schmidt" (schmidt-law.ch) are
+    likely two firms, and a name match alone must not drop either of them.
+    """
+    return bool((email_a and email_b) or (domain_a and domain_b))
 
-        if (email and email in existing_emails) or (website and website in existing_websites):
-            duplicates += 1
-            continue
 
-        # Add new values to sets to detect duplicates within the import batch
-        if email:
-            existing_emails.add(email)
-        if website:
-            existing_websites.add(website)
+def _possible_duplicate_note(label: str, score: float) -> str:
+    return f"--- Mögliches Duplikat ---\nÄhnlicher Name wie {label} (Score {score}), aber andere E-Mail/Website."
 
-        # Create new lead
-        lead = Lead(
-            firma=lead_data["firma"],
-            website=lead_data["website"],
-            email=lead_data["email"],
-            telefon=lead_data["telefon"],
-            stadt=lead_data["stadt"],
-            kategorie=lead_data["kategorie"],
-            wordpress_detected="Ja" if lead_data.get("wordpress") else "Nein",
-            quelle="excel_import"
+
+def _fuzzy_duplicates(session, rows: List[Dict], row_numbers: List[Optional[int]]) -> List[Optional[Tuple[Tuple, float]]]:
+    """Per lead row, the most similar known name at or above DEDUPE_THRESHOLD, or None.
+
+    Matches are ``((label, email_norm, domain_norm), score)``. Known names are
+    the leads in the database with the same phonetic ``firma_key`` (one indexed
+    ``IN`` query per chunk; earlier chunks are already committed) and the
+    earlier rows of this chunk.
+    """
+    index = NameIndex()
+    keys = [row["firma_key"] for row in rows]
+    wanted = {key for key in keys if key}
+    if wanted:
+        known = (
+            session.query(Lead.id, Lead.firma, Lead.stadt, Lead.firma_key, Lead.email_norm, Lead.domain_norm)
+            .filter(Lead.firma_key.in_(wanted))
+            .order_by(Lead.id)
+            .all()
         )
-        session.add(lead)
-        imported += 1
+        for lead_id, firma, stadt, key, email_key, domain_key in known:
+            index.add((f"lead #{lead_id} '{firma}'", email_key, domain_key), firma, stadt, key)
+    items = [
+        ((f"row {number} '{row['firma']}'", row["email_norm"], row["domain_norm"]), row["firma"], row["stadt"])
+        for row, number in zip(rows, row_numbers)
+    ]
+    return index.match_batch(items, keys)
+
+
+def _similar_lead(session, firma: str, stadt: str, email_key: Optional[str], domain_key: Optional[str]) -> Optional[Lead]:
+    """The known lead whose name is most similar to ``firma`` and nothing contradicts the match, or None."""
+    key = firma_key(firma)
+    if not key:
+        return None
+    index = NameIndex()
+    for lead in session.query(Lead).filter(Lead.firma_key == key).order_by(Lead.id).all():
+        index.add(lead, lead.firma, lead.stadt, key)
+    match = index.match_batch([(None, firma, stadt)], [key])[0]
+    if match is None or _fuzzy_conflict(email_key, domain_key, match[0].email_norm, match[0].domain_norm):
+        return None
+    return match[0]
+
+
+def _duplicate_detail(email_key: str, domain_key: str, existing_emails: set, existing_domains: set) -> str:
+    """Which key made a lead a duplicate, for the reject report."""
+    if email_key and email_key in existing_emails:
+        return f"email {email_key} already in database"
+    if domain_key and domain_key in existing_domains:
+        return f"domain {domain_key} already in database"
+    # Otherwise an earlier row of the same upload had the key
+    if email_key:
+        return f"email {email_key} earlier in upload"
+    return f"domain {domain_key} earlier in upload"
+
+
+def _copy_value(value):
+    # SQLEnum columns store the member name, as the ORM does.
+    return value.name if isinstance(value, enum.Enum) else value
+
+
+def _copy_leads(session, rows: List[Dict]) -> None:
+    """COPY ``rows`` into leads over the session's psycopg connection (same transaction)."""
+    dbapi_conn = session.connection().connection.driver_connection
+    statement = f"COPY {Lead.__tablename__} ({', '.join(_COPY_COLUMNS)}) FROM STDIN"
+    with dbapi_conn.cursor() as cursor:
+        with cursor.copy(statement) as copy:
+            for row in rows:
+                copy.write_row(tuple(_copy_value(row[column]) for column in _COPY_COLUMNS))
+
+
+def import_lead_chunks(
+    session,
+    lead_chunks: Iterable[List[Dict]],
+    total: Optional[int] = None,
+    progress_callback: Optional[Callable[[int, Optional[int]], None]] = None,
+    on_reject: Optional[Callable[[Dict], None]] = None,
+) -> Tuple[int, int]:
+    """Import leads chunk by chunk - returns (imported, duplicates)
+
+    Each chunk is checked for duplicates with indexed ``IN`` queries, then its
+    new leads are written with ``COPY FROM STDIN`` on PostgreSQL and a Core
+    ``INSERT`` executemany elsewhere, bypassing the ORM unit of work, and
+    committed. Chunks are consumed lazily, so a streaming reader
+    (``iter_excel_leads``/``iter_csv_leads``) keeps memory flat.
+    ``progress_callback(done, total)`` runs after each chunk with the number
+    of leads processed so far (``total`` may be None when unknown); duplicates
+    are passed to ``on_reject``.
+    """
+    use_copy = session.get_bind().dialect.name == "postgresql"
+    insert_stmt = insert(Lead.__table__)
+    seen_emails: set = set()
+    seen_domains: set = set()
+
+    done = 0
+    imported = 0
+    duplicates = 0
+    for chunk in lead_chunks:
+        rows, chunk_duplicates = _new_lead_rows(session, chunk, seen_emails, seen_domains, on_reject)
+        if rows:
+            if use_copy:
+                _copy_leads(session, rows)
+            else:
+                session.execute(insert_stmt, rows)
+        session.commit()
+        done += len(chunk)
+        imported += len(rows)
+        duplicates += chunk_duplicates
+        if progress_callback:
+            progress_callback(done, total)
 
-    session.commit()
     return imported, duplicates
+
+
+def import_direct(
+    session,
+    leads_data: List[Dict],
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress_callback: Optional[Callable[[int, Optional[int]], None]] = None,
+    on_reject: Optional[Callable[[Dict], None]] = None,
+) -> Tuple[int, int]:
+    """Direct import with session - returns (imported, duplicates); see import_lead_chunks()."""
+    chunks = (leads_data[start:start + chunk_size] for start in range(0, len(leads_data), chunk_size))
+    return import_lead_chunks(
+        session, chunks, total=len(leads_data), progress_callback=progress_callback, on_reject=on_reject
+    )